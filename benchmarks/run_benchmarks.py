@@ -0,0 +1,297 @@
+# benchmark suite of the core models and the model engine
+# run from the root of the repository with: python benchmarks/run_benchmarks.py [--output results.json] [--quick]
+import argparse, json, os, platform, subprocess, sys
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from statistics import median
+from time import perf_counter
+
+# make the explain_core package importable when this script is run from the benchmarks folder
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_folder)
+
+import numpy as np
+
+from explain_core.ModelEngine import ModelEngine
+from explain_core.EnsembleEngine import EnsembleEngine
+
+import schedule_benchmark
+
+default_filename = os.path.join(root_folder, 'normal_neonate.json')
+
+
+def quiet(function, *args, **kwargs):
+    # call a function without printing its output
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return function(*args, **kwargs)
+
+
+def load_model(filename, **kwargs):
+    return quiet(ModelEngine, filename, **kwargs)
+
+
+def bench_load_time(filename, repeats):
+    # time needed to load and initialize the model from the definition file
+    durations = []
+    for _ in range(repeats):
+        perf_start = perf_counter()
+        load_model(filename)
+        durations.append(perf_counter() - perf_start)
+    return {'median_s': median(durations), 'min_s': min(durations)}
+
+
+def bench_scenario(filename, setup, duration, settle, **kwargs):
+    # steps per second of a model run after the setup function has prepared the model
+    model = load_model(filename, **kwargs)
+    if setup is not None:
+        setup(model)
+    model.calculate(settle)
+    model.calculate(duration)
+    return {
+        'steps_per_second': 1.0 / (model.step_duration / 1000.0),
+        'step_duration_ms': model.step_duration
+    }
+
+
+def ventilator_setup(mode):
+    # switch the mechanical ventilator on in the given ventilator mode
+    def setup(model):
+        ventilator = model.components['ventilator']
+        ventilator.ventilator_mode = mode
+        ventilator.toggle_ventilator(True)
+    return setup
+
+
+def ecls_setup(model):
+    # switch the ecls on
+    model.components['ecls'].is_enabled = True
+
+
+def bench_steps_per_second(filename, duration, settle):
+    results = {
+        'ventilator_off': bench_scenario(filename, None, duration, settle),
+        'ventilator_off_vectorized_hydraulics': bench_scenario(filename, None, duration, settle, vectorized_hydraulics = True)
+    }
+
+    # 0 = pressure control, 1 = volume control, 2 = pressure regulated volume control, 3 = hfov
+    for mode in range(4):
+        try:
+            results[f'ventilator_mode_{mode}'] = bench_scenario(filename, ventilator_setup(mode), duration, settle)
+        except Exception as error:
+            # a ventilator mode which fails to run is reported instead of stopping the whole suite
+            results[f'ventilator_mode_{mode}'] = {'failed': f"{type(error).__name__}: {error}"}
+
+    # the ecls needs the ecls circuit components in the model definition
+    model = load_model(filename)
+    missing = [name for name in ['ELGIN', 'ELUNG', 'ELGOUT', 'ELGIN_ELUNG', 'ELUNG_ELGOUT', 'PUMPIN', 'PUMPOUT', 'SUCT'] if name not in model.components]
+    if 'ecls' in model.components and len(missing) == 0:
+        results['ecls'] = bench_scenario(filename, ecls_setup, duration, settle)
+    else:
+        results['ecls'] = {'skipped': f"model definition has no ecls circuit (missing {', '.join(missing)})"}
+
+    return results
+
+
+def bench_blood_calls(filename, calls, settle):
+    # cost of one acidbase and one oxygenation calculation of the blood model
+    model = load_model(filename)
+    model.calculate(settle)
+    blood = model.components['blood']
+    comp = model.components['AA']
+
+    # the fastest of a number of repeats is the least disturbed by other processes
+    results = {}
+    for name in ['acidbase', 'acidbase_newton', 'oxygenation']:
+        function = getattr(blood, name)
+        durations = []
+        for _ in range(5):
+            perf_start = perf_counter()
+            for _ in range(calls):
+                function(comp)
+            durations.append((perf_counter() - perf_start) / calls * 1e6)
+        results[f'{name}_us'] = min(durations)
+    return results
+
+
+def bench_metabolism(filename, calls, settle):
+    # cost of one model step of the metabolism with a growing number of active components in the vectorized hydraulics mode, with the loop
+    # over the components and with the array expression on the hydraulics arrays. the crossover is the smallest number of active components
+    # from which the array expression is faster, the vectorize_threshold of the metabolism model is set from it
+    model = load_model(filename, vectorized_hydraulics = True)
+    model.calculate(settle)
+    metabolism = model.components['metabolism']
+    compliances = [comp.name for comp in model.hydraulics.compliances]
+
+    # the active components cycle through the blood compliances when there are more active components than compliances
+    no_comps = [1, 2, 4, 8, 16, 32, 64]
+    results = {'loop_us': {}, 'array_us': {}, 'crossover': None}
+    for n in no_comps:
+        metabolism.active_comps = [{"comp": compliances[i % len(compliances)], "fvatp": 0.01} for i in range(n)]
+        for path, threshold in [('loop_us', n + 1), ('array_us', 0)]:
+            metabolism.vectorize_threshold = threshold
+            metabolism.link()
+            durations = []
+            for _ in range(5):
+                perf_start = perf_counter()
+                for _ in range(calls):
+                    metabolism.model_step()
+                durations.append((perf_counter() - perf_start) / calls * 1e6)
+            results[path][str(n)] = min(durations)
+        if results['crossover'] is None and results['array_us'][str(n)] < results['loop_us'][str(n)]:
+            results['crossover'] = n
+    return results
+
+
+def bench_ensemble(filename, duration, settle):
+    # cost of one model step per patient of an ensemble with a growing number of patients, compared to one model with the same vectorized
+    # cores and batched blood gas solvers run on its own
+    model = load_model(filename, vectorized_hydraulics = True, vectorized_gas = True)
+    model.components['blood'].acidbase_solver = "batched"
+    model.components['blood'].oxygenation_solver = "batched"
+    model.calculate(settle)
+    model.calculate(duration)
+    results = {'standalone_ms': model.step_duration, 'per_patient_ms': {}}
+
+    for no_patients in [1, 4, 16]:
+        ensemble = quiet(EnsembleEngine, filename, no_patients = no_patients)
+        ensemble.calculate(settle)
+        ensemble.calculate(duration)
+        results['per_patient_ms'][str(no_patients)] = ensemble.step_duration / no_patients
+    return results
+
+
+def bench_datacollector(filename, calls, settle):
+    # cost of collecting one data sample with a growing number of watched signals, the slope is the cost per watched signal
+    model = load_model(filename)
+    model.calculate(settle)
+    dc = model.io.dc
+    signals = [f"{name}.pres" for name, comp in model.components.items() if hasattr(comp, 'pres')]
+
+    no_signals = [0, 8, 16, 32]
+    durations = []
+    for n in no_signals:
+        dc.clear_watchlist()
+        for signal in signals[:n]:
+            dc.add_to_watchlist(model.io.find_model_prop(signal))
+        perf_start = perf_counter()
+        for _ in range(calls):
+            dc.collect_sample(model.model_clock)
+        durations.append((perf_counter() - perf_start) / calls * 1e6)
+        dc.clear_data()
+
+    slope, intercept = np.polyfit(no_signals, durations, 1)
+    return {
+        'per_signal_us': float(slope),
+        'per_sample_base_us': float(intercept),
+        'samples_us': dict(zip([str(n) for n in no_signals], durations))
+    }
+
+
+def bench_analyze(filename, duration):
+    # time needed to analyze the data of a long model run
+    model = load_model(filename)
+    properties = ['AA.pres', 'PA.pres', 'LV.vol', 'RV.vol', 'LV_AA.flow', 'DA.flow']
+    quiet(model.io.analyze, properties, time_to_calculate = duration)
+
+    perf_start = perf_counter()
+    quiet(model.io.analyze, properties, calculate = False)
+    return {
+        'analyze_s': perf_counter() - perf_start,
+        'run_duration_s': duration,
+        'samples': len(model.io.dc.collected_data)
+    }
+
+
+def get_metadata():
+    # describe the environment the benchmarks ran in so the results of different versions can be compared
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd = root_folder, stderr = subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor()
+    }
+
+
+def flatten(results, prefix = ''):
+    # flatten the nested results to a dictionary of 'group.benchmark.metric' values
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results, baseline, threshold = 0.1):
+    # return the timings which got worse than the threshold compared to the baseline results. for steps per second and saved time higher is better,
+    # for the durations (_s, _ms and _us) lower is better
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for key, value in current.items():
+        if key not in previous or previous[key] == 0:
+            continue
+        change = (value - previous[key]) / abs(previous[key])
+        if key.endswith(('steps_per_second', 'saved_us')):
+            change = -change
+        elif not key.endswith(('_s', '_ms', '_us')):
+            continue
+        if change > threshold:
+            regressions.append({'benchmark': key, 'baseline': previous[key], 'current': value, 'change': change})
+    return regressions
+
+
+def main(filename = default_filename, quick = False):
+    duration = 1.0 if quick else 5.0
+    settle = 0.5 if quick else 2.0
+    repeats = 3 if quick else 10
+    calls = 200 if quick else 2000
+
+    results = {
+        'load_time': bench_load_time(filename, repeats),
+        'steps_per_second': bench_steps_per_second(filename, duration, settle),
+        'blood': bench_blood_calls(filename, calls, settle),
+        'metabolism': bench_metabolism(filename, calls, settle),
+        'ensemble': bench_ensemble(filename, duration / 5, settle / 5),
+        'datacollector': bench_datacollector(filename, calls, settle),
+        'analyze': bench_analyze(filename, 10.0 if quick else 60.0),
+        'schedule': quiet(schedule_benchmark.main, filename, 1000 if quick else 4000, repeats = 5 if quick else 15)
+    }
+
+    return {'metadata': get_metadata(), 'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'benchmark suite of the explain core models and model engine')
+    parser.add_argument('--output', help = 'write the results as json to this file')
+    parser.add_argument('--definition', default = default_filename, help = 'model definition file')
+    parser.add_argument('--quick', action = 'store_true', help = 'shorter runs for a quick check')
+    parser.add_argument('--compare', help = 'json results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type = float, default = 0.1, help = 'relative slowdown which counts as a regression')
+    arguments = parser.parse_args()
+
+    benchmark = main(arguments.definition, arguments.quick)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        benchmark['regressions'] = compare(benchmark['results'], baseline['results'], arguments.threshold)
+
+    output = json.dumps(benchmark, indent = 2)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            output_file.write(output)
+    print(output)
+
+    # a non zero exit code signals regressions to a ci run
+    if len(benchmark.get('regressions', [])) > 0:
+        sys.exit(1)
@@ -0,0 +1,94 @@
+# benchmark of the compiled step schedule of the model engine
+# run from the root of the repository with: python benchmarks/schedule_benchmark.py
+import os, sys
+from time import perf_counter
+
+# make the explain_core package importable when this script is run from the benchmarks folder
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_folder)
+
+import numpy as np
+
+from explain_core.ModelEngine import ModelEngine
+
+
+def run_dict_iteration(model, no_steps):
+    # the model loop as it was before the step schedule, every component is called every step and the components
+    # with an update interval count the model steps themselves
+    model_steps = {name: comp.model_step for name, comp in model.components.items()}
+    update_steps = {name: model.get_update_steps(getattr(comp, 'update_interval', model.modeling_stepsize)) for name, comp in model.components.items()}
+
+    # the interface and the datacollector counted the model steps of their own intervals as well
+    model_steps['interface'] = model.io.update_prop_changes
+    update_steps['interface'] = model.get_update_steps(model.io.prop_update_interval)
+    model_steps['datacollector'] = lambda: model.io.dc.collect_sample(model.model_clock)
+    update_steps['datacollector'] = model.get_update_steps(model.io.dc.sample_interval)
+
+    counters = {name: 0 for name in model_steps}
+    for _ in range(no_steps):
+        for name, model_step in model_steps.items():
+            counters[name] += 1
+            if counters[name] >= update_steps[name]:
+                counters[name] = 0
+                model_step()
+        model.model_clock += model.modeling_stepsize
+
+
+def run_step_schedule(model, no_steps):
+    # the model loop of the model engine using the compiled step schedule and the rate groups
+    model.calculate(no_steps * model.modeling_stepsize)
+
+
+def measure(runs, model, no_steps, repeats):
+    # return the times per step in microseconds of every run over a number of repeats. every run starts from the same state of the model and
+    # the runs are interleaved within a repeat so a slow period of the machine affects all runs of that repeat alike
+    start_state = model.snapshot()
+    durations = [[] for _ in runs]
+    for _ in range(repeats):
+        for run, run_durations in zip(runs, durations):
+            model.restore(start_state)
+            model.update_schedule()
+            perf_start = perf_counter()
+            run(model, no_steps)
+            run_durations.append((perf_counter() - perf_start) / no_steps * 1e6)
+    return [np.array(run_durations) for run_durations in durations]
+
+
+def main(filename=os.path.join(root_folder, 'normal_neonate.json'), no_steps=4000, repeats=15):
+    # load the model and let it settle for a second
+    model = ModelEngine(filename)
+    model.calculate(1.0)
+
+    dict_steps, schedule_steps = measure([run_dict_iteration, run_step_schedule], model, no_steps, repeats)
+
+    # the saved overhead is the difference of the paired runs of every repeat, it is reported as the median with its quartiles and range
+    # as single differences vary by tens of microseconds between repeats
+    saved = dict_steps - schedule_steps
+    quartiles = np.percentile(saved, [25, 75])
+
+    no_components = len(model.components)
+    no_scheduled = len(model.step_schedule)
+    no_rate_scheduled = sum(len(rate_group[2]) for rate_group in model.rate_schedule)
+
+    print(f"components in model             : {no_components}")
+    print(f"components in step schedule     : {no_scheduled}")
+    print(f"functions in rate groups        : {no_rate_scheduled}")
+    print(f"calls left out per step         : {no_components - no_scheduled}")
+    print(f"dict iteration per step         : {round(float(np.median(dict_steps)), 2)} us (median of {repeats} runs)")
+    print(f"compiled step schedule per step : {round(float(np.median(schedule_steps)), 2)} us (median of {repeats} runs)")
+    print(f"overhead saved per step         : {round(float(np.median(saved)), 2)} us (quartiles {round(quartiles[0], 2)} to {round(quartiles[1], 2)} us, range {round(saved.min(), 2)} to {round(saved.max(), 2)} us)")
+
+    return {
+        "dict_iteration_us": float(np.median(dict_steps)),
+        "step_schedule_us": float(np.median(schedule_steps)),
+        "saved_us": float(np.median(saved)),
+        "saved_us_quartiles": [float(quartiles[0]), float(quartiles[1])],
+        "saved_us_range": [float(saved.min()), float(saved.max())],
+        "repeats": repeats,
+        "calls_left_out": no_components - no_scheduled,
+        "rate_scheduled": no_rate_scheduled
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# import the numpy module for the state arrays of the ensemble
+import numpy as np
+
+# import the perfomance counter module to measure the model performance
+from time import perf_counter
+
+# import the model engine which runs the models of the virtual patients
+from explain_core.ModelEngine import ModelEngine
+
+# import the helpers to load the model definition and to set the parameters of the virtual patients
+from explain_core.helpers.definition import load_definition, apply_parameters
+
+# import the batched vectorized hydraulics cores
+from explain_core.helpers.hydraulics import HydraulicsBatch, GasHydraulicsBatch
+
+# import the batched blood gas solver
+from explain_core.helpers.bloodgas import BloodBatch
+
+# import the property change class of the model interface
+from explain_core.helpers.interface import propChange
+
+class EnsembleEngine:
+
+    # an ensemble engine runs a number of virtual patients built from one model definition in lockstep. the parameters of the patients
+    # are given as a list with a dictionary of 'component.prop' values for every patient, as a dictionary with a list of values for
+    # every 'component.prop' or as a pandas dataframe with a column for every 'component.prop'.
+    # the hydraulics and gas hydraulics cores and the blood gas solvers of all patients run as one batch, the other components (heart,
+    # breathing, gas exchangers, containers, metabolism and so on) are objects which are still stepped patient by patient so the run time
+    # keeps growing linearly with the number of patients, only with a smaller cost per patient than a single model.
+    def __init__(self, filename = 'normal_neonate.json', parameters = None, no_patients = None, batched_blood = True):
+        # load the model definition file
+        if isinstance(filename, dict):
+            self.model_definition = filename
+        else:
+            self.model_definition = load_definition(filename)
+
+        # convert the parameter table to a list with the parameters of every patient
+        self.parameters = self.get_parameter_list(parameters, no_patients)
+
+        # build a model of every patient with the vectorized hydraulics and gas cores
+        self.models = []
+        for patient_parameters in self.parameters:
+            self.models.append(ModelEngine(apply_parameters(self.model_definition, patient_parameters), vectorized_hydraulics = True, vectorized_gas = True))
+
+        # store the number of patients in the ensemble
+        self.no_patients = len(self.models)
+
+        # get the model stepsize from the model definition
+        self.modeling_stepsize = self.models[0].modeling_stepsize
+
+        # stack the hydraulics and gas hydraulics cores of all patients so the arrays have the shape (patients, components)
+        self.hydraulics = HydraulicsBatch([model.hydraulics for model in self.models])
+        self.gas_hydraulics = GasHydraulicsBatch([model.gas_hydraulics for model in self.models])
+
+        # the acidbase and oxygenation of the blood models of all patients are solved together with the batched solvers, with batched_blood
+        # set to False every blood model keeps its own solvers and is stepped on its own
+        self.bloods = [self.get_blood(model) for model in self.models]
+        if batched_blood:
+            for blood in self.bloods:
+                if blood is not None:
+                    blood.acidbase_solver = "batched"
+                    blood.oxygenation_solver = "batched"
+        self.blood = BloodBatch([blood for blood in self.bloods if blood is not None])
+
+        # define a list holding the model step functions of every patient which are called before, in between and after the batched cores
+        # and a list holding the batched cores in the order of the step schedule
+        self.step_schedules = []
+        self.batch_schedule = []
+
+        # define a variable holding the current model clock
+        self.model_clock = 0
+
+        # define a variable holding the step duration
+        self.step_duration = 0
+
+        # define a variable holding the model run duration
+        self.run_duration = 0
+
+    def get_parameter_list(self, parameters, no_patients):
+        # without parameters all patients are the same
+        if parameters is None:
+            return [{} for _ in range(no_patients or 1)]
+
+        # a pandas dataframe has a row for every patient
+        if hasattr(parameters, 'to_dict'):
+            parameters = parameters.to_dict('records')
+
+        # a dictionary holds a list of values for every parameter
+        if isinstance(parameters, dict):
+            no_values = {len(values) for values in parameters.values()}
+            if len(no_values) != 1:
+                raise ValueError("all parameters of the ensemble should have a value for every patient.")
+            parameters = [{prop: values[patient] for prop, values in parameters.items()} for patient in range(no_values.pop())]
+
+        return list(parameters)
+
+    def get_blood(self, model):
+        # return the blood model of the patient, None when the model has no blood model
+        for comp in model.components.values():
+            if comp.model_type == 'Blood':
+                return comp
+        return None
+
+    def compile_schedules(self):
+        # split the step schedule of every patient at the positions of the hydraulics cores as the cores of all patients are stepped together
+        self.step_schedules = []
+        self.batch_schedule = None
+        for model, blood in zip(self.models, self.bloods):
+            model.update_schedule()
+            batches = {model.hydraulics.model_step: self.hydraulics, model.gas_hydraulics.model_step: self.gas_hydraulics}
+            segments = [[]]
+            batch_schedule = []
+            for model_step in model.step_schedule:
+                if model_step in batches:
+                    batch_schedule.append(batches[model_step])
+                    segments.append([])
+                else:
+                    segments[-1].append(model_step)
+
+            # the segments of the patients are called in between the batched cores so every patient must step the cores in the same order
+            if self.batch_schedule is None:
+                self.batch_schedule = batch_schedule
+            elif batch_schedule != self.batch_schedule:
+                raise ValueError(f"the hydraulics cores of patient {len(self.step_schedules)} are stepped in another order than those of patient 0.")
+
+            # the model step function of the blood model is replaced by the batched blood solver when it is due
+            self.step_schedules.append((model, segments, blood.model_step if blood is not None else None))
+
+    # calculate a number of seconds
+    def calculate(self, time_to_calculate):
+        # calculate the number of steps needed (= time in seconds / modeling stepsize in seconds)
+        no_steps = int(time_to_calculate / self.modeling_stepsize)
+
+        # make sure the step schedules match the current components of the patients
+        self.compile_schedules()
+
+        # start the performance counter
+        perf_start = perf_counter()
+
+        # execute the model steps
+        for _ in range(no_steps):
+            # rebuild the step schedules when a component of a patient was enabled or disabled during the last model step
+            for model in self.models:
+                if model._schedule_dirty:
+                    self.compile_schedules()
+                    break
+
+            # call the model step functions of every patient which come before a batched core and step that core for all patients together
+            for position, batch in enumerate(self.batch_schedule):
+                for model, segments, blood_step in self.step_schedules:
+                    for model_step in segments[position]:
+                        model_step()
+                batch.model_step()
+
+            # call the model step functions of every patient which come after the batched cores and count down the rate groups holding
+            # the blood model, the prop changes and the data collection of every patient. the blood models which are due are solved
+            # together so the model step functions which come after the blood model in the rate groups wait for the batched solve
+            due_bloods = []
+            waiting_steps = []
+            for model, segments, blood_step in self.step_schedules:
+                for model_step in segments[-1]:
+                    model_step()
+
+                waiting = False
+                for rate_group in model.rate_schedule:
+                    rate_group[0] -= 1
+                    if rate_group[0] == 0:
+                        rate_group[0] = rate_group[1]
+                        for model_step in rate_group[2]:
+                            if model_step == blood_step:
+                                due_bloods.append(blood_step.__self__)
+                                waiting = True
+                            elif waiting:
+                                waiting_steps.append(model_step)
+                            else:
+                                model_step()
+
+            if len(due_bloods) > 0:
+                self.blood.model_step(due_bloods)
+                for model_step in waiting_steps:
+                    model_step()
+
+            for model in self.models:
+                model.model_clock += self.modeling_stepsize
+
+            # increase the model clock
+            self.model_clock += self.modeling_stepsize
+
+        # stop the performance counter
+        perf_stop = perf_counter()
+
+        # store the performance metrics
+        self.run_duration = perf_stop - perf_start
+        self.step_duration = (self.run_duration / no_steps) * 1000
+
+    def get_property(self, prop):
+        # return an array with the value of the property of every patient
+        values = []
+        for model in self.models:
+            model_prop = model.io.find_model_prop(prop)
+            if model_prop is None:
+                raise KeyError(f"property {prop} not found.")
+            values.append(getattr(model_prop['model'], model_prop['prop']))
+        return np.array(values)
+
+    def set_property(self, prop, new_values, in_time = 0, at_time = 0):
+        # schedule a property change for every patient, new_values is one value for all patients or a value for every patient
+        if np.ndim(new_values) == 0:
+            new_values = [new_values] * self.no_patients
+
+        for model, new_value in zip(self.models, new_values):
+            model_prop = model.io.find_model_prop(prop)
+            if model_prop is None:
+                raise KeyError(f"property {prop} not found.")
+            # keep the type of the model property (a numpy value is converted to a python value)
+            new_value = type(getattr(model_prop['model'], model_prop['prop']))(new_value)
+            model.io.propChanges.append(propChange(model_prop, new_value, in_time, at_time))
+
+    def add_to_watchlist(self, prop):
+        # add the property to the watchlist of the datacollector of every patient
+        for model in self.models:
+            model_prop = model.io.find_model_prop(prop)
+            if model_prop is None:
+                raise KeyError(f"property {prop} not found.")
+            model.io.dc.add_to_watchlist(model_prop)
+
+    def get_collected_data(self, prop):
+        # return an array of shape (patients, samples) with the collected data of the property of every patient
+        return np.array([[data_object[prop] for data_object in model.io.dc.collected_data] for model in self.models])
+
+    def clear_data(self):
+        # clear the collected data of every patient
+        for model in self.models:
+            model.io.dc.clear_data()
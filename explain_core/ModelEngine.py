@@ -7,18 +7,60 @@ from time import perf_counter
 # import the model interface module
 from explain_core.helpers.interface import Interface
 
+# import the vectorized hydraulics core
+from explain_core.helpers.hydraulics import Hydraulics, GasHydraulics
+
+# import the state snapshot functions
+from explain_core.helpers.snapshot import take_snapshot, restore_snapshot, snapshot_version
+
+# import the periodic steady state finder
+from explain_core.helpers.steadystate import find_steady_state
+
+# import the settled state cache
+from explain_core.helpers.statecache import StateCache, hash_definition, hash_code, get_code_files
+
 class ModelEngine:
 
     # when a model class is instantiated the model loads de normal neonate json definition by default.
-    def __init__(self, filename = 'normal_neonate.json'):
+    # instead of a filename an already loaded model definition dictionary can be passed.
+    # when vectorized_hydraulics is True the blood compliances, time-varying elastances, blood resistors and valves are stepped together as arrays.
+    # for a single model the array core itself is faster than stepping these components one by one, but the other components then read the
+    # pressures and volumes through array backed properties so a whole model step is not faster. it pays off when the cores of a number of
+    # models are stepped as one batch (as in the ensemble engine)
+    # when vectorized_gas is True the gas compliances and gas resistors are stepped together as arrays, which only pays off when the gas
+    # cores of a number of models are stepped as one batch (as in the ensemble engine)
+    def __init__(self, filename = 'normal_neonate.json', vectorized_hydraulics = False, vectorized_gas = False):
         # define a dictionary which is going to hold all the model components
         self.components = {}
 
+        # define variables holding the vectorized hydraulics cores (only used in the vectorized hydraulics and gas modes)
+        self.vectorized_hydraulics = vectorized_hydraulics
+        self.vectorized_gas = vectorized_gas
+        self.hydraulics = None
+        self.gas_hydraulics = None
+
         # define a variable holding the current model clock
         self.model_clock = 0
 
+        # define a list holding the compiled model step functions and the state of the components it was compiled for
+        self.step_schedule = []
+        self._schedule_signature = None
+        self._schedule_dirty = True
+
+        # define a dictionary holding the enabled state of the components at the last compile of the schedule
+        self._enabled_states = {}
+
+        # define a list holding the rate groups of the components which update on their own interval [countdown, interval in steps, model step functions]
+        self.rate_schedule = []
+
+        # define a list holding a description of every scheduled model step function
+        self.schedule = []
+
         # load the model definition file
-        self.model_definition = self.load_csv_definition_file(filename)
+        if isinstance(filename, dict):
+            self.model_definition = filename
+        else:
+            self.model_definition = self.load_csv_definition_file(filename)
 
         # initialize all model components with the parameters from the JSON file
         self.initialize(self.model_definition)
@@ -29,6 +71,10 @@ class ModelEngine:
         # define a variable holding the model run duration
         self.run_duration = 0
 
+        # define the profiling mode flag and a dictionary holding the accumulated time and number of calls of every model step function
+        self.profiling = False
+        self.profile_stats = {}
+
     def load_csv_definition_file(self, filename): 
         # open the JSON file
         json_file = open(filename)
@@ -43,6 +89,9 @@ class ModelEngine:
     def initialize(self, model_definition):
         # set error flag to zero, this flag is increased with every error the initialization routine encounters
         error_counter = 0
+
+        # hash the model definition (including any parameter overrides) before the components are built from it
+        self.definition_hash = hash_definition(model_definition)
         
         # get the model stepsize from the model definition
         self.modeling_stepsize = model_definition['modeling_stepsize']
@@ -97,32 +146,339 @@ class ModelEngine:
         else:
             print(f"{self.name} model failed to load correctly producing {error_counter} errors.")
    
+        # load the blood compliances and resistors into the vectorized hydraulics core
+        if self.vectorized_hydraulics:
+            self.hydraulics = Hydraulics(self)
+
+        # load the gas compliances and resistors into the vectorized gas hydraulics core
+        if self.vectorized_gas:
+            self.gas_hydraulics = GasHydraulics(self)
+
+        # resolve the name based references between the components (after the hydraulics core is built so components can refer to its arrays)
+        self.link_components()
+
         # initialize the model interface
         self.io = Interface(self)
-        
+
+    def link_components(self):
+        # resolve the name based references of the components to direct references once all components are built, so a missing
+        # component is found when the model is loaded instead of during a model run. the components define a link method for this
+        # which is called again when this method is called after a reference list of a component is changed.
+        errors = []
+        for name, comp in self.components.items():
+            if hasattr(comp, 'link'):
+                try:
+                    comp.link()
+                except KeyError as error:
+                    errors.append((name, comp, error.args[0]))
+
+        # an enabled component with a missing reference stops the loading of the model. a disabled component with a missing reference (e.g. the
+        # ecls of a model without its circuit) is loaded silently, its missing reference is kept and reported when the component is enabled
+        self.unlinked = {}
+        fatal = []
+        for name, comp, missing in errors:
+            message = f"{name} refers to the component {missing} which is not in the {self.name} model."
+            if getattr(comp, 'is_enabled', True):
+                fatal.append(message)
+            else:
+                self.unlinked[comp.name] = message
+
+        if len(fatal) > 0:
+            raise ValueError(" ".join(fatal))
+
+    def get_update_steps(self, update_interval):
+        # convert an update interval in seconds to a number of model steps (at least one)
+        return max(1, int(round(update_interval / self.modeling_stepsize)))
+
+    def reset(self, model_definition = None):
+        # rebuild all model components from the model definition (or from a new model definition) so the model starts again from its initial state
+        if model_definition is not None:
+            self.model_definition = model_definition
+
+        self.components = {}
+        self.hydraulics = None
+        self.gas_hydraulics = None
+        self.model_clock = 0
+
+        # the step schedule and the rate groups are rebuilt for the new components
+        self.step_schedule = []
+        self.rate_schedule = []
+        self.schedule = []
+        self._schedule_signature = None
+        self._schedule_dirty = True
+        self._enabled_states = {}
+
+        self.initialize(self.model_definition)
+
+    def snapshot(self, filename = None):
+        # capture the state of all model components, the model clock, the property changes and the datacollector settings as bytes
+        data = take_snapshot(self)
+
+        # write the snapshot to a file so it can be shared with other processes and runs
+        if filename is not None:
+            with open(filename, 'wb') as snapshot_file:
+                snapshot_file.write(data)
+
+        return data
+
+    def restore(self, snapshot):
+        # restore the state of the model from a snapshot (bytes) or from a snapshot file
+        if not isinstance(snapshot, (bytes, bytearray)):
+            with open(snapshot, 'rb') as snapshot_file:
+                snapshot = snapshot_file.read()
+
+        restore_snapshot(self, snapshot)
+
+    def find_steady_state(self, tolerance = 3e-3, max_time = 120.0, window = None, extrapolation = False):
+        # run the model until the cycle averaged compliance volumes and blood concentrations change less than the tolerance from one
+        # heart/breathing cycle to the next and return a report of the convergence. with extrapolation the slowly converging
+        # concentrations are extrapolated to their limit (aitken extrapolation).
+        return find_steady_state(self, tolerance = tolerance, max_time = max_time, window = window, extrapolation = extrapolation)
+
+    def warm_up(self, duration = None, cache = None, tolerance = 3e-3, extrapolation = False):
+        # bring the model to its settled state. the settled state is looked up in the state cache by the hash of the model definition,
+        # when it is not there the model is run to its steady state (or for the warm up duration when given) and the settled state is
+        # stored in the cache.
+        if cache is None:
+            cache = StateCache()
+
+        key = self.get_warm_up_key(duration, tolerance, extrapolation)
+
+        data = cache.get(key)
+        if data is not None:
+            self.restore(data)
+            return True
+
+        if duration is None:
+            self.find_steady_state(tolerance = tolerance, extrapolation = extrapolation)
+        else:
+            self.calculate(duration)
+        cache.put(key, self.snapshot())
+        return False
+
+    def get_warm_up_key(self, duration = None, tolerance = 3e-3, extrapolation = False):
+        # the key of the settled state in the state cache, besides the model definition and the warm up settings it holds the version of
+        # the snapshot format and the hash of the model code so the states settled by another version of the code are not used
+        code_hash = hash_code(get_code_files(self.components.values()))
+        return hash_definition(self.definition_hash, duration, tolerance, extrapolation, self.vectorized_hydraulics, self.vectorized_gas, snapshot_version, code_hash)
+
+    def build_schedule(self):
+        # build a list of the model step functions in the order of the components dictionary together with their update interval. building
+        # the list has no side effects on the model, it also returns the disabled components which are left out of the schedule
+        schedule = []
+        disabled = []
+        for comp in self.components.values():
+            # leave out the components which declare they have no work to do in the model step
+            if getattr(comp, 'no_model_step', False):
+                continue
+
+            core = self.get_hydraulics_core(comp)
+            if core is not None:
+                # the components of a vectorized hydraulics core are stepped together at the position of the first one
+                name, hydraulics = core
+                if not any(entry['model_step'] == hydraulics.model_step for entry in schedule):
+                    schedule.append({'name': name, 'model_type': type(hydraulics).__name__, 'update_steps': 1, 'model_step': hydraulics.model_step})
+                continue
+
+            if getattr(comp, 'is_enabled', True):
+                # a component with a missing reference can't run
+                if comp.name in self.unlinked:
+                    raise ValueError(f"{self.unlinked[comp.name]} {comp.name} can't be enabled.")
+
+                # components declare their update period with the update_interval property, without one they are stepped every model step
+                update_steps = self.get_update_steps(getattr(comp, 'update_interval', self.modeling_stepsize))
+                schedule.append({'name': comp.name, 'model_type': comp.model_type, 'update_steps': update_steps, 'model_step': comp.model_step})
+            else:
+                disabled.append(comp)
+
+        # the interface processes the property changes and the datacollector collects its data on their own interval after the components
+        schedule.append({'name': 'interface', 'model_type': 'Interface', 'update_steps': self.get_update_steps(self.io.prop_update_interval), 'model_step': self.io.update_prop_changes})
+        schedule.append({'name': 'datacollector', 'model_type': 'Datacollector', 'update_steps': self.get_update_steps(self.io.dc.sample_interval), 'model_step': lambda: self.io.dc.collect_sample(self.model_clock)})
+
+        # the beat analyzer follows the pressures and flows of the subscribed components every model step, without subscriptions it is left out
+        if self.io.ba.is_active():
+            schedule.append({'name': 'beatanalyzer', 'model_type': 'BeatAnalyzer', 'update_steps': 1, 'model_step': self.io.ba.model_step})
+
+        return schedule, disabled
+
+    def compile_schedule(self):
+        schedule, disabled = self.build_schedule()
+
+        # a component which got disabled since the last compile is left out but gets one last model step to settle its disabled state
+        # (e.g. a resistor sets its flow to zero)
+        for comp in disabled:
+            if self._enabled_states.get(comp.name, True):
+                comp.model_step()
+        self._enabled_states = {name: getattr(comp, 'is_enabled', True) for name, comp in self.components.items()}
+
+        # keep the countdowns of the current rate groups so a rebuild of the schedule does not change their phase
+        countdowns = {rate_group[1]: rate_group[0] for rate_group in self.rate_schedule}
+
+        # the model step functions which run every model step go into the step schedule, the others are grouped by their update interval
+        step_schedule = []
+        rate_schedule = []
+        for entry in schedule:
+            if entry['update_steps'] == 1:
+                step_schedule.append(entry['model_step'])
+                continue
+            for rate_group in rate_schedule:
+                if rate_group[1] == entry['update_steps']:
+                    rate_group[2].append(entry['model_step'])
+                    break
+            else:
+                rate_schedule.append([countdowns.get(entry['update_steps'], entry['update_steps']), entry['update_steps'], [entry['model_step']]])
+
+        self.schedule = schedule
+        self.step_schedule = step_schedule
+        self.rate_schedule = rate_schedule
+        self._schedule_signature = self.get_schedule_signature()
+        self._schedule_dirty = False
+
+    def get_schedule(self):
+        # describe the schedule of the current components, a stale schedule is not compiled as compiling settles the disabled components
+        schedule = self.build_schedule()[0] if self.schedule_is_stale() else self.schedule
+
+        # return a description of the schedule with the update interval of every scheduled model step function
+        return [{'name': entry['name'], 'model_type': entry['model_type'], 'update_interval': entry['update_steps'] * self.modeling_stepsize, 'update_steps': entry['update_steps']} for entry in schedule]
+
+    def get_due_steps(self, steps_ahead = 1):
+        # return the names of the model step functions which are called in the coming model steps
+        due_steps = []
+        for step in range(1, steps_ahead + 1):
+            due = [entry['name'] for entry in self.schedule if entry['update_steps'] == 1]
+            for rate_group in self.rate_schedule:
+                if (step - rate_group[0]) % rate_group[1] == 0 and step >= rate_group[0]:
+                    due += [entry['name'] for entry in self.schedule if entry['model_step'] in rate_group[2]]
+            due_steps.append(due)
+        return due_steps
+
+    def get_hydraulics_core(self, comp):
+        # return the name and the vectorized hydraulics core which steps the component, None when the component steps itself
+        for name, hydraulics in [('hydraulics', self.hydraulics), ('gas_hydraulics', self.gas_hydraulics)]:
+            if hydraulics is not None and (comp in hydraulics.compliances or comp in hydraulics.resistors):
+                return name, hydraulics
+        return None
+
+    def get_schedule_signature(self):
+        # the step schedule depends on which components are in the model, whether they are enabled and on their update intervals
+        signature = tuple((id(comp), getattr(comp, 'is_enabled', True), getattr(comp, 'update_interval', None)) for comp in self.components.values())
+        return signature + (self.io.prop_update_interval, self.io.dc.sample_interval)
+
+    def invalidate_schedule(self):
+        # signal that the step schedule has to be rebuilt before the next model step. during a model run only an invalidated schedule is
+        # rebuilt, so code which enables or disables components within a model run (a model step function or a property change) has to
+        # call this. a component which is enabled or disabled between model runs is detected by the signature check at the start of calculate
+        self._schedule_dirty = True
+
+    def schedule_is_stale(self):
+        # the step schedule is stale when it was invalidated or when the components or their enabled state changed
+        return self._schedule_dirty or self._schedule_signature != self.get_schedule_signature()
+
+    def update_schedule(self):
+        # rebuild the step schedule when it is stale
+        if self.schedule_is_stale():
+            self.compile_schedule()
+
     # calculate a number of seconds
     def calculate(self, time_to_calculate):
         # calculate the number of steps needed (= time in seconds / modeling stepsize in seconds)
         no_steps = int(time_to_calculate / self.modeling_stepsize)
     
+        # make sure the step schedule matches the current components
+        self.update_schedule()
+
         # start the performance counter
         perf_start = perf_counter()
 
-        # execute the model steps
-        for _ in range(no_steps):
-            for comp in self.components:
-                self.components[comp].model_step()
+        # execute the model steps, in the profiling mode the time spent in every model step function is measured
+        if self.profiling:
+            self.calculate_profiled(no_steps)
+        else:
+            for _ in range(no_steps):
+                # rebuild the step schedule when a component was enabled or disabled during the last model step, the signature is not
+                # checked every model step so this relies on invalidate_schedule
+                if self._schedule_dirty:
+                    self.compile_schedule()
 
-            # call the user interface
-            self.io.model_step(self.model_clock)
+                # call the model step functions which run every model step
+                for model_step in self.step_schedule:
+                    model_step()
 
-            # increase the model clock
-            self.model_clock += self.modeling_stepsize
+                # count down the rate groups and call the model step functions of the groups which are due
+                for rate_group in self.rate_schedule:
+                    rate_group[0] -= 1
+                    if rate_group[0] == 0:
+                        rate_group[0] = rate_group[1]
+                        for model_step in rate_group[2]:
+                            model_step()
 
+                # increase the model clock
+                self.model_clock += self.modeling_stepsize
 
         # stop the performance counter
         perf_stop = perf_counter()
 
         # store the performance metrics
         self.run_duration = perf_stop - perf_start
-        self.step_duration = (self.run_duration / no_steps) * 1000
\ No newline at end of file
+        self.step_duration = (self.run_duration / no_steps) * 1000
+
+    def calculate_profiled(self, no_steps):
+        # the same model steps as in calculate but the time of every model step function call is accumulated under its name
+        stats = self.profile_stats
+        entries = {}
+        for _ in range(no_steps):
+            if self._schedule_dirty or not entries:
+                self.compile_schedule()
+                entries = {id(entry['model_step']): entry for entry in self.schedule}
+                for entry in self.schedule:
+                    if entry['name'] not in stats:
+                        stats[entry['name']] = {'model_type': entry['model_type'], 'time': 0.0, 'calls': 0}
+
+            for model_step in self.step_schedule:
+                perf_start = perf_counter()
+                model_step()
+                stat = stats[entries[id(model_step)]['name']]
+                stat['time'] += perf_counter() - perf_start
+                stat['calls'] += 1
+
+            for rate_group in self.rate_schedule:
+                rate_group[0] -= 1
+                if rate_group[0] == 0:
+                    rate_group[0] = rate_group[1]
+                    for model_step in rate_group[2]:
+                        perf_start = perf_counter()
+                        model_step()
+                        stat = stats[entries[id(model_step)]['name']]
+                        stat['time'] += perf_counter() - perf_start
+                        stat['calls'] += 1
+
+            self.model_clock += self.modeling_stepsize
+
+    def enable_profiling(self, reset = True):
+        # switch the profiling mode on, the measured times are accumulated over all following model runs
+        self.profiling = True
+        if reset:
+            self.reset_profile()
+
+    def disable_profiling(self):
+        self.profiling = False
+
+    def reset_profile(self):
+        self.profile_stats = {}
+
+    def get_profile(self, by = 'name'):
+        # return the accumulated time and calls per model step function name or per model type, sorted from the most to the least time spent
+        profile = {}
+        for name, stat in self.profile_stats.items():
+            key = name if by == 'name' else stat['model_type']
+            if key not in profile:
+                profile[key] = {by: key, 'model_type': stat['model_type'], 'time': 0.0, 'calls': 0}
+            profile[key]['time'] += stat['time']
+            profile[key]['calls'] += stat['calls']
+
+        total_time = sum(item['time'] for item in profile.values())
+        for item in profile.values():
+            item['time_per_call'] = item['time'] / item['calls'] if item['calls'] > 0 else 0.0
+            item['share'] = item['time'] / total_time if total_time > 0 else 0.0
+
+        return sorted(profile.values(), key = lambda item: item['time'], reverse = True)
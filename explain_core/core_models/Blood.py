@@ -1,5 +1,13 @@
 import math
 
+import numpy as np
+
+from explain_core.helpers.bloodgas import solve_acidbase, solve_acidbase_from_pco2, solve_oxygenation, oxygen_dissociation_curve
+from explain_core.helpers.odctable import OxygenDissociationTable, shift_a
+
+# the columns needed by Blood.acidbase_from_pco2_bulk
+pco2_bulk_columns = ["pco2_measured", "sodium", "potassium", "calcium", "magnesium", "chloride", "lactate", "urate", "albumin", "phosphates", "hemoglobin", "uma"]
+
 class Blood:
     def __init__(self, model, **args):
         # initialize the super class
@@ -23,6 +31,36 @@ class Blood:
         self.right_o2 = 100
         self.alpha_o2p = 0.0095
         self.mmoltoml = 22.2674
+
+        # the solver used for the acidbase calculations
+        # - "brent" solves every compartment in turn with the brent root finding function
+        # - "batched" solves all acidbase enabled compartments at once with a vectorized bracketed newton method
+        # - "newton" solves every compartment in turn with a newton method starting from the previous hydrogen concentration of the compartment
+        self.acidbase_solver = "brent"
+
+        # the newton method starts within a bracket of this fraction around the previous hydrogen concentration, the bracket is
+        # widened (up to left_hp and right_hp) when the solution lies outside it
+        self.newton_bracket = 0.05
+
+        # skip the acidbase or oxygenation calculations of a component when none of its inputs changed more than the relative tolerance
+        # since its last solve (for example in stagnant compartments)
+        self.skip_unchanged = False
+        self.acidbase_skip_tolerance = 1e-4
+        self.oxygenation_skip_tolerance = 1e-4
+
+        # the solver used for the oxygenation calculations
+        # - "brent" solves every compartment in turn with the brent root finding function
+        # - "batched" solves all oxygenation enabled compartments at once with a vectorized bracketed newton method
+        # - "table" interpolates the po2 in a precomputed table and falls back to the brent root finding outside the table
+        self.oxygenation_solver = "brent"
+
+        # the grid of the oxygen dissociation table (None is the default grid of the odctable helper) and the file in which the table is cached
+        self.oxygenation_table_grid = None
+        self.oxygenation_table_file = ""
+        self.odc_table = None
+
+        # the acidbase and oxygenation calculations are done every 6 model steps of 0.5 ms (the model engine schedules the blood model on this interval)
+        self.update_interval = 0.003
         
         # define the independent properties
         # - global
@@ -65,8 +103,6 @@ class Blood:
         # define a list which contains all components holding a blood volume
         self.blood_components = []
         
-        self.counter = 0
-        
         # now transform the components with content blood into oxygenation and acidbase capable components
         for comp_name, comp in model.components.items():
             if hasattr(comp, 'content'):
@@ -78,9 +114,14 @@ class Blood:
                     # add a reference to the component to the blood components list
                     self.blood_components.append(comp)
 
-                    # set the blood compounds as properties of the model component
+                    # set the blood compounds of the model component, every component holds its own concentrations. the circulating blood
+                    # compounds (to2 and tco2) are properties of the model component which are mixed separately
                     for compound, value in self.compounds.items():
-                        comp.compounds[compound] = value
+                        if compound not in self.circulating_blood_compounds:
+                            comp.compounds[compound] = dict(value)
+
+                    # store the names of the compounds which are mixed when blood flows into the model component
+                    comp.mobile_compounds = [compound for compound, value in comp.compounds.items() if not value["fixed"]]
                     
                     # set the fixed blood compounds as properties of the model component
                     for compound, value in self.fixed_blood_compounds.items():
@@ -96,30 +137,100 @@ class Blood:
                     setattr(comp, "ph", self.ph)
                     setattr(comp, "hco3", self.hco3)
                     setattr(comp, "be", self.be)
+
+                    # set the acidbase solver statistics of the model component
+                    setattr(comp, "acidbase_solves", 0)
+                    setattr(comp, "acidbase_iterations", 0)
+                    setattr(comp, "acidbase_failures", 0)
+                    setattr(comp, "acidbase_skips", 0)
+                    setattr(comp, "acidbase_inputs", None)
                     
                     # set the additional oxygenation properties of the model component
                     setattr(comp, "oxy_enabled", False)
                     setattr(comp, "po2", self.po2)
                     setattr(comp, "so2", self.so2)
                     setattr(comp, "temp", self.temp)    
+
+                    # set the oxygenation solver statistics of the model component
+                    setattr(comp, "oxygenation_solves", 0)
+                    setattr(comp, "oxygenation_skips", 0)
+                    setattr(comp, "oxygenation_inputs", None)
                     
                     # the blood containing component is now transformed into a component with oxygenation and acidbase capabilities
+
+        # precompute the oxygen dissociation table (or load it from the cache file) when the table is used
+        if (self.oxygenation_solver == "table"):
+            self.get_odc_table()
                  
     def model_step(self):
         if (self.is_enabled):
-            if (self.counter > 5):
-                # iterate over all blood components
-                for comp in self.blood_components:
-                    # if this component has the acidbase enabled then do the calculations
-                    if (comp.acidbase_enabled):
-                        self.acidbase(comp)
-
-                    # if this component has the oxygenation enabled then do the calculations
-                    if (comp.oxy_enabled):
-                        self.oxygenation(comp)
-                self.counter = 0
-            self.counter += 1
-    
+            # get the components which have the acidbase enabled and whose inputs changed
+            acidbase_comps = self.get_acidbase_components()
+
+            # solve the acidbase of all acidbase enabled components at once
+            if (self.acidbase_solver == "batched"):
+                self.acidbase_batched(acidbase_comps)
+
+            # iterate over the acidbase enabled components
+            for comp in acidbase_comps:
+                if (self.acidbase_solver == "brent"):
+                    self.acidbase(comp)
+
+                if (self.acidbase_solver == "newton"):
+                    self.acidbase_newton(comp)
+
+            # the oxygenation depends on the base excess so the changes are detected after the acidbase calculations
+            oxy_comps = self.get_oxygenation_components()
+
+            # iterate over the oxygenation enabled components
+            if (self.oxygenation_solver == "brent"):
+                for comp in oxy_comps:
+                    self.oxygenation(comp)
+
+            # solve the oxygenation of all oxygenation enabled components at once
+            if (self.oxygenation_solver == "batched"):
+                self.oxygenation_batched(oxy_comps)
+
+            # interpolate the oxygenation of all oxygenation enabled components in the oxygen dissociation table
+            if (self.oxygenation_solver == "table"):
+                self.oxygenation_from_table(oxy_comps)
+
+    def get_acidbase_components(self):
+        # return the components which have the acidbase enabled and, when unchanged components are skipped, whose inputs changed since their last solve
+        comps = [comp for comp in self.blood_components if comp.acidbase_enabled]
+        if (self.skip_unchanged):
+            comps = self.get_changed_components(comps, "acidbase")
+        return comps
+
+    def get_oxygenation_components(self):
+        # return the components which have the oxygenation enabled and, when unchanged components are skipped, whose inputs changed since their last solve
+        comps = [comp for comp in self.blood_components if comp.oxy_enabled]
+        if (self.skip_unchanged):
+            comps = self.get_changed_components(comps, "oxygenation")
+        return comps
+
+    def get_inputs(self, comp, calculation):
+        # return the properties on which the acidbase or oxygenation solution of the component depends
+        if calculation == "acidbase":
+            return [comp.tco2, comp.sodium, comp.potassium, comp.calcium, comp.magnesium, comp.chloride, comp.lactate, comp.urate,
+                    comp.albumin, comp.phosphates, comp.uma, comp.hemoglobin]
+        return [comp.to2, comp.hemoglobin, comp.be, comp.dpg, comp.temp, self.ph]
+
+    def get_changed_components(self, comps, calculation):
+        # return the components of which one of the inputs changed more than the relative tolerance since their last solve, the
+        # change is relative to at least 1.0 so inputs near zero (like the base excess) are compared absolutely
+        tolerance = self.acidbase_skip_tolerance if calculation == "acidbase" else self.oxygenation_skip_tolerance
+        changed = []
+        for comp in comps:
+            inputs = self.get_inputs(comp, calculation)
+            last_inputs = getattr(comp, calculation + "_inputs")
+            if last_inputs is None or any(abs(new - old) > tolerance * max(abs(old), 1.0) for new, old in zip(inputs, last_inputs)):
+                setattr(comp, calculation + "_inputs", inputs)
+                changed.append(comp)
+            else:
+                setattr(comp, calculation + "_skips", getattr(comp, calculation + "_skips") + 1)
+        return changed
+
     def acidbase_from_pco2(self, ph_measured, pco2_measured, hco3_measured, be_measured, sodium, potassium, calcium, magnesium, chloride, lactate, urate, albumin, phosphates, hemoglobin, uma):
         # calcuilate the apparent SID
         self.sid = sodium + potassium + 2 * calcium + 2 * magnesium - chloride - lactate - urate
@@ -168,6 +279,57 @@ class Blood:
             print("no solution found!")
         
         
+    def acidbase_from_pco2_bulk(self, data, chunksize = 10000):
+        # calculate the ph, hco3 and be of a table of blood gasses at once. data is a pandas DataFrame or a dictionary of column arrays holding the
+        # pco2_measured, sodium, potassium, calcium, magnesium, chloride, lactate, urate, albumin, phosphates, hemoglobin and uma columns
+        # (in the units of acidbase_from_pco2). the rows are solved in chunks of chunksize rows so the solver memory doesn't grow with the table.
+        missing = [column for column in pco2_bulk_columns if column not in data]
+        if len(missing) > 0:
+            raise ValueError(f"missing blood gas columns: {', '.join(missing)}")
+
+        columns = {column: np.asarray(data[column], dtype=float) for column in pco2_bulk_columns}
+        no_rows = len(columns["pco2_measured"])
+
+        # the measured ph (when available) is the starting point of the newton method
+        ph_start = np.asarray(data["ph_measured"], dtype=float) if "ph_measured" in data else np.full(no_rows, 7.4)
+
+        ph_calculated = np.full(no_rows, np.nan)
+        hco3_calculated = np.full(no_rows, np.nan)
+        be_calculated = np.full(no_rows, np.nan)
+
+        for start in range(0, no_rows, chunksize):
+            rows = slice(start, min(start + chunksize, no_rows))
+
+            # calculate the apparent SID
+            sid = (columns["sodium"][rows] + columns["potassium"][rows] + 2 * columns["calcium"][rows] + 2 * columns["magnesium"][rows]
+                   - columns["chloride"][rows] - columns["lactate"][rows] - columns["urate"][rows])
+
+            hp_start = 1000.0 * np.power(10.0, -np.nan_to_num(ph_start[rows], nan = 7.4))
+            result = solve_acidbase_from_pco2(columns["pco2_measured"][rows], sid, columns["albumin"][rows], columns["phosphates"][rows],
+                                              columns["uma"][rows], columns["hemoglobin"][rows], hp_start, self.left_hp, self.right_hp,
+                                              self.kc, self.kd, self.kw, self.alpha_co2p, self.brent_accuracy, int(self.max_iterations))
+
+            # the rows without a solution are left as not a number
+            solved = result["solved"]
+            ph_calculated[rows] = np.where(solved, result["ph"], np.nan)
+            hco3_calculated[rows] = np.where(solved, result["hco3"], np.nan)
+            be_calculated[rows] = np.where(solved, result["be"], np.nan)
+
+        # return the input table with the calculated columns added
+        if hasattr(data, "assign"):
+            return data.assign(ph_calculated = ph_calculated, hco3_calculated = hco3_calculated, be_calculated = be_calculated)
+
+        bloodgas = dict(data)
+        bloodgas["ph_calculated"] = ph_calculated
+        bloodgas["hco3_calculated"] = hco3_calculated
+        bloodgas["be_calculated"] = be_calculated
+        return bloodgas
+
+    def acidbase_from_pco2_chunks(self, chunks, chunksize = 10000):
+        # calculate the blood gasses of a table which is read in chunks (for example pandas.read_csv(filename, chunksize=...)) chunk by chunk
+        for chunk in chunks:
+            yield self.acidbase_from_pco2_bulk(chunk, chunksize)
+
     def acidbase(self, comp):        
         # calculate the apparent strong ion difference (SID) in mEq/l
         comp.sid = comp.sodium + comp.potassium + 2 * comp.calcium + 2 * comp.magnesium - comp.chloride - comp.lactate - comp.urate
@@ -192,6 +354,9 @@ class Blood:
         
         # now try to find the hydrogen concentration at the point where the net charge of the plasma is zero within limits of the brent accuracy
         hp = self.brent_root_finding(self.net_charge_plasma, self.left_hp, self.right_hp, self.max_iterations, self.brent_accuracy)
+
+        # update the solver statistics of the component
+        self.update_solver_stats(comp, self.steps, hp > 0)
         
         # if this hydrogen concentration is found then store it inside the compartment
         if (hp > 0):
@@ -204,6 +369,179 @@ class Blood:
             comp.cco3 = self.cco3
             comp.be = self.be
     
+    def acidbase_batched(self, comps):
+        if len(comps) == 0:
+            return
+
+        inputs = self.get_acidbase_arrays(comps)
+        self.store_acidbase(comps, inputs['sid'], self.solve_acidbase_arrays(inputs))
+
+    def get_acidbase_arrays(self, comps):
+        # gather the independent acidbase properties of the components, the apparent SID in mEq/l is calculated from the electrolytes
+        return {
+            'tco2': np.array([comp.tco2 for comp in comps], dtype=float),
+            'sid': np.array([comp.sodium + comp.potassium + 2 * comp.calcium + 2 * comp.magnesium - comp.chloride - comp.lactate - comp.urate for comp in comps], dtype=float),
+            'albumin': np.array([comp.albumin for comp in comps], dtype=float),
+            'phosphates': np.array([comp.phosphates for comp in comps], dtype=float),
+            'uma': np.array([comp.uma for comp in comps], dtype=float),
+            'hemoglobin': np.array([comp.hemoglobin for comp in comps], dtype=float),
+            # the hydrogen concentration of the previous solution is the starting point of the newton method
+            'hp_start': 1000.0 * np.power(10.0, -np.array([comp.ph for comp in comps], dtype=float))
+        }
+
+    def solve_acidbase_arrays(self, inputs):
+        # solve the acidbase of the gathered properties of a batch of components with the constants of this blood model
+        result = solve_acidbase(inputs['tco2'], inputs['sid'], inputs['albumin'], inputs['phosphates'], inputs['uma'], inputs['hemoglobin'], inputs['hp_start'],
+                                self.left_hp, self.right_hp, self.kc, self.kd, self.kw, self.alpha_co2p, self.brent_accuracy, int(self.max_iterations))
+
+        # every component converges on its own, the steps of the batch are the steps of the slowest component
+        self.steps = int(np.max(result['iterations'], initial = 0))
+        return result
+
+    def store_acidbase(self, comps, sid, result):
+        # store the blood gas in the components for which a hydrogen concentration is found
+        solved = result['solved'].tolist()
+        iterations = result['iterations'].tolist()
+        for index, comp in enumerate(comps):
+            self.update_solver_stats(comp, iterations[index], solved[index])
+        sid = sid.tolist()
+        ph = result['ph'].tolist()
+        pco2 = result['pco2'].tolist()
+        hco3 = result['hco3'].tolist()
+        cco2 = result['cco2'].tolist()
+        cco3 = result['cco3'].tolist()
+        be = result['be'].tolist()
+        for index, comp in enumerate(comps):
+            comp.sid = sid[index]
+            if solved[index]:
+                comp.ph = ph[index]
+                comp.pco2 = pco2[index]
+                comp.hco3 = hco3[index]
+                comp.cco2 = cco2[index]
+                comp.cco3 = cco3[index]
+                comp.be = be[index]
+
+    def acidbase_newton(self, comp):
+        # get the for the acidbase independent parameters from the component
+        comp.sid = comp.sodium + comp.potassium + 2 * comp.calcium + 2 * comp.magnesium - comp.chloride - comp.lactate - comp.urate
+        self.sid = comp.sid
+        self.albumin = comp.albumin
+        self.phosphates = comp.phosphates
+        self.uma = comp.uma
+        self.tco2 = comp.tco2
+        self.hemoglobin = comp.hemoglobin
+
+        # find the hydrogen concentration starting from the previous solution of the component
+        hp_start = min(max(1000.0 * math.pow(10.0, -comp.ph), self.left_hp), self.right_hp)
+        hp = self.newton_root_finding(hp_start, self.max_iterations, self.brent_accuracy)
+
+        # update the solver statistics of the component
+        self.update_solver_stats(comp, self.steps, hp > 0)
+
+        # if this hydrogen concentration is found then store it inside the compartment
+        if (hp > 0):
+            comp.ph = (-math.log10(hp / 1000))
+            comp.pco2 = self.pco2
+            comp.hco3 = self.hco3
+            comp.cco2 = self.cco2
+            comp.cco3 = self.cco3
+            comp.be = self.be
+
+    def newton_root_finding(self, hp, max_iter, tolerance):
+        # find the root of the net charge of the plasma with a newton method. the net charge increases with the hydrogen concentration so
+        # every evaluation tells on which side of the root it lies. the newton step is kept within the bracket [lo, hi], a step beyond a bracket
+        # edge which is not yet evaluated moves to that edge and a step beyond an evaluated edge is replaced by a bisection step.
+        self.steps = 0
+        width = hp * self.newton_bracket
+        lo = max(self.left_hp, hp - width)
+        hi = min(self.right_hp, hp + width)
+        lo_evaluated = False
+        hi_evaluated = False
+
+        steps_taken = 0
+        while steps_taken < max_iter:
+            steps_taken += 1
+            netcharge = self.net_charge_plasma(hp)
+            if netcharge == 0.0:
+                self.steps = steps_taken
+                return hp
+
+            if netcharge < 0:
+                # the root lies above the hydrogen concentration, widen the bracket when the hydrogen concentration is its upper edge
+                lo, lo_evaluated = hp, True
+                if hp >= hi:
+                    if hi >= self.right_hp:
+                        return -1
+                    width *= 2.0
+                    hi, hi_evaluated = min(self.right_hp, hp + width), False
+            else:
+                # the root lies below the hydrogen concentration, widen the bracket when the hydrogen concentration is its lower edge
+                hi, hi_evaluated = hp, True
+                if hp <= lo:
+                    if lo <= self.left_hp:
+                        return -1
+                    width *= 2.0
+                    lo, lo_evaluated = max(self.left_hp, hp - width), False
+
+            # newton step with the analytic derivative of the net charge
+            hp_new = hp - netcharge / self.net_charge_plasma_derivative(hp)
+            if hp_new >= hi:
+                hp_new = 0.5 * (lo + hi) if hi_evaluated else hi
+            elif hp_new <= lo:
+                hp_new = 0.5 * (lo + hi) if lo_evaluated else lo
+
+            if abs(hp_new - hp) < tolerance:
+                self.steps = steps_taken
+                return hp_new
+
+            hp = hp_new
+
+        return -1
+
+    def net_charge_plasma_derivative(self, hp_estimate):
+        # calculate the derivative of the net charge of the plasma to the hydrogen concentration using the bicarbonate and carbonate
+        # concentrations stored by net_charge_plasma at the same hydrogen concentration
+        e = hp_estimate + self.kc + self.kc * self.kd / hp_estimate
+        dhco3p = -self.hco3 * (1.0 - self.kc * self.kd / (hp_estimate * hp_estimate)) / e
+        dco3p = self.kd * (dhco3p - self.hco3 / hp_estimate) / hp_estimate
+
+        # the weak acids are linear in the ph which is -log10 of the hydrogen concentration
+        weak_acids = 0.123 * self.albumin + 0.309 * self.phosphates
+
+        return 1.0 - dhco3p - 2.0 * dco3p + (self.kw / hp_estimate + weak_acids / math.log(10.0)) / hp_estimate
+
+    def update_solver_stats(self, comp, iterations, solved):
+        # count the acidbase solves, the iterations needed and the solves without a solution of the component
+        comp.acidbase_solves += 1
+        comp.acidbase_iterations += iterations
+        if not solved:
+            comp.acidbase_failures += 1
+
+    def get_solver_stats(self):
+        # return the acidbase and oxygenation solver statistics of the acidbase or oxygenation enabled components
+        stats = {}
+        for comp in self.blood_components:
+            if comp.acidbase_solves + comp.acidbase_skips + comp.oxygenation_solves + comp.oxygenation_skips > 0:
+                stats[comp.name] = {
+                    'solves': comp.acidbase_solves,
+                    'iterations': comp.acidbase_iterations,
+                    'mean_iterations': comp.acidbase_iterations / comp.acidbase_solves if comp.acidbase_solves > 0 else 0.0,
+                    'failures': comp.acidbase_failures,
+                    'skips': comp.acidbase_skips,
+                    'oxygenation_solves': comp.oxygenation_solves,
+                    'oxygenation_skips': comp.oxygenation_skips
+                }
+        return stats
+
+    def reset_solver_stats(self):
+        for comp in self.blood_components:
+            comp.acidbase_solves = 0
+            comp.acidbase_iterations = 0
+            comp.acidbase_failures = 0
+            comp.acidbase_skips = 0
+            comp.oxygenation_solves = 0
+            comp.oxygenation_skips = 0
+
     def net_charge_plasma_from_pco2(self, hp_estimate):
         # calculate the ph based on the current hp estimate
         ph = -math.log10(hp_estimate / 1000.0)
@@ -312,6 +650,7 @@ class Blood:
         
         # calculate the po2 from the to2 using a brent root finding function and oxygen dissociation curve
         self.po2 = self.brent_root_finding(self.oxygen_content, self.left_o2, self.right_o2, self.max_iterations, self.brent_accuracy)
+        comp.oxygenation_solves += 1
         
         # if a po2 is found then store the po2 and so2 into the component
         if (self.po2 > 0):
@@ -319,6 +658,80 @@ class Blood:
             comp.po2 = self.po2 / 0.1333
             comp.so2 = self.so2 * 100
         
+    def oxygenation_batched(self, comps):
+        if len(comps) == 0:
+            return
+
+        self.store_oxygenation(comps, self.solve_oxygenation_arrays(self.get_oxygenation_arrays(comps)))
+
+    def get_oxygenation_arrays(self, comps):
+        # gather the for the oxygenation independent parameters from the components, the oxygen dissociation curve uses the ph of the blood model
+        return {
+            'to2': np.array([comp.to2 for comp in comps], dtype=float),
+            'hemoglobin': np.array([comp.hemoglobin for comp in comps], dtype=float),
+            'ph': np.full(len(comps), self.ph, dtype=float),
+            'be': np.array([comp.be for comp in comps], dtype=float),
+            'dpg': np.array([comp.dpg for comp in comps], dtype=float),
+            'temp': np.array([comp.temp for comp in comps], dtype=float),
+            # the po2 of the previous solution (converted to kPa) is the starting point of the newton method
+            'po2_start': np.array([comp.po2 for comp in comps], dtype=float) * 0.1333
+        }
+
+    def solve_oxygenation_arrays(self, inputs):
+        # solve the oxygenation of the gathered parameters of a batch of components with the constants of this blood model
+        result = solve_oxygenation(inputs['to2'], inputs['hemoglobin'], inputs['ph'], inputs['be'], inputs['dpg'], inputs['temp'], inputs['po2_start'],
+                                   self.left_o2, self.right_o2, self.mmoltoml, self.brent_accuracy, int(self.max_iterations))
+        self.steps = int(np.max(result['iterations'], initial = 0))
+        return result
+
+    def store_oxygenation(self, comps, result):
+        # store the po2 (converted to mmHg) and so2 in the components for which a po2 is found
+        solved = result['solved'].tolist()
+        po2 = (result['po2'] / 0.1333).tolist()
+        so2 = (result['so2'] * 100).tolist()
+        for index, comp in enumerate(comps):
+            comp.oxygenation_solves += 1
+            if solved[index]:
+                comp.po2 = po2[index]
+                comp.so2 = so2[index]
+
+    def get_odc_table(self):
+        # build the oxygen dissociation table the first time it's needed
+        if self.odc_table is None:
+            self.odc_table = OxygenDissociationTable(self.oxygenation_table_grid, self.mmoltoml, self.left_o2, self.right_o2, self.oxygenation_table_file)
+        return self.odc_table
+
+    def oxygenation_from_table(self, comps):
+        if len(comps) == 0:
+            return
+
+        # gather the for the oxygenation independent parameters from the components, the oxygen dissociation curve uses the ph of the blood model
+        to2 = np.array([comp.to2 for comp in comps], dtype=float)
+        hemoglobin = np.array([comp.hemoglobin for comp in comps], dtype=float)
+        be = np.array([comp.be for comp in comps], dtype=float)
+        dpg = np.array([comp.dpg for comp in comps], dtype=float)
+        temp = np.array([comp.temp for comp in comps], dtype=float)
+
+        # interpolate the po2 (in kPa) in the table and calculate the so2 at this po2
+        po2, inside = self.get_odc_table().lookup(to2, hemoglobin, shift_a(self.ph, be, dpg), temp)
+        so2, _ = oxygen_dissociation_curve(po2, self.ph, be, dpg, temp)
+
+        # store the po2 (converted to mmHg) and so2 in the components, the components outside the table are solved with the brent root finding
+        inside = inside.tolist()
+        po2 = (po2 / 0.1333).tolist()
+        so2 = (so2 * 100).tolist()
+        for index, comp in enumerate(comps):
+            if inside[index]:
+                comp.oxygenation_solves += 1
+                comp.po2 = po2[index]
+                comp.so2 = so2[index]
+            else:
+                self.oxygenation(comp)
+
+    def oxygenation_table_report(self, no_samples = 2000):
+        # compare the oxygen dissociation table with the root finding on random points within the grid of the table
+        return self.get_odc_table().accuracy_report(no_samples)
+
     def oxygen_content (self, po2_estimate):
         # calculate the saturation from the current po2 from the current po2 estimate
         self.so2 = self.oxygen_dissociation_curve(po2_estimate)
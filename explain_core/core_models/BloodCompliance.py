@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the unstressed volume and elastances are only recalculated when one of their baselines or multipliers is set
+@derived_inputs("u_vol", "u_vol_fac", "el_base", "el_base_fac", "el_k", "el_k_fac")
 class BloodCompliance:
     # this method is called when a new compliance is instantiated
     def __init__(self, model, **args):
@@ -26,6 +30,7 @@ class BloodCompliance:
         self.el_k = 0                           # holds the constant for the non-linear elastance function
         self.el_k_fac = 1.0                     # holds the non-linear elastance function factor multiplier
         self.compounds = {}                     # dictionary holding all the blood compounds
+        self.mobile_compounds = []              # names of the blood compounds which are not fixed and mix with the inflowing blood
     
         # set the values of the independent properties with the values from the JSON configuration file
         for key, value in args.items():
@@ -52,11 +57,15 @@ class BloodCompliance:
             self.calculate_pressure()
         
     def calculate_pressure (self):
+        # recalculate the unstressed volume and elastances when one of their baselines or multipliers is set
+        if self._derived_dirty:
+            self.update_derived()
+
         # calculate the volume above the unstressed volume
-        vol_above_unstressed = self.vol - (self.u_vol * self.u_vol_fac)
+        vol_above_unstressed = self.vol - self._u_vol_total
 
         # calculate the elastance, which is volume dependent in a non-linear way
-        elastance = (self.el_base * self.el_base_fac) + self.el_k * self.el_k_fac * pow(vol_above_unstressed, 2)
+        elastance = self._el_base_total + self._el_k_total * pow(vol_above_unstressed, 2)
         
         # if the volume is below the unstressed volume the compliance will collapse
         if (vol_above_unstressed < 0):
@@ -95,6 +104,14 @@ class BloodCompliance:
         self.analysis_counter += self.model.modeling_stepsize
         
         
+    def update_derived(self):
+        # calculate the unstressed volume and the elastances from their baselines and multipliers
+        self._u_vol_total = self.u_vol * self.u_vol_fac
+        self._el_base_total = self.el_base * self.el_base_fac
+        self._el_k_total = self.el_k * self.el_k_fac
+
+        self._derived_dirty = False
+
     def volume_in (self, dvol, comp_from):
         # this method is called when volume is added to this components
         if self.is_enabled:
@@ -103,10 +120,10 @@ class BloodCompliance:
         
         # mix the non-fixed blood compounds if the volume is not zero
         if (self.vol > 0):
-            for name, compound in self.compounds.items():
-                if not compound["fixed"]:
-                    d_compound = (comp_from.compounds[name]["conc"] - compound["conc"]) * dvol
-                    compound["conc"] = ((compound["conc"] * self.vol) + d_compound) / self.vol
+            for name in self.mobile_compounds:
+                compound = self.compounds[name]
+                d_compound = (comp_from.compounds[name]["conc"] - compound["conc"]) * dvol
+                compound["conc"] = ((compound["conc"] * self.vol) + d_compound) / self.vol
 
         # check whether this compliance has a mix attribute.
         if (self.vol > 0):
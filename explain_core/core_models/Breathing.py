@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the respiratory rate, target tidal volume and breath period are only recalculated when one of the parameters they depend on is set
+@derived_inputs("target_minute_volume", "vtrr_ratio", "spont_resp_rate", "spont_breathing_enabled")
 class Breathing:
     def __init__(self, model, **args):
         # initialize the super class
@@ -37,20 +41,21 @@ class Breathing:
         # get a reference to the rest of the model
         self.model = model
   
+    def link(self):
+        # get references to the chestwalls and the alveolar spaces when the model is loaded
+        self._targets = [self.model.components[target] for target in self.targets]
+        self._all = self.model.components["ALL"]
+        self._alr = self.model.components["ALR"]
+
     def model_step(self):
         if self.is_enabled:
             self.breathing_cycle()
             
 
     def breathing_cycle(self):
-        # determine the breathing timings
-        if self.spont_resp_rate > 0 and self.spont_breathing_enabled:
-            self._breath_timer_period = 60 / self.spont_resp_rate
-        else:
-            self._breath_timer_period = 60
-            
-        # calculate the respiratory rate depending on the target minute volume and the vt_rr ratio
-        self.vt_rr_controller()
+        # recalculate the respiratory rate and the breathing timings when one of their parameters is set
+        if self._derived_dirty:
+            self.update_derived()
         
         # is it time for a new breath yet?
         if (self._breath_timer_counter > self._breath_timer_period):
@@ -63,11 +68,11 @@ class Breathing:
             self.resp_muscle_pressure = 0
             
         # transfer the respiratory muscle force to the chestwalls
-        for target in self.targets:
-            self.model.components[target].pres_outside += self.resp_muscle_pressure
+        for target in self._targets:
+            target.pres_outside += self.resp_muscle_pressure
         
         # store the current volumes
-        volume = self.model.components["ALL"].vol + self.model.components["ALR"].vol
+        volume = self._all.vol + self._alr.vol
         
         if volume > self._temp_max_volume:
             self._temp_max_volume = volume
@@ -126,6 +131,18 @@ class Breathing:
          return (-self._amp * math.exp(-25.0 * (math.pow(self._breath_timer_counter - self.breath_duration / 2, 2) / math.pow(self.breath_duration, 2))));
 
     
+    def update_derived(self):
+        # calculate the respiratory rate depending on the target minute volume and the vt_rr ratio
+        self.vt_rr_controller()
+
+        # determine the breathing timings
+        if self.spont_resp_rate > 0 and self.spont_breathing_enabled:
+            self._breath_timer_period = 60 / self.spont_resp_rate
+        else:
+            self._breath_timer_period = 60
+
+        self._derived_dirty = False
+
     def vt_rr_controller(self):
         # calculate the spontaneous resp rate depending on the target minute volume (from ANS) and the set vt-rr ratio
         if (self.target_minute_volume < 0):
@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the unstressed volume and elastances are only recalculated when one of their baselines or multipliers is set
+@derived_inputs("u_vol", "u_vol_fac", "el_base", "el_base_fac", "el_k", "el_k_fac")
 class Container:
     def __init__(self, model, **args):
         # initialize the super class
@@ -31,19 +35,35 @@ class Container:
         # get a reference to the model
         self.model = model
   
+    def link(self):
+        # get references to the enclosed objects when the model is loaded
+        self._comps = [self.model.components[enclosed_object] for enclosed_object in self.comps]
+
     def model_step(self):
         if self.is_enabled:
             self.calculate_pressure()
 
+    def update_derived(self):
+        # calculate the unstressed volume and the elastances from their baselines and multipliers
+        self._u_vol_total = self.u_vol * self.u_vol_fac
+        self._el_base_total = self.el_base * self.el_base_fac
+        self._el_k_total = self.el_k * self.el_k_fac
+
+        self._derived_dirty = False
+
     def calculate_pressure(self):
         # first calculate the volume of the container
         self.vol = self.calculate_volume()
         
+        # recalculate the unstressed volume and elastances when one of their baselines or multipliers is set
+        if self._derived_dirty:
+            self.update_derived()
+
         # calculate the volume above the unstressed volume
-        vol_above_unstressed = self.vol - (self.u_vol * self.u_vol_fac)
+        vol_above_unstressed = self.vol - self._u_vol_total
 
         # calculate the elastance, which is volume dependent in a non-linear way
-        elastance = (self.el_base * self.el_base_fac) + (self.el_k * self.el_k_fac) * pow(vol_above_unstressed, 2)
+        elastance = self._el_base_total + self._el_k_total * pow(vol_above_unstressed, 2)
 
         # calculate pressure in the compliance
         self.recoil_pressure = vol_above_unstressed * elastance
@@ -59,15 +79,15 @@ class Container:
         
         # transfer the transmural pressures to the objects inside the container
         if (self.el_k != 1.0):
-            for enclosed_object in self.comps:
-                self.model.components[enclosed_object].pres_outside += self.pres
+            for enclosed_object in self._comps:
+                enclosed_object.pres_outside += self.pres
         
         
         
     def calculate_volume(self):
         # iterate over the enclosed objects to calculate the volumes
         volume = 0
-        for enclosed_object in self.comps:
-            volume += self.model.components[enclosed_object].vol
+        for enclosed_object in self._comps:
+            volume += enclosed_object.vol
             
         return volume
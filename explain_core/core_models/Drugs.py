@@ -5,6 +5,9 @@ class Drugs:
         # initialize the super class
         super().__init__()
         
+        # this model has no work to do in the model step so the model engine leaves it out of the step schedule
+        self.no_model_step = True
+        
         # set the independent properties
         for key, value in args.items():
             setattr(self, key, value)
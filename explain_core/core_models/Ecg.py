@@ -1,6 +1,23 @@
 import math
 
+import numpy as np
+
+from explain_core.helpers.derived import derived_inputs
+
+# number of points of the wave templates on the normalized time axis (0 = start of the interval, 1 = end of the interval)
+template_resolution = 1000
+
+# the waves of the ecg, the p wave is drawn in the pq time, the q, r and s waves in the qrs time and the t wave in the corrected qt time
+wave_names = ["p", "q", "r", "s", "t"]
+
+# the corrected qt time, the sa node period and the stretch of the wave templates are only recalculated when the heart rate, one of the
+# intervals or one of the wave parameters is set
+@derived_inputs("heart_rate", "qt_time", "qrs_time", "pq_time", *[f"{prop}_{wave}" for wave in wave_names for prop in ["amp", "width", "skew"]])
 class Ecg:
+  # the wave templates are rebuilt from the wave parameters and the ring buffer holds the output of the ecg like the collected data of the
+  # datacollector so they are not part of a snapshot, the restored ecg keeps its own templates and continues writing in its own buffer
+  snapshot_exclude = ("_wave_parameters", "_p_wave_template", "_qrs_wave_template", "_t_wave_template", "_ecg_buffer", "_ecg_buffer_length", "ecg_samples")
+
   def __init__(self, model, **args):
     # initialize the super class
     super().__init__()
@@ -32,6 +49,26 @@ class Ecg:
     self._qrs_wave_signal_counter = 0
     self._t_wave_signal_counter = 0
 
+    # wave parameters, every wave is a gaussian curve with height amp, width and the position of its peak at (1 - 1 / skew) of its interval
+    self.amp_p = 1.0
+    self.width_p = 20.0
+    self.skew_p = 2.5
+    self.amp_q = -0.5
+    self.width_q = 20.0
+    self.skew_q = 2.0
+    self.amp_r = 10.0
+    self.width_r = 20.0
+    self.skew_r = 2.5
+    self.amp_s = -1.5
+    self.width_s = 20.0
+    self.skew_s = 10.0
+    self.amp_t = 2.0
+    self.width_t = 25.0
+    self.skew_t = 2.0
+
+    # number of ecg samples (one per model step) the ring buffer holds
+    self.ecg_buffer_size = 10000
+
     # set the independent properties
     for key, value in args.items():
       setattr(self, key, value)
@@ -42,20 +79,22 @@ class Ecg:
     # get the modeling stepsize from the model
     self._t = model.modeling_stepsize
 
+    # the ecg signal of every model step is stored in a ring buffer, ecg_samples holds the number of samples written since the start
+    self._ecg_buffer_length = int(self.ecg_buffer_size)
+    self._ecg_buffer = [0.0] * self._ecg_buffer_length
+    self.ecg_samples = 0
+
+    # the wave parameters with which the wave templates were built
+    self._wave_parameters = None
+
   def model_step(self):
     if (self.is_enabled):
       self.model_cycle()
 
   def model_cycle(self):
-        # calculate the correct qt time
-        self.cqt_time = self.qtc() - self.qrs_time
-
-        # calculate the sa_node_time in seconds depending on the heart_rate
-        if self.heart_rate > 0:
-            self._sa_node_period = 60 / self.heart_rate
-        else:
-            self.heart_rate = 0
-            self._sa_node_period = 60
+        # recalculate the corrected qt time, the sa node period and the stretch of the wave templates when one of their parameters is set
+        if self._derived_dirty:
+            self.update_derived()
 
         # has the sa node period elapsed?
         if self._sa_node_counter > self._sa_node_period:
@@ -103,6 +142,9 @@ class Ecg:
             # signal that the ventricles are no longer in a refractory state
             self._ventricle_is_refractory = False
 
+        # the ecg signal is the sum of the waves which are drawn in this model step
+        self.ecg_signal = 0
+
         # increase the ecg timers
         # the sa node timer is always running
         self._sa_node_counter += self._t
@@ -139,10 +181,6 @@ class Ecg:
             # reset the t wave signal counter if qt is not running
             self._t_wave_signal_counter = 0
 
-        # if nothing is running, so there's no electrical activity then reset the ecg signal
-        if self._qt_running == False and self._qrs_running == False and self._qt_running == False:
-            self.ecg_signal = 0
-
         # calculate the measured heart_rate based on the ventricular rate every 5 seconds
         if self._measured_hr_time_counter > 5:
             self.measured_heart_rate = 60.0 / (self._measured_hr_time_counter / self._measured_qrs_counter)
@@ -156,6 +194,35 @@ class Ecg:
         self.ncc_atrial += 1
         self.ncc_ventricular += 1
 
+        # store the ecg signal in the ring buffer
+        self._ecg_buffer[self.ecg_samples % self._ecg_buffer_length] = self.ecg_signal
+        self.ecg_samples += 1
+
+  def update_derived(self):
+        # calculate the correct qt time
+        self.cqt_time = self.qtc() - self.qrs_time
+
+        # calculate the sa_node_time in seconds depending on the heart_rate
+        if self.heart_rate > 0:
+            self._sa_node_period = 60 / self.heart_rate
+        else:
+            self.heart_rate = 0
+            self._sa_node_period = 60
+
+        # the wave templates only depend on the wave parameters and are rebuilt when one of them changed. the intervals, which change with
+        # the heart rate, only set the scale with which the wave signal counter is stretched to the normalized time axis of the templates
+        wave_parameters = (self.amp_p, self.width_p, self.skew_p, self.amp_q, self.width_q, self.skew_q, self.amp_r, self.width_r, self.skew_r,
+                           self.amp_s, self.width_s, self.skew_s, self.amp_t, self.width_t, self.skew_t)
+        if wave_parameters != self._wave_parameters:
+            self._wave_parameters = wave_parameters
+            self.build_wave_templates()
+
+        self._p_wave_scale = self.template_scale(self.pq_time)
+        self._qrs_wave_scale = self.template_scale(self.qrs_time)
+        self._t_wave_scale = self.template_scale(self.cqt_time)
+
+        self._derived_dirty = False
+
   def qtc(self):
         # calculate the heart rate correct qt time
         if self.heart_rate > 10:
@@ -163,11 +230,66 @@ class Ecg:
         else:
             return self.qt_time * math.sqrt(60.0 / 10.0)
 
+  def build_wave_template(self, wave):
+        # the shape of a wave on the normalized time axis of its interval
+        x = np.linspace(0.0, 1.0, template_resolution)
+        amp = getattr(self, "amp_" + wave)
+        width = getattr(self, "width_" + wave)
+        skew = getattr(self, "skew_" + wave)
+        return amp * np.exp(-width * (x - (1.0 - 1.0 / skew)) ** 2)
+
+  def build_wave_templates(self):
+        # the templates of the p wave, the qrs complex (sum of the q, r and s waves) and the t wave
+        self._p_wave_template = self.build_wave_template("p").tolist()
+        self._qrs_wave_template = (self.build_wave_template("q") + self.build_wave_template("r") + self.build_wave_template("s")).tolist()
+        self._t_wave_template = self.build_wave_template("t").tolist()
+
+  def template_scale(self, duration):
+        # the number of template points per model step of an interval, a wave without duration falls outside its template at once
+        if duration > 0:
+            return (template_resolution - 1) * self._t / duration
+        return template_resolution
+
   def buildDynamicPWave(self):
-        pass
+        # look up the p wave signal in the p wave template
+        index = int(self._p_wave_signal_counter * self._p_wave_scale)
+        if index < template_resolution:
+            self.ecg_signal += self._p_wave_template[index]
 
   def buildQRSWave(self):
-        pass
+        # look up the qrs complex signal in the qrs wave template
+        index = int(self._qrs_wave_signal_counter * self._qrs_wave_scale)
+        if index < template_resolution:
+            self.ecg_signal += self._qrs_wave_template[index]
 
   def buildDynamicTWave(self):
-        pass
\ No newline at end of file
+        # look up the t wave signal in the t wave template
+        index = int(self._t_wave_signal_counter * self._t_wave_scale)
+        if index < template_resolution:
+            self.ecg_signal += self._t_wave_template[index]
+
+  def get_wave_tables(self):
+        # return the p wave, the qrs complex and the t wave as drawn in the model steps of the current intervals with their time axis
+        if self._derived_dirty:
+            self.update_derived()
+
+        tables = {}
+        for name, template, scale in [('p', self._p_wave_template, self._p_wave_scale), ('qrs', self._qrs_wave_template, self._qrs_wave_scale),
+                                      ('t', self._t_wave_template, self._t_wave_scale)]:
+            counters = np.arange(int(math.ceil(template_resolution / scale)))
+            indices = (counters * scale).astype(int)
+            indices = indices[indices < template_resolution]
+            tables[name] = {'time': np.arange(len(indices)) * self._t, 'signal': np.array(template)[indices]}
+        return tables
+
+  def read_ecg(self, position = 0):
+        # return the ecg samples written since the sample position and the position for the next read. when the ring buffer has been
+        # overwritten since the position only the samples which are still in the buffer are returned
+        position = max(position, self.ecg_samples - self._ecg_buffer_length, 0)
+        start = position % self._ecg_buffer_length
+        end = start + self.ecg_samples - position
+        if end <= self._ecg_buffer_length:
+            samples = self._ecg_buffer[start:end]
+        else:
+            samples = self._ecg_buffer[start:] + self._ecg_buffer[:end - self._ecg_buffer_length]
+        return np.array(samples), self.ecg_samples
\ No newline at end of file
@@ -23,6 +23,10 @@ class Ecls:
         self.gas_valve_out = {}
         self.flow_tim = 0
         
+    def link(self):
+        # get references to the ecls circuit components when the model is loaded
+        self.initialize()
+
     def model_step(self):
         if self.is_enabled:
             if self.initialized:
@@ -36,6 +40,10 @@ class Ecls:
         self.gas_out = self.model.components['ELGOUT']
         self.gas_valve_in = self.model.components['ELGIN_ELUNG']
         self.gas_valve_out = self.model.components['ELUNG_ELGOUT']
+        self.pump_in = self.model.components['PUMPIN']
+        self.pump_out = self.model.components['PUMPOUT']
+        self.pump_out_suct = self.model.components['PUMPOUT_SUCT']
+        self.suct = self.model.components['SUCT']
         
         self.initialized = True
     
@@ -47,9 +55,9 @@ class Ecls:
         self.gas_valve_in.r_for = resistance
         self.gas_valve_in.r_back = resistance
         
-        self.model.components['PUMPOUT'].pres_outside = 100.0
-        self.model.components['PUMPIN'].pres_outside = -100.0
-        flow_out = self.model.components['PUMPOUT_SUCT'].flow
+        self.pump_out.pres_outside = 100.0
+        self.pump_in.pres_outside = -100.0
+        flow_out = self.pump_out_suct.flow
         self.flow_tim = flow_out
-        self.model.components['PUMPIN'].volume_out(flow_out * self.model.modeling_stepsize, self.model.components['SUCT'])
+        self.pump_in.volume_out(flow_out * self.model.modeling_stepsize, self.suct)
         
@@ -43,6 +43,10 @@ class Effector:
 
       self._initialized = True
 
+    def link(self):
+      # get references to the sensor and effect site models when the model is loaded
+      self.initialize()
+
     def model_step(self):
       if self.is_enabled:
         self.effector_activity() 
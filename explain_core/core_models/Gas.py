@@ -1,10 +1,16 @@
 import math
 
+import numpy as np
+
+from explain_core.helpers.gasspecies import bind_species
+
 class Gas:
     def __init__(self, model, **args):
         # initialize the super class
         super().__init__()
         
+        # this model has no work to do in the model step so the model engine leaves it out of the step schedule
+        self.no_model_step = True
 
         # define dictionaries for the independent variables
         self.temp_settings = {}
@@ -17,6 +23,10 @@ class Gas:
         
         # get a reference to the whole model
         self.model = model
+
+        # the gas species and their dry fractions in the order of the dry_gas_fractions
+        self.gas_species = list(self.dry_gas_fractions)
+        self.dry_fractions = np.array([self.dry_gas_fractions[species] for species in self.gas_species], dtype=float)
         
         # now transform the components with content gas into gas components
         for comp_name, comp in model.components.items():
@@ -44,38 +54,30 @@ class Gas:
                     
                     # we can now calculate the h2o corrected fractions of the other gasses as the total of fractions should 1.0
 
-                    # initialize the gas object with the wet air composition fractions (as a starting condition)
-                    for compound, value in self.dry_gas_fractions.items():
-                        # set the fraction
-                        setattr(comp, "f" + compound, value * (1.0 - comp.fh2o))
-                        # print(f'f{compound} = {value * (1.0 - comp.fh2o)}')
-                                        
-                        # calculate the concentration of the compound in the dry part of the gas
-                        setattr(comp, "c" + compound, value * (1.0 - comp.fh2o) * comp.c_total)
-                                        
-                        # calculate the partial pressure of the gas compound
-                        setattr(comp, "p" + compound, value * (1.0 - comp.fh2o) * self.p_atm )
-                        
-                    sum_f_wet = comp.fh2o + comp.fo2 + comp.fco2 + comp.fn2 + comp.fargon
-                    sum_c_wet = comp.ch2o + comp.co2 + comp.cco2 + comp.cn2 + comp.cargon  
+                    # initialize the gas object with the wet air composition fractions (as a starting condition). the composition is stored as
+                    # vectors over the gas species so the mixing, humidification and gas exchange don't depend on the number of gas species
+                    wet_composition = {
+                        "f": self.dry_fractions * (1.0 - comp.fh2o),
+                        "c": self.dry_fractions * (1.0 - comp.fh2o) * comp.c_total,
+                        "p": self.dry_fractions * (1.0 - comp.fh2o) * self.p_atm
+                    }
+                    
+                    # components which derive a species vector from their dry fractions (e.g. the gas compliance) don't store it
+                    for name, values in wet_composition.items():
+                        if name not in getattr(comp, 'derived_species', ()):
+                            setattr(comp, name, values)
                     
                     # dry air part
                     # comp.c_total_dry = comp.c_total - comp.ch2o
                     comp.c_total_dry = (self.p_atm / (comp.gas_constant * (273.15 + comp.temp))) * 1000
                     
-                    for compound, value in self.dry_gas_fractions.items():
-                        # set the fraction
-                        setattr(comp, "f" + compound + "_dry", value)
-                        # print(f'f{compound}_dry = {value}')
-                                        
-                        # calculate the concentration of the compound in the dry part of the gas
-                        setattr(comp, "c" + compound + "_dry", value * comp.c_total_dry)
-                                        
-                        # calculate the partial pressure of the gas compound
-                        setattr(comp, "p" + compound + "_dry", value * self.p_atm )
-                    
-                    sum_f_dry = comp.fo2_dry + comp.fco2_dry + comp.fn2_dry + comp.fargon_dry
-                    sum_c_dry = comp.co2_dry + comp.cco2_dry + comp.cn2_dry + comp.cargon_dry
+                    # set the dry fractions and calculate the concentrations and partial pressures of the dry gas species
+                    comp.f_dry = self.dry_fractions.copy()
+                    comp.c_dry = self.dry_fractions * comp.c_total_dry
+                    comp.p_dry = self.dry_fractions * self.p_atm
+
+                    # make the gas species available under their own names (e.g. fo2_dry, po2 and cco2)
+                    bind_species(comp, self.gas_species)
                     
     def model_step(self):
         pass
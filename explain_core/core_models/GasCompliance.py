@@ -1,6 +1,14 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the unstressed volume and elastances are only recalculated when one of their baselines or multipliers is set and the water vapour
+# pressure only when the temperature is set
+@derived_inputs("u_vol", "u_vol_fac", "el_base", "el_base_fac", "el_k", "el_k_fac", "temp")
 class GasCompliance:
+    # the species vectors which the gas compliance derives from its dry fractions instead of storing them
+    derived_species = ("f", "c")
+
     # this method is called when a new compliance is instantiated
     def __init__(self, model, **args):
         # initialize the super class
@@ -39,12 +47,27 @@ class GasCompliance:
         if (self.is_enabled):
             self.calculate_pressure()
         
+    def update_derived(self):
+        # calculate the unstressed volume and the elastances from their baselines and multipliers
+        self._u_vol_total = self.u_vol * self.u_vol_fac
+        self._el_base_total = self.el_base * self.el_base_fac
+        self._el_k_total = self.el_k * self.el_k_fac
+
+        # calculate the ph2o depending on the temperature
+        self.ph2o = self.calculate_water_vapour_pressure(self.temp)
+
+        self._derived_dirty = False
+
     def calculate_pressure (self):
+        # recalculate the unstressed volume, elastances and water vapour pressure when one of their inputs is set
+        if self._derived_dirty:
+            self.update_derived()
+
         # calculate the volume above the unstressed volume
-        vol_above_unstressed = self.vol - self.u_vol * self.u_vol_fac
+        vol_above_unstressed = self.vol - self._u_vol_total
 
         # calculate the elastance, which is volume dependent in a non-linear way
-        elastance = self.el_base * self.el_base_fac + self.el_k * self.el_k_fac * pow(vol_above_unstressed, 2)
+        elastance = self._el_base_total + self._el_k_total * pow(vol_above_unstressed, 2)
         
         # calculate the recoil pressure in the compliance due to the elastacity of the compliance
         self.recoil_pressure = (vol_above_unstressed * elastance) 
@@ -64,31 +87,26 @@ class GasCompliance:
         # calculate the concentration of molecules in the gas object at the current pressure, volume and temperature using the gas law
         self.c_total = (self.pres / (self.gas_constant * (273.15 + self.temp))) * 1000
             
-        # calculate the ph2o depending on the temperature
-        self.ph2o = self.calculate_water_vapour_pressure(self.temp)
-            
-        # calculate the fh2o depending on the pressure
+        # calculate the fh2o depending on the pressure (the ph2o depends on the temperature and is calculated in update_derived)
         self.fh2o = self.ph2o / self.pres
+        wet = 1 - self.fh2o
             
-        # calculate the wet fractions from the fh2o and the dry fractions
-        self.fo2 = self.fo2_dry * (1 - self.fh2o)
-        self.fco2 = self.fco2_dry * (1 - self.fh2o)
-        self.fn2 = self.fn2_dry * (1 - self.fh2o)
-        self.fargon = self.fargon_dry * (1 - self.fh2o)
-            
-        # calculate the partial pressures
-        self.po2 = self.fo2 * (1 - self.fh2o) * self.pres
-        self.pco2 = self.fco2 * (1 - self.fh2o) * self.pres
-        self.pn2 = self.fn2 * (1 - self.fh2o) * self.pres
-        self.pargon = self.fargon * (1 - self.fh2o) * self.pres
-            
-        # calculate the concentrations
-        self.co2 = self.fo2 * (1 - self.fh2o) * self.c_total
-        self.cco2 = self.fco2 * (1 - self.fh2o) * self.c_total
-        self.cn2 = self.fn2 * (1 - self.fh2o) * self.c_total
-        self.cargon = self.fargon * (1 - self.fh2o) * self.c_total    
+        # calculate the partial pressures of all gas species from the fh2o and the dry fractions, the wet fractions and concentrations
+        # are only calculated when they are read
+        self.p = self.f_dry * (wet * wet * self.pres)
             
 
+    @property
+    def f(self):
+        # the wet fractions of all gas species
+        return self.f_dry * (1 - self.fh2o)
+
+    @property
+    def c(self):
+        # the concentrations of all gas species
+        wet = 1 - self.fh2o
+        return self.f_dry * (wet * wet * self.c_total)
+
     def volume_in (self, dvol, comp_from):
         # this method is called when volume is added to this components
         if self.is_enabled and not self.fixed_composition:
@@ -96,17 +114,8 @@ class GasCompliance:
             self.vol += dvol
  
         if (self.vol > 0 and not self.fixed_composition):
-            dfo2_dry = (comp_from.fo2_dry - self.fo2_dry) * dvol
-            self.fo2_dry = ((self.fo2_dry * self.vol) + dfo2_dry) / self.vol
-        
-            dfco2_dry = (comp_from.fco2_dry - self.fco2_dry) * dvol
-            self.fco2_dry = ((self.fco2_dry * self.vol) + dfco2_dry) / self.vol
-        
-            dfn2_dry = (comp_from.fn2_dry - self.fn2_dry) * dvol
-            self.fn2_dry = ((self.fn2_dry * self.vol) + dfn2_dry) / self.vol
-        
-            dfargon_dry = (comp_from.fargon_dry - self.fargon_dry) * dvol
-            self.fargon_dry = ((self.fargon_dry * self.vol) + dfargon_dry) / self.vol
+            # mix the dry fractions of all gas species with the dry fractions of the incoming gas
+            self.f_dry += (comp_from.f_dry - self.f_dry) * (dvol / self.vol)
             
         # guard against negative volumes (will probably never occur in this routine)
         return self.protect_mass_balance
@@ -120,20 +129,12 @@ class GasCompliance:
         # guard against negative volumes (will probably never occur in this routine)
         return self.protect_mass_balance
         
-    def exchange_gas(self, flux_o2, flux_co2):
-        # flux unit is in mmol so have to find a way to substract or add this to the gas and then we have to calculate back to the fo2_dry!
+    def exchange_gas(self, flux):
+        # flux holds the flux of every gas species in mmol so have to find a way to substract or add this to the gas and then we have to calculate back to the dry fractions!
         
-        # calculate the wet fo2
-        self.fo2 = self.fo2_dry * (1 - self.fh2o)
-        self.fco2 = self.fco2_dry * (1 - self.fh2o)
-        
-        # convert the wet fo2 to mmol O2, add the flux O2 and convert back to fo2
-        new_fo2 = (((self.fo2 * self.c_total * self.vol) + flux_o2) / self.vol) / self.c_total
-        new_fco2 = (((self.fco2 * self.c_total * self.vol) + flux_co2) / self.vol) / self.c_total
-
-        # calculate back to the dry fo2
-        self.fo2_dry = new_fo2 / (1 - self.fh2o)
-        self.fco2_dry = new_fco2 / (1 - self.fh2o)
+        # convert the flux in mmol to a change of the wet fractions (mmol / (volume * c_total)) and calculate back to the change of the dry fractions.
+        # the dry fractions are changed in place so the species without a flux keep their dry fraction exactly
+        self.f_dry += flux / (self.vol * self.c_total * (1 - self.fh2o))
 
     def protect_mass_balance (self):
         if (self.vol < 0):
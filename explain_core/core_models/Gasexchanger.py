@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 class Gasexchanger:
     def __init__(self, model, **args):
         # initialize the super class
@@ -17,9 +19,8 @@ class Gasexchanger:
         
         self.initialized = False
         
-        self.update_interval = 0.015
-        self.update_counter = 0
-        self.modeling_stepsize = 0.0005
+        # the gas fluxes are calculated per model step so the gas exchanger is stepped every model step
+        self.update_interval = self.model.modeling_stepsize
         
         self.dif_o2_fac = 1.0
         self.dif_co2_fac = 1.0
@@ -37,6 +38,11 @@ class Gasexchanger:
         # activate the oxygenation and acidbase capabilities of the compartments
         self.comp_blood.oxy_enabled = True
         self.comp_blood.acidbase_enabled = True
+
+        # the gas compartment exchanges its gas species as a vector of fluxes, only the o2 and co2 fluxes are non-zero
+        self._flux = np.zeros(len(self.comp_gas.gas_species))
+        self._o2_index = self.comp_gas.gas_species.index("o2")
+        self._co2_index = self.comp_gas.gas_species.index("co2")
         
         self.modeling_interval = self.model.modeling_stepsize
         self.initialized = True
@@ -58,7 +64,9 @@ class Gasexchanger:
         self.comp_blood.tco2 = new_tco2
         
         # change the oxygen and co2 content of the gas_compartment
-        self.comp_gas.exchange_gas(self.flux_o2, self.flux_co2)
+        self._flux[self._o2_index] = self.flux_o2
+        self._flux[self._co2_index] = self.flux_co2
+        self.comp_gas.exchange_gas(self._flux)
             
 
 
@@ -1,6 +1,17 @@
 import math
 
+import numpy as np
+
+# number of points of the activation templates on the normalized time axis (0 = start of the contraction, 1 = end of the contraction)
+template_resolution = 10000
+
+# a contraction lasts while the template index is below the last point of the template (contraction counter < duration / step size)
+template_end = template_resolution - 1
+
 class Heart:
+    # the activation templates only depend on constants and are built when the heart is created so they are not part of a snapshot
+    snapshot_exclude = ("_aaf_template", "_vaf_template")
+
     def __init__(self, model, **args):
         # initialize the super class
         super().__init__()
@@ -32,75 +43,103 @@ class Heart:
         # set the contractility factor
         self.cont_factor = 1.0
 
+        # the shapes of the activation functions on the normalized time axis of the contraction
+        self.build_activation_templates()
+
+    def link(self):
+        # get references to the ecg model and the heart compartments when the model is loaded
+        self.ecg_model = self.model.components['ecg']
+        self._atria = [self.model.components[name] for name in self.right_atrium + self.left_atrium]
+        self._ventricles = [self.model.components[name] for name in self.right_ventricle + self.left_ventricle + self.coronaries]
+
+        # the stretch of the activation templates is set and the activation functions are pushed to the heart compartments in the next model step
+        self._atrial_duration = None
+        self._ventricular_duration = None
+
     def model_step(self):
         if (self.is_enabled):
             self.model_cycle()
 
     def model_cycle(self):
-        self.ecg_model = self.model.components['ecg']
-
         # get the relevant timings from the ecg model
-        ncc_atrial = self.ecg_model.ncc_atrial
         atrial_duration = self.ecg_model.pq_time
-        ncc_ventricular = self.ecg_model.ncc_ventricular
         ventricular_duration = (self.ecg_model.cqt_time + self.ecg_model.qrs_time)
 
-        # varying elastance activation function of the atria
-        if ncc_atrial >= 0 and (ncc_atrial < atrial_duration / self._t):
-            # the atrial activation curve consists of two gaussian curves on top of each other
-            # gaussian curve => y = a * exp(-((t - b) / c)^2) where
-            # a = height
-            # b = position of the peak
-            # c = atrial duration
-
-            a = 1.0
-            b = 0.5 * atrial_duration
-            c = 0.2 * atrial_duration
-            t = ncc_atrial * self._t
-            
-            self.aaf = a * math.exp(-math.pow((t - b) / c, 2))
-
-        # varying elastance activation function of the ventricles
-        if ncc_ventricular >= 0 and (ncc_ventricular < ventricular_duration / self._t):
-            # the ventricular activation curve consists of two gaussian curves on top of each other
-            # gaussian curve => y = a * exp(-((t - b) / c)^2) where
-            # a = height
-            # b = position of the peak
-            # c = atrial duration
-
-            a1 = 0.5
-            b1 = 0.5 * ventricular_duration
-            c1 = 0.2 * ventricular_duration
-            
-            a2 = 0.59
-            b2 = 0.6 * ventricular_duration
-            c2 = 0.13 * ventricular_duration
-            
-            t = ncc_ventricular * self._t
-            vaf1 = a1 * math.exp(-math.pow((t - b1) / c1, 2))
-            vaf2 = a2 * math.exp(-math.pow((t - b2) / c2, 2))
-            
-            self.vaf = vaf1 + vaf2
-
-            # set the state as systolic
-            self.state = 1
-        else:
-            # set the state as diastolic
-            self.state = 0
-
-        # transfer the activation function to the heart compartments and the coronaries
-        for ra in self.right_atrium:
-            self.model.components[ra].varying_elastance_factor = self.aaf
-
-        for la in self.left_atrium:
-            self.model.components[la].varying_elastance_factor = self.aaf
-
-        for rv in self.right_ventricle:
-            self.model.components[rv].varying_elastance_factor = self.vaf
-
-        for lv in self.left_ventricle:
-            self.model.components[lv].varying_elastance_factor = self.vaf
-
-        for cor in self.coronaries:
-            self.model.components[cor].varying_elastance_factor = self.vaf
-    
+        # the ecg timings (and the heart rate on which the corrected qt time depends) only stretch the activation templates
+        if atrial_duration != self._atrial_duration or ventricular_duration != self._ventricular_duration:
+            self.set_durations(atrial_duration, ventricular_duration)
+
+            # transfer the current activation functions to the heart compartments as they may not have them yet
+            self.transfer_activation(self._atria, self.aaf)
+            self.transfer_activation(self._ventricles, self.vaf)
+
+        # varying elastance activation function of the atria, looked up in the atrial template by the atrial contraction counter of the ecg model
+        ncc_atrial = self.ecg_model.ncc_atrial
+        if ncc_atrial >= 0:
+            index = int(ncc_atrial * self._atrial_scale)
+            if index < template_end:
+                self.aaf = self._aaf_template[index]
+
+                # transfer the activation function to the atria, outside the activation the activation function doesn't change
+                self.transfer_activation(self._atria, self.aaf)
+
+        # varying elastance activation function of the ventricles, looked up in the ventricular template by the ventricular contraction counter
+        ncc_ventricular = self.ecg_model.ncc_ventricular
+        self.state = 0
+        if ncc_ventricular >= 0:
+            index = int(ncc_ventricular * self._ventricular_scale)
+            if index < template_end:
+                self.vaf = self._vaf_template[index]
+
+                # transfer the activation function to the ventricles and the coronaries
+                self.transfer_activation(self._ventricles, self.vaf)
+
+                # set the state as systolic
+                self.state = 1
+
+    def transfer_activation(self, comps, factor):
+        for comp in comps:
+            comp.varying_elastance_factor = factor
+
+    def build_activation_templates(self):
+        # the activation functions on the normalized time axis x = time since the start of the contraction / duration of the contraction
+        x = np.linspace(0.0, 1.0, template_resolution)
+
+        # the atrial activation curve is a gaussian curve
+        # gaussian curve => y = a * exp(-((t - b) / c)^2) where
+        # a = height
+        # b = position of the peak (fraction of the atrial duration)
+        # c = width (fraction of the atrial duration)
+        self._aaf_template = (1.0 * np.exp(-((x - 0.5) / 0.2) ** 2)).tolist()
+
+        # the ventricular activation curve consists of two gaussian curves on top of each other
+        self._vaf_template = (0.5 * np.exp(-((x - 0.5) / 0.2) ** 2) + 0.59 * np.exp(-((x - 0.6) / 0.13) ** 2)).tolist()
+
+    def template_scale(self, duration):
+        # the number of template points per step of the contraction counter, a contraction without duration falls outside its template at once
+        if duration > 0:
+            return template_end * self._t / duration
+        return template_resolution
+
+    def set_durations(self, atrial_duration, ventricular_duration):
+        # stretch the activation templates to the durations of the atrial and ventricular contraction, a contraction lasts for the
+        # counters 0 <= ncc < duration / t
+        self._atrial_duration = atrial_duration
+        self._ventricular_duration = ventricular_duration
+        self._atrial_scale = self.template_scale(atrial_duration)
+        self._ventricular_scale = self.template_scale(ventricular_duration)
+
+    def get_activation_curves(self):
+        # return the current atrial and ventricular activation curves as looked up in the model steps of a contraction with their time axis
+        # (in seconds from the start of the contraction)
+        if self._atrial_duration is None:
+            self.set_durations(self.ecg_model.pq_time, self.ecg_model.cqt_time + self.ecg_model.qrs_time)
+
+        curves = {}
+        for name, template, scale in [('atrial', self._aaf_template, self._atrial_scale), ('ventricular', self._vaf_template, self._ventricular_scale)]:
+            counters = np.arange(int(math.ceil(template_end / scale)))
+            indices = (counters * scale).astype(int)
+            indices = indices[indices < template_end]
+            curves[name + '_time'] = np.arange(len(indices)) * self._t
+            curves['aaf' if name == 'atrial' else 'vaf'] = np.array(template)[indices]
+        return curves
@@ -21,6 +21,11 @@ class IntrathoracicPressure:
         # get the modeling stepsize from the model
         self.t = model.modeling_stepsize
         
+    def link(self):
+        # get references to the sources and targets when the model is loaded
+        self._sources = [self.model.components[source] for source in self.sources]
+        self._targets = [(self.model.components[target], value) for target, value in self.targets.items()]
+
     # this method is called by the model engine in every model step
     def model_step (self):
         # during every model step the transmural pressure is calculates
@@ -32,12 +37,12 @@ class IntrathoracicPressure:
         cum_pres = 0
         counter = 0
         
-        for source in self.sources:
-            cum_pres += self.model.components[source].pres
+        for source in self._sources:
+            cum_pres += source.pres
             counter +=1
     
         self.pres = cum_pres / counter
             
         # apply the mean intrathoracic pressure to the targets
-        for target, value in self.targets.items():
-            self.model.components[target].pres_itp = (value * self.pres)
\ No newline at end of file
+        for target, value in self._targets:
+            target.pres_itp = (value * self.pres)
\ No newline at end of file
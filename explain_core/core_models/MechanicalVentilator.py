@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the expiration time is only recalculated when the frequency or the inspiration time is set
+@derived_inputs("freq", "t_in")
 class MechanicalVentilator:
     def __init__(self, model, **args):
         # initialize the super class
@@ -82,6 +86,16 @@ class MechanicalVentilator:
         self.hfov_pres = 0
         self.hfov_counter = 0
         
+    def link(self):
+        # get references to the ventilator circuit components which are used during every model step when the model is loaded
+        self.insp_valve = self.model.components['VENT_INSP_VALVE']
+        self.exp_valve = self.model.components['VENT_EXP_VALVE']
+        self.ypiece_nca = self.model.components['YPIECE_NCA']
+        self.ypiece = self.model.components['YPIECE']
+        self.nca = self.model.components['NCA']
+        self.ventin = self.model.components['VENTIN']
+        self.ventout = self.model.components['VENTOUT']
+
     def model_step(self):
         if self.is_enabled:
             self.model_cycle()
@@ -89,20 +103,16 @@ class MechanicalVentilator:
     def model_cycle(self):
         # get the model stepsize
         self.t = self.model.modeling_stepsize
-        
-        # get a reference to the in- and expiration valves
-        self.insp_valve = self.model.components['VENT_INSP_VALVE']
-        self.exp_valve = self.model.components['VENT_EXP_VALVE']
 
         # get the ventilator sensory inputs
-        flow = self.model.components['YPIECE_NCA'].flow * 60.0
+        flow = self.ypiece_nca.flow * 60.0
         if (flow > 0):
             self.sensor_insp_flow = flow
         
         self.sensor_flow = flow
-        self.sensor_pressure = (self.model.components['YPIECE'].pres) - self.p_atm    # in mmHg
-        self.sensor_volume += self.model.components["YPIECE_NCA"].flow * self.t     # in l
-        self.sensor_co2 = self.model.components["NCA"].pco2
+        self.sensor_pressure = (self.ypiece.pres) - self.p_atm    # in mmHg
+        self.sensor_volume += self.ypiece_nca.flow * self.t     # in l
+        self.sensor_co2 = self.nca.pco2
         
         # ventilator mode
         if self.ventilator_mode == 0:
@@ -119,7 +129,7 @@ class MechanicalVentilator:
         # check whether there's an inspiration
         if (self.inspiration): 
             # increase the inspiratory tidal volume counter
-            self.inspiratory_tidal_volume_counter += self.model.components['VENT_INSP_VALVE'].flow * self.t
+            self.inspiratory_tidal_volume_counter += self.insp_valve.flow * self.t
             
             # find the peak pressure
             if self.sensor_pressure > self.peak_pressure_temp:
@@ -131,7 +141,7 @@ class MechanicalVentilator:
         #check whether there's an expiration
         if (self.expiration):
             # increase the exhaled tidal volume
-            self.expiratory_tidal_volume_counter += self.model.components['VENT_EXP_VALVE'].flow * self.t
+            self.expiratory_tidal_volume_counter += self.exp_valve.flow * self.t
             
             # increase the expiration timer
             self.expiration_counter += self.t
@@ -150,11 +160,11 @@ class MechanicalVentilator:
         self.exp_valve.no_flow = False
         # open the valve and set the mean airway pressure
         self.exp_valve.r_for = 10
-        self.model.components['VENTOUT'].vol = (self.peep / self.model.components['VENTOUT'].el_base) + self.model.components['VENTOUT'].u_vol
+        self.ventout.vol = (self.peep / self.ventout.el_base) + self.ventout.u_vol
         
         # apply the bias flow, open the inspiratory flow
         self.insp_valve.no_flow = False
-        self.insp_valve.r_for = (self.model.components['VENTIN'].pres - self.model.components['VENTOUT'].pres) / (self.inspiratory_flow / 60)
+        self.insp_valve.r_for = (self.ventin.pres - self.ventout.pres) / (self.inspiratory_flow / 60)
         
         # add additional pressure to the YPIECE
         # apply the sinusoid inspiration
@@ -165,7 +175,7 @@ class MechanicalVentilator:
         self.hfov_counter += stepsize
         if self.hfov_counter > 2 * math.pi:
             self.hfov_counter = 0
-        self.model.components['YPIECE'].pres_outside = signal
+        self.ypiece.pres_outside = signal
         
         
                     
@@ -240,7 +250,7 @@ class MechanicalVentilator:
             
             # open the inspiration valve and set the driving pressure
             self.insp_valve.no_flow = False
-            self.model.components['VENTIN'].vol = (2500 / self.model.components['VENTIN'].el_base) + self.model.components['VENTIN'].u_vol
+            self.ventin.vol = (2500 / self.ventin.el_base) + self.ventin.u_vol
             
             # check whether the pip has been reached
             if self.sensor_pressure >= self.pip and not self.pc_pip_reached:
@@ -255,7 +265,7 @@ class MechanicalVentilator:
                 self.pressure_limiter(self.pip, self.insp_valve, 5)
             else:
                 # calculate the inspiratory flow
-                self.insp_valve.r_for = (self.model.components['VENTIN'].pres - self.model.components['VENTOUT'].pres) / (self.inspiratory_flow / 60)
+                self.insp_valve.r_for = (self.ventin.pres - self.ventout.pres) / (self.inspiratory_flow / 60)
                 
         if self.expiration:
             # reset the pip flag
@@ -268,7 +278,7 @@ class MechanicalVentilator:
             self.exp_valve.no_flow = False
             self.exp_valve.r_for = 10
             
-            self.model.components['VENTOUT'].vol = (self.peep / self.model.components['VENTOUT'].el_base) + self.model.components['VENTOUT'].u_vol
+            self.ventout.vol = (self.peep / self.ventout.el_base) + self.ventout.u_vol
             
 #             # check whether the peep has been reached
 #             if (self.sensor_pressure <= self.peep):
@@ -320,7 +330,7 @@ class MechanicalVentilator:
         self.error_int_peep = 0
         
     def peep_valve(self):
-        self.model.components['VENTOUT'].vol = (self.peep / self.model.components['VENTOUT'].el_base) + self.model.components['VENTOUT'].u_vol
+        self.ventout.vol = (self.peep / self.ventout.el_base) + self.ventout.u_vol
         
         # error calculator
         self.error_peep = self.sensor_pressure - self.peep
@@ -351,8 +361,9 @@ class MechanicalVentilator:
             self.time_cycling()
     
     def time_cycling(self):
-        # determine the expiration time
-        self.t_ex = (60.0 / self.freq) - self.t_in
+        # determine the expiration time when the frequency or inspiration time is set
+        if self._derived_dirty:
+            self.update_derived()
         
         # check the cycling times
         if self.inspiration_counter > self.t_in:
@@ -361,6 +372,12 @@ class MechanicalVentilator:
         if self.expiration_counter > self.t_ex:
             self.begin_inspiration()            
             
+    def update_derived(self):
+        # determine the expiration time
+        self.t_ex = (60.0 / self.freq) - self.t_in
+
+        self._derived_dirty = False
+
     def begin_inspiration(self):
         # determine the ventilator frequency
         self.measured_freq = 60 / self.measured_freq_counter
@@ -370,7 +387,7 @@ class MechanicalVentilator:
         self.exhaled_minute_volume = self.measured_freq * self.expiratory_tidal_volume
         
         # determine the end-tidal co2
-        self.sensor_etco2 = self.model.components['NCA'].pco2
+        self.sensor_etco2 = self.nca.pco2
         
         # reset the counters
         self.expiration_counter = 0
@@ -435,6 +452,9 @@ class MechanicalVentilator:
         self.model.components['OUT_NCA'].is_enabled = not state
         self.model.components['OUT_NCA'].no_flow = state
         self.model.components['breathing'].is_enabled = not state
+        
+        # the step schedule of the model has to be rebuilt as components are enabled or disabled
+        self.model.invalidate_schedule()
     
     def set_ventilator_settings(self, mode="pc", freq=30, tidal=16, insp_time=0.4, insp_flow=8, max_pip=20, peep=5, fio2=0.21):
         self.freq = freq
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 class Metabolism:
     def __init__(self, model, **args):
         # initialize the super class
@@ -27,6 +29,10 @@ class Metabolism:
             {  "comp": "AD", "fvatp": 0.01 }
          ]
 
+        # in the vectorized hydraulics mode the active components are updated with one array expression on the hydraulics arrays when there
+        # are at least this many, below it the loop over the components is faster (see bench_metabolism in benchmarks/run_benchmarks.py)
+        self.vectorize_threshold = 16
+
         # fill the properties with the values from the JSON configuration file
         for key, value in args.items():
             setattr(self, key, value)
@@ -34,26 +40,66 @@ class Metabolism:
         # get a reference to the model
         self.model = model
   
+    def link(self):
+        # get references to the active components and their fractional atp use when the model is loaded
+        self._active_comps = [(self.model.components[active_comp["comp"]], active_comp["fvatp"]) for active_comp in self.active_comps]
+        self._fvatp = np.array([active_comp["fvatp"] for active_comp in self.active_comps], dtype=float)
+
+        # in the vectorized hydraulics mode the volumes and concentrations of the active components are read from and written to the
+        # arrays of the hydraulics core directly by their index when there are enough active components
+        hydraulics = self.model.hydraulics
+        if hydraulics is not None and len(self._active_comps) >= self.vectorize_threshold and all(comp in hydraulics.compliances for comp, _ in self._active_comps):
+            self._hydraulics = hydraulics
+            self._indices = np.array([hydraulics.compliances.index(comp) for comp, _ in self._active_comps], dtype=int)
+            self._to2_column = hydraulics.species.index("to2")
+            self._tco2_column = hydraulics.species.index("tco2")
+        else:
+            self._hydraulics = None
+
     def model_step(self):
         if self.is_enabled:
-            for active_comp in self.active_comps:
-                self.calculate_energy_use(active_comp)
-    
-    def calculate_energy_use(self, active_comp):
-        # store a reference to the component
-        comp = self.model.components[active_comp["comp"]]
-        
-        # find the stored fractional atp use
-        fvatp = active_comp["fvatp"]
-        
+            if self._hydraulics is not None:
+                # get the volumes and concentrations of the active components from the hydraulics arrays
+                conc = self._hydraulics.conc
+                vol = self._hydraulics.vol[self._indices]
+                to2, tco2 = self.calculate_energy_use(vol, conc[self._indices, self._to2_column], conc[self._indices, self._tco2_column])
+                conc[self._indices, self._to2_column] = to2
+                conc[self._indices, self._tco2_column] = tco2
+            else:
+                for comp, fvatp in self._active_comps:
+                    self.calculate_comp_energy_use(comp, fvatp)
+
+    def calculate_comp_energy_use(self, comp, fvatp):
+        # calculate the new to2 and tco2 of one active component, the same calculation as calculate_energy_use
+
+        # get the number of oxygen molecules available in this active compartment in mmol, 80% of these molecules are available for use
+        vol = comp.vol
+        o2_molecules_available = comp.to2 * vol
+        o2_molecules_available_for_use = 0.8 * o2_molecules_available
+
+        # how many molecules o2 do we need to burn in this step as 1 mmol of o2 gives 5 mmol of ATP when processed by oxydative phosphorylation
+        o2_to_burn = fvatp * self.atp_need * self.model.modeling_stepsize / 5.0
+
+        # burn the required amount of o2 molecules, if we need to burn more than we have then burn all available o2 molecules
+        o2_burned = o2_to_burn if o2_to_burn < o2_molecules_available_for_use else o2_molecules_available_for_use
+
+        # calculate the new tO2 and tCO2 (the co2 production depends on the respiratory quotient) and guard against negative concentrations
+        to2 = (o2_molecules_available - o2_burned) / vol
+        tco2 = ((comp.tco2 * vol) + o2_burned * self.resp_q) / vol
+        comp.to2 = to2 if to2 > 0.0 else 0.0
+        comp.tco2 = tco2 if tco2 > 0.0 else 0.0
+
+    def calculate_energy_use(self, vol, to2, tco2):
+        # calculate the new to2 and tco2 of all active components at once from their volumes and concentrations
+
         # get the component ATP need in molecules per second
-        atp_need = fvatp * self.atp_need
+        atp_need = self._fvatp * self.atp_need
         
         # now we need to know how much molecules ATP we need in this step
         atp_need_step = atp_need * self.model.modeling_stepsize
         
-        # get the number of oxygen molecules available in this active compartment in mmol
-        o2_molecules_available = comp.to2 * comp.vol
+        # get the number of oxygen molecules available in the active compartments in mmol
+        o2_molecules_available = to2 * vol
         
         # we state that 80% of these molecules are available for use
         o2_molecules_available_for_use = 0.8 * o2_molecules_available
@@ -61,39 +107,19 @@ class Metabolism:
         # how many molecules o2 do we need to burn in this step as 1 mmol of o2 gives 5 mmol of ATP when processed by oxydative phosphorylation
         o2_to_burn = atp_need_step / 5.0
         
-        # how many needed ATP molecules can't be produced by aerobic respiration
-        anaerobic_atp = (o2_to_burn - o2_molecules_available_for_use / 4.0) * 5.0
-        
-        # if negative then there are more o2 molecules available than needed and then shut down anaerobic fermentation
-        if (anaerobic_atp < 0):
-            anaerobic_atp = 0
-        
-        # burn the required amount of o2 molecules
-        o2_burned = o2_to_burn
-        
-        # if we need to burn more than we have then burn all available o2 molecules
-        if (o2_to_burn > o2_molecules_available_for_use):
-            # burn all o2's
-            o2_burned = o2_molecules_available_for_use
+        # burn the required amount of o2 molecules, if we need to burn more than we have then burn all available o2 molecules
+        o2_burned = np.minimum(o2_to_burn, o2_molecules_available_for_use)
             
         # as we burn o2 molecules we have to substract them from the total number of o2 molecules
         o2_molecules_available -= o2_burned
         
-        # calculate the new tO2
-        comp.to2 = o2_molecules_available / comp.vol
-        
-        # guard against negative concentrations
-        if comp.to2 < 0:
-            comp.to2 = 0
+        # calculate the new tO2 and guard against negative concentrations
+        to2 = np.maximum(o2_molecules_available / vol, 0.0)
             
         # we now how much o2 molecules we'v burned so we should be able to calculate how much co2 molecules we generated. This depends on the respiratory quotient
         co2_molecules_produced = o2_burned * self.resp_q
         
-        # add the co2 molecules to the total co2 molecules
-        comp.tco2 = ((comp.tco2 * comp.vol) + co2_molecules_produced) / comp.vol
-        
-        # guard against negative concentrations
-        if comp.tco2 < 0:
-            comp.tco2 = 0
-        
-        
+        # add the co2 molecules to the total co2 molecules and guard against negative concentrations
+        tco2 = np.maximum(((tco2 * vol) + co2_molecules_produced) / vol, 0.0)
+
+        return to2, tco2
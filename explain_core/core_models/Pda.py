@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the resistance of the duct is only recalculated when the length, diameter or viscosity is set
+@derived_inputs("length", "diameter", "viscosity")
 class Pda:
     def __init__(self, model, **args):
         # initialize the super class
@@ -35,9 +39,16 @@ class Pda:
         # initialization is now complete
         self.initialized = True
         
+    def link(self):
+        # get a reference to the ductus arteriosus blood connector when the model is loaded
+        self.pda = self.model.components['DA']
+
     def model_step(self):
         # enable or disable the DA connector depending on the state of the pda model
-        self.model.components['DA'].is_enabled = self.is_enabled
+        if self.pda.is_enabled != self.is_enabled:
+            self.pda.is_enabled = self.is_enabled
+            # the DA connector is enabled or disabled so the step schedule of the model has to be rebuilt
+            self.model.invalidate_schedule()
         
         # if the Pda model is enabled then initialize the model if not done before, otherwise calculate the resistance of the duct.
         if self.is_enabled:
@@ -48,6 +59,24 @@ class Pda:
             
         
     def calculate_resistance(self):
+        # recalculate the resistance when one of its parameters is set
+        if self._derived_dirty:
+            self.update_derived()
+        
+        # transfer the resistance to the ductus arteriosus blood connector and enable flow
+        self.pda.no_flow = not self.is_enabled
+        self.pda.r_for = self.res
+        self.pda.r_back = self.res
+        
+        # store the pda flow in l / s
+        self.flow = self.pda.flow
+        
+        # calculate the velocity in m/s, for that we have to convert the flow to mm^3/sec
+        # velocity = flow_rate (in mm^3/s) / (pi * radius^2)     in m/s
+        self.velocity = (self.pda.flow / 1000.0) / self._cross_section
+        self.velocity10 = self.velocity * 10.0
+
+    def update_derived(self):
         # calculate the resistance of the ductus arteriousus where
         # the duct is modeled as a perfect tube with a diameter and a length in millimeters
         # the viscosity is in centiPoise
@@ -75,15 +104,7 @@ class Pda:
         # convert resistance of mmHg * s / mm^3 to mmHg *s / l
         self.res = self.res / 1000.0
         
-        # transfer the resistance to the ductus arteriosus blood connector and enable flow
-        self.pda.no_flow = not self.is_enabled
-        self.pda.r_for = self.res
-        self.pda.r_back = self.res
-        
-        # store the pda flow in l / s
-        self.flow = self.pda.flow
-        
-        # calculate the velocity in m/s, for that we have to convert the flow to mm^3/sec
-        # velocity = flow_rate (in mm^3/s) / (pi * radius^2)     in m/s
-        self.velocity = (self.pda.flow / 1000.0) / (math.pi * math.pow(radius_meters, 2.0))
-        self.velocity10 = self.velocity * 10.0
\ No newline at end of file
+        # store the cross-sectional area of the duct in m^2 for the velocity calculation
+        self._cross_section = math.pi * math.pow(radius_meters, 2.0)
+
+        self._derived_dirty = False
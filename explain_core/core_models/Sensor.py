@@ -25,8 +25,6 @@ class Sensor:
             setattr(self, key, value)
             
         # housekeeping
-        self._update_counter = 0.0
-        self._model_stepsize = self.model.modeling_stepsize
         self._initialized = False
   
     def initialize(self):
@@ -44,11 +42,9 @@ class Sensor:
       self._initialized = True
 
     def model_step(self):
+        # the model engine calls the model step every update interval
         if self.is_enabled:
-            if (self._update_counter > self.update_interval):
-              self.update_sensor()
-              self._update_counter = 0.0
-            self._update_counter += self._model_stepsize
+            self.update_sensor()
 
     def update_sensor(self):
       # check whether the sensor is initialized
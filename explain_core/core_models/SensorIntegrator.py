@@ -20,8 +20,6 @@ class SensorIntegrator:
             setattr(self, key, value)
           
         # housekeeping
-        self._update_counter = 0.0
-        self._model_stepsize = self.model.modeling_stepsize
         self._initalized = False
         
     def initialize(self):
@@ -29,11 +27,9 @@ class SensorIntegrator:
 
 
     def model_step(self):
+        # the model engine calls the model step every update interval
         if self.is_enabled:
-            if self._update_counter > self.update_interval:
-              self.update_integrator()
-              self._update_counter = 0.0
-            self._update_counter += self._model_stepsize
+            self.update_integrator()
 
     def update_integrator(self):
       if not self._initalized:
@@ -1,5 +1,9 @@
 import math
 
+from explain_core.helpers.derived import derived_inputs
+
+# the elastances are only recalculated when one of their baselines or multipliers is set
+@derived_inputs("el_min", "el_min_fac", "el_max", "el_max_fac", "el_k", "el_k_fac")
 class TimeVaryingElastance:
     def __init__(self, model, **args):
         # initialize the super class
@@ -27,6 +31,7 @@ class TimeVaryingElastance:
         self.el_k = 0                         # holds the constant for the non-linear elastance function
         self.el_k_fac = 1.0
         self.compounds = {}                     # dictionary holding all the blood compounds
+        self.mobile_compounds = []              # names of the blood compounds which are not fixed and mix with the inflowing blood
         self.initialized = False
     
         # set the independent properties (name, description, type, subtype, is_enabled, vol, u_vol, el_min, el_max, el_k)
@@ -60,10 +65,12 @@ class TimeVaryingElastance:
         if (vol_above_unstressed < 0):
             vol_above_unstressed = 0
 
+        # recalculate the elastances when one of their baselines or multipliers is set
+        if self._derived_dirty:
+            self.update_derived()
+
         # calculate the elastance, which is volume dependent in a non-linear way and dependent on the varying elastance factor
-        el_min = self.el_min * self.el_min_fac
-        el_max = self.el_max * self.el_max_fac
-        elastance = el_min + ((el_max - el_min) * self.varying_elastance_factor) + self.el_k * self.el_k_fac * pow(vol_above_unstressed, 2)
+        elastance = self._el_min_total + (self._el_range * self.varying_elastance_factor) + self._el_k_total * pow(vol_above_unstressed, 2)
         
         # calculate the recoil pressure in the compliance due to the elastacity of the compliance
         self.recoil_pressure = (vol_above_unstressed * elastance) 
@@ -96,6 +103,14 @@ class TimeVaryingElastance:
         if self.pres < self.min_pres_temp:
             self.min_pres_temp = self.pres
 
+    def update_derived(self):
+        # calculate the elastances from their baselines and multipliers
+        self._el_min_total = self.el_min * self.el_min_fac
+        self._el_range = self.el_max * self.el_max_fac - self._el_min_total
+        self._el_k_total = self.el_k * self.el_k_fac
+
+        self._derived_dirty = False
+
     def volume_in (self, dvol, comp_from):
         # this method is called when volume is added to this components
         if self.is_enabled:
@@ -109,10 +124,10 @@ class TimeVaryingElastance:
                 self.mix_blood(dvol, comp_from)
 
                 # mix the non-fixed blood compounds if the volume is not zero
-                for name, compound in self.compounds.items():
-                    if not compound["fixed"]:
-                        d_compound = (comp_from.compounds[name]["conc"] - compound["conc"]) * dvol
-                        compound["conc"] = ((compound["conc"] * self.vol) + d_compound) / self.vol
+                for name in self.mobile_compounds:
+                    compound = self.compounds[name]
+                    d_compound = (comp_from.compounds[name]["conc"] - compound["conc"]) * dvol
+                    compound["conc"] = ((compound["conc"] * self.vol) + d_compound) / self.vol
             
         if (self.content == 'gas'):
             if (self.vol > 0):
@@ -129,21 +144,8 @@ class TimeVaryingElastance:
         self.tco2 = ((self.tco2 * self.vol) + d_co2) / self.vol
         
     def mix_gas(self, dvol, comp_from):
-        # calculate the change in o2 concentration
-        d_co2 = (comp_from.co2 - self.co2) * dvol
-        self.co2 = ((self.co2 * self.vol) + d_co2) / self.vol
-        
-        # calculate the change in co2 concentration
-        d_cco2 = (comp_from.cco2 - self.cco2) * dvol
-        self.cco2 = ((self.cco2 * self.vol) + d_cco2) / self.vol
-        
-        # calculate the change in n2 concentration
-        d_cn2 = (comp_from.cn2 - self.cn2) * dvol
-        self.cn2 = ((self.cn2 * self.vol) + d_cn2) / self.vol
-        
-        # calculate the change in argon concentration
-        d_cargon = (comp_from.cargon - self.cargon) * dvol
-        self.cargon = ((self.cargon * self.vol) + d_cargon) / self.vol
+        # calculate the change in concentration of all gas species
+        self.c += (comp_from.c - self.c) * (dvol / self.vol)
         
     def volume_out (self, dvol, comp_from):
         if self.is_enabled:
@@ -0,0 +1,144 @@
+from collections import deque
+
+
+class BeatAnalyzer:
+    # beat by beat analysis of the hemodynamics of the subscribed components. the beats are separated by the qrs event of the ecg model,
+    # during a beat the analyzer only keeps running values (maximum, minimum and sum) so the work per model step is constant for every
+    # subscribed component. the values of a beat are calculated once when the next qrs complex starts.
+    def __init__(self, model):
+        # store a reference to the model instance
+        self.model = model
+
+        # get the modeling stepsize from the model
+        self.t = model.modeling_stepsize
+
+        # the shunts as [shunt, reference] where the shunt fraction is the volume through the shunt divided by the volume through the
+        # reference. the ductus arteriosus diverts the output of the left ventricle, the foramen ovale the pulmonary venous return
+        self.shunts = {
+            'DA': ['DA', 'LV_AA'],
+            'FO': ['FO', 'PV_LA']
+        }
+
+        # number of analyzed beats which are kept
+        self.max_beats = 1000
+
+        # define the list of the analyzed beats and the last analyzed beat
+        self.beats = deque(maxlen = self.max_beats)
+        self.last_beat = None
+
+        # the subscribed components and their running values as [component, maximum pressure, minimum pressure, sum of the pressures]
+        # and [component, sum of the flows]
+        self.subscriptions = []
+        self._pressure_traces = []
+        self._flow_traces = []
+
+        # the analysis starts at the first qrs complex after a subscription so the first beat is complete
+        self._beat_started = False
+        self._beat_steps = 0
+
+    def subscribe(self, *names):
+        # add components to the beat analysis, components with a flow (resistors and valves) are analyzed for their stroke volume and
+        # cardiac output, components with a pressure (compliances and time-varying elastances) for their pressures
+        for name in names:
+            if name in self.subscriptions:
+                continue
+            comp = self.model.components[name]
+            if hasattr(comp, 'flow'):
+                self._flow_traces.append([comp, 0.0])
+            elif hasattr(comp, 'pres'):
+                self._pressure_traces.append([comp, -1000.0, 1000.0, 0.0])
+            else:
+                raise ValueError(f"{name} has no pressure or flow to analyze")
+            self.subscriptions.append(name)
+
+        self.restart()
+
+    def unsubscribe(self, *names):
+        # remove components from the beat analysis
+        self.subscriptions = [name for name in self.subscriptions if name not in names]
+        self._pressure_traces = [trace for trace in self._pressure_traces if trace[0].name not in names]
+        self._flow_traces = [trace for trace in self._flow_traces if trace[0].name not in names]
+
+        self.restart()
+
+    def clear_subscriptions(self):
+        self.unsubscribe(*self.subscriptions)
+
+    def clear_beats(self):
+        self.beats = deque(maxlen = self.max_beats)
+        self.last_beat = None
+
+    def restart(self):
+        # throw away the running values of the current beat and wait for the next qrs complex
+        self._beat_started = False
+        self.reset_traces()
+
+        # the model engine only schedules the beat analyzer when there are subscribed components
+        self.model.invalidate_schedule()
+
+    def reset_traces(self):
+        self._beat_steps = 0
+        for trace in self._pressure_traces:
+            trace[1] = -1000.0
+            trace[2] = 1000.0
+            trace[3] = 0.0
+        for trace in self._flow_traces:
+            trace[1] = 0.0
+
+    def is_active(self):
+        return len(self.subscriptions) > 0 and 'ecg' in self.model.components
+
+    def model_step(self):
+        # the ventricular contraction timer of the ecg model is zero in the model step in which the qrs complex starts
+        if self.model.components['ecg'].ncc_ventricular == 0:
+            if self._beat_started:
+                self.complete_beat()
+            self._beat_started = True
+            self.reset_traces()
+
+        self._beat_steps += 1
+
+        # determine the running maximum, minimum and sum of the pressures
+        for trace in self._pressure_traces:
+            pres = trace[0].pres
+            if pres > trace[1]:
+                trace[1] = pres
+            if pres < trace[2]:
+                trace[2] = pres
+            trace[3] += pres
+
+        # determine the running sum of the flows
+        for trace in self._flow_traces:
+            trace[1] += trace[0].flow
+
+    def complete_beat(self):
+        # calculate the values of the beat which ended at the start of this qrs complex
+        duration = self._beat_steps * self.t
+        beat = {
+            'time': self.model.model_clock,
+            'duration': duration,
+            'heart_rate': 60.0 / duration,
+            'pressures': {},
+            'flows': {},
+            'shunt_fractions': {}
+        }
+
+        # the systolic and diastolic pressures are the maximum and minimum of the beat, the mean pressure is the time average of the beat (mmHg)
+        for comp, systole, diastole, pres_sum in self._pressure_traces:
+            beat['pressures'][comp.name] = {'systole': systole, 'diastole': diastole, 'mean': pres_sum / self._beat_steps}
+
+        # the stroke volume is the net volume which went through the component during the beat (ml/kg) and the cardiac output is the
+        # stroke volume times the heart rate of the beat (ml/kg/min)
+        volumes = {}
+        for comp, flow_sum in self._flow_traces:
+            volumes[comp.name] = flow_sum * self.t
+            stroke_volume = volumes[comp.name] * 1000.0 / self.model.weight
+            beat['flows'][comp.name] = {'stroke_volume': stroke_volume, 'cardiac_output': stroke_volume * beat['heart_rate']}
+
+        # the shunt fractions of the shunts of which both the shunt and the reference are subscribed
+        for shunt, (shunt_name, reference_name) in self.shunts.items():
+            if shunt_name in volumes and reference_name in volumes and volumes[reference_name] != 0:
+                beat['shunt_fractions'][shunt] = volumes[shunt_name] / volumes[reference_name]
+
+        self.beats.append(beat)
+        self.last_beat = beat
@@ -0,0 +1,277 @@
+from operator import attrgetter
+
+import numpy as np
+
+# natural logarithm of 10 used in the derivative of the ph to the hydrogen concentration
+ln10 = np.log(10.0)
+
+# the constants of the blood model which the batched solvers take as one value for all rows, the blood models of a batch should share them
+solver_constants = ("kc", "kd", "kw", "alpha_co2p", "left_hp", "right_hp", "left_o2", "right_o2", "mmoltoml", "brent_accuracy", "max_iterations")
+get_solver_constants = attrgetter(*solver_constants)
+
+
+def net_charge_plasma(hp, tco2, charge, weak_acids, kc, kd, kw):
+    # vectorized version of Blood.net_charge_plasma, returns the net charge of the plasma and its derivative to the hydrogen concentration.
+    # charge holds the terms which don't depend on the hydrogen concentration (sid - uma + the constant part of the weak acids)
+    inv_hp = 1.0 / hp
+    ph = 3.0 - np.log10(hp)
+
+    # distribution of the total co2 over co2, bicarbonate and carbonate: hco3 = tco2 * kc / (hp + kc + kc * kd / hp)
+    e = hp + kc + kc * kd * inv_hp
+    hco3p = tco2 * kc / e
+    co3p = kd * hco3p * inv_hp
+    ohp = kw * inv_hp
+
+    netcharge = hp + charge - hco3p - 2.0 * co3p - ohp - weak_acids * ph
+
+    # analytic derivative of the net charge, every term increases with the hydrogen concentration so the net charge is monotonic
+    dhco3p = -hco3p * (1.0 - kc * kd * inv_hp * inv_hp) / e
+    dco3p = kd * (dhco3p - hco3p * inv_hp) * inv_hp
+    dnetcharge = 1.0 - dhco3p - 2.0 * dco3p + (ohp + weak_acids / ln10) * inv_hp
+
+    return netcharge, dnetcharge
+
+
+def bracketed_newton(function, args, x, lo, hi, active, tolerance, max_iterations):
+    # find the roots of an increasing function of a batch of rows with a bracketed newton method. function(x, *args) returns the function
+    # value and its derivative, a newton step which leaves the bracket is replaced by a bisection step and the bracket shrinks with every
+    # step. every row iterates until its own newton step is smaller than the tolerance, only the active rows which didn't converge yet are
+    # evaluated. x, lo and hi are updated in place, the number of newton steps of every row is returned
+    iterations = np.zeros(x.shape, dtype = int)
+    step = 0
+    while len(active) > 0 and step < max_iterations:
+        step += 1
+        iterations[active] = step
+        x_active = x[active]
+        value, derivative = function(x_active, *[arg[active] for arg in args])
+
+        # shrink the bracket
+        lo_active = np.where(value < 0, x_active, lo[active])
+        hi_active = np.where(value > 0, x_active, hi[active])
+
+        # newton step, safeguarded by bisection
+        x_new = x_active - value / derivative
+        outside = (x_new <= lo_active) | (x_new >= hi_active)
+        if np.count_nonzero(outside) > 0:
+            x_new = np.where(outside, 0.5 * (lo_active + hi_active), x_new)
+
+        lo[active] = lo_active
+        hi[active] = hi_active
+        x[active] = x_new
+
+        # the rows of which the newton step is smaller than the tolerance are converged (a step which is not a number ends the row as well)
+        active = active[np.abs(x_new - x_active) >= tolerance]
+
+    return iterations
+
+
+def solve_acidbase(tco2, sid, albumin, phosphates, uma, hemoglobin, hp_start, left_hp, right_hp, kc, kd, kw, alpha_co2p, tolerance = 1e-8, max_iterations = 100):
+    # solve the hydrogen concentration of a batch of compartments at once with a bracketed newton method, the net charge of the plasma
+    # increases with the hydrogen concentration
+    lo = np.full(tco2.shape, left_hp, dtype = float)
+    hi = np.full(tco2.shape, right_hp, dtype = float)
+    hp = np.clip(np.broadcast_to(np.asarray(hp_start, dtype = float), tco2.shape), left_hp, right_hp)
+
+    # the weak acids (albumin and phosphates) are linear in the ph: a_base = weak_acids * ph - 0.631 * albumin - 0.469 * phosphates
+    # Clin Biochem Rev 2009 May; 30(2): 41-54
+    weak_acids = np.broadcast_to(0.123 * albumin + 0.309 * phosphates, tco2.shape)
+    charge = np.broadcast_to(sid - uma + 0.631 * albumin + 0.469 * phosphates, tco2.shape)
+
+    # the compartments with a property which is not a number have no solution and don't take part in the iterations
+    finite = np.isfinite(tco2) & np.isfinite(weak_acids) & np.isfinite(charge) & np.isfinite(hp)
+    iterations = bracketed_newton(lambda hp, tco2, charge, weak_acids: net_charge_plasma(hp, tco2, charge, weak_acids, kc, kd, kw),
+                                  (tco2, charge, weak_acids), hp, lo, hi, np.flatnonzero(finite), tolerance, max_iterations)
+
+    # without a root in the bracket the solution ends on the edge of the bracket with a net charge which is not zero
+    netcharge, dnetcharge = net_charge_plasma(hp, tco2, charge, weak_acids, kc, kd, kw)
+    solved = finite & (np.abs(netcharge) < 1e-6)
+
+    # calculate the blood gas at the solution
+    ph = -np.log10(hp / 1000.0)
+    cco2p = tco2 / (1.0 + kc / hp + kc * kd / (hp * hp))
+    hco3p = kc * cco2p / hp
+    co3p = kd * hco3p / hp
+    pco2p = cco2p / alpha_co2p
+    be = (hco3p - 24.4 + (2.3 * hemoglobin + 7.7) * (ph - 7.4)) * (1.0 - 0.023 * hemoglobin)
+
+    return {
+        'solved': solved,
+        'iterations': iterations,
+        'hp': hp,
+        'ph': ph,
+        'pco2': pco2p,
+        'hco3': hco3p,
+        'cco2': cco2p,
+        'cco3': co3p,
+        'be': be
+    }
+
+
+def net_charge_plasma_from_pco2(hp, cco2p, charge, weak_acids, kc, kd, kw):
+    # vectorized version of Blood.net_charge_plasma_from_pco2, returns the net charge of the plasma and its derivative to the hydrogen concentration.
+    # the plasma co2 concentration is fixed by the pco2 so the bicarbonate and carbonate only depend on the hydrogen concentration
+    inv_hp = 1.0 / hp
+    ph = 3.0 - np.log10(hp)
+
+    hco3p = kc * cco2p * inv_hp
+    co3p = kd * hco3p * inv_hp
+    ohp = kw * inv_hp
+
+    netcharge = hp + charge - hco3p - 2.0 * co3p - ohp - weak_acids * ph
+    dnetcharge = 1.0 + (hco3p + 4.0 * co3p + ohp + weak_acids / ln10) * inv_hp
+
+    return netcharge, dnetcharge
+
+
+def solve_acidbase_from_pco2(pco2, sid, albumin, phosphates, uma, hemoglobin, hp_start, left_hp, right_hp, kc, kd, kw, alpha_co2p, tolerance = 1e-8, max_iterations = 100):
+    # solve the hydrogen concentration of a batch of blood gasses with a known pco2 at once with the same bracketed newton method as solve_acidbase
+    lo = np.full(pco2.shape, left_hp, dtype = float)
+    hi = np.full(pco2.shape, right_hp, dtype = float)
+    hp = np.clip(np.broadcast_to(np.asarray(hp_start, dtype = float), pco2.shape), left_hp, right_hp)
+
+    cco2p = pco2 * alpha_co2p
+    weak_acids = np.broadcast_to(0.123 * albumin + 0.309 * phosphates, pco2.shape)
+    charge = np.broadcast_to(sid - uma + 0.631 * albumin + 0.469 * phosphates, pco2.shape)
+
+    # the rows with a missing (not finite) input have no solution and don't take part in the iterations
+    finite = np.isfinite(cco2p) & np.isfinite(weak_acids) & np.isfinite(charge) & np.isfinite(hp)
+    iterations = bracketed_newton(lambda hp, cco2p, charge, weak_acids: net_charge_plasma_from_pco2(hp, cco2p, charge, weak_acids, kc, kd, kw),
+                                  (cco2p, charge, weak_acids), hp, lo, hi, np.flatnonzero(finite), tolerance, max_iterations)
+
+    # without a root in the bracket the solution ends on the edge of the bracket with a net charge which is not zero
+    netcharge, dnetcharge = net_charge_plasma_from_pco2(hp, cco2p, charge, weak_acids, kc, kd, kw)
+    solved = finite & (np.abs(netcharge) < 1e-6)
+
+    # calculate the blood gas at the solution
+    ph = -np.log10(hp / 1000.0)
+    hco3p = kc * cco2p / hp
+    co3p = kd * hco3p / hp
+    be = (hco3p - 24.4 + (2.3 * hemoglobin + 7.7) * (ph - 7.4)) * (1.0 - 0.023 * hemoglobin)
+
+    return {
+        'solved': solved,
+        'iterations': iterations,
+        'hp': hp,
+        'ph': ph,
+        'hco3': hco3p,
+        'cco2': cco2p,
+        'cco3': co3p,
+        'be': be
+    }
+
+
+def oxygen_dissociation_curve(po2, ph, be, dpg, temp):
+    # vectorized version of Blood.oxygen_dissociation_curve, returns the o2 saturation and its derivative to the po2 (in kPa)
+    a = 1.04 * (7.4 - ph) + 0.005 * be + 0.07 * (dpg - 5.0)
+    b = 0.055 * (temp + 273.15 - 310.15)
+    y0 = 1.875
+    x0 = 1.875 + a + b
+    h0 = 3.5 + a
+    k = 0.5343
+    x = np.log(po2)
+    tanh = np.tanh(k * (x - x0))
+    y = x - x0 + h0 * tanh + y0
+    so2 = 1.0 / (np.exp(-y) + 1.0)
+
+    # dso2/dpo2 = so2 * (1 - so2) * dy/dx * dx/dpo2
+    dso2 = so2 * (1.0 - so2) * (1.0 + h0 * k * (1.0 - tanh * tanh)) / po2
+
+    return so2, dso2
+
+
+def solve_oxygenation(to2, hemoglobin, ph, be, dpg, temp, po2_start, left_o2, right_o2, mmoltoml, tolerance = 1e-8, max_iterations = 100):
+    # solve the po2 (in kPa) of a batch of compartments from their total oxygen content at once with the bracketed newton method, the
+    # oxygen content increases with the po2
+    lo = np.full(to2.shape, left_o2, dtype = float)
+    hi = np.full(to2.shape, right_o2, dtype = float)
+    po2 = np.clip(np.broadcast_to(np.asarray(po2_start, dtype = float), to2.shape), left_o2, right_o2)
+
+    # to2 = (0.0031 * po2 in mmHg + 1.36 * hemoglobin in g/dL * so2) * 10 in ml O2/l converted to mmol/l
+    dissolved = 0.0031 / 0.1333 * 10.0 / mmoltoml
+    bound = np.broadcast_to(1.36 * (hemoglobin / 0.6206) * 10.0 / mmoltoml, to2.shape)
+    ph, be, dpg, temp = [np.broadcast_to(np.asarray(value, dtype = float), to2.shape) for value in (ph, be, dpg, temp)]
+
+    def oxygen_content(po2, to2, bound, ph, be, dpg, temp):
+        # the difference between the oxygen content at the po2 and the to2 and its derivative to the po2
+        so2, dso2 = oxygen_dissociation_curve(po2, ph, be, dpg, temp)
+        return dissolved * po2 + bound * so2 - to2, dissolved + bound * dso2
+
+    # the compartments with a parameter which is not a number have no solution and don't take part in the iterations
+    finite = np.isfinite(to2) & np.isfinite(bound) & np.isfinite(ph) & np.isfinite(be) & np.isfinite(dpg) & np.isfinite(temp) & np.isfinite(po2)
+    iterations = bracketed_newton(oxygen_content, (to2, bound, ph, be, dpg, temp), po2, lo, hi, np.flatnonzero(finite), tolerance, max_iterations)
+
+    # without a root in the bracket the solution ends on the edge of the bracket with an oxygen content which differs from the to2
+    so2, dso2 = oxygen_dissociation_curve(po2, ph, be, dpg, temp)
+    solved = finite & (np.abs(dissolved * po2 + bound * so2 - to2) < 1e-6)
+
+    return {
+        'solved': solved,
+        'iterations': iterations,
+        'po2': po2,
+        'so2': so2
+    }
+
+
+class BloodBatch:
+    # the blood models of a number of models are solved together as one batch. the acidbase and oxygenation enabled components of all
+    # blood models are gathered in one set of arrays and solved with one call of the batched solvers with the constants of the first
+    # blood model, so blood models with other constants are rejected. blood models which don't use the batched solvers are stepped on their own.
+    def __init__(self, bloods):
+        # store the blood models in the batch
+        self.bloods = bloods
+        self.check_constants([blood for blood in bloods if blood.acidbase_solver == "batched" and blood.oxygenation_solver == "batched"])
+
+    def check_constants(self, bloods):
+        # raise an error when a blood model has other solver constants than the first blood model as its rows would be solved with the
+        # constants of the first blood model
+        if len(bloods) == 0:
+            return
+        constants = get_solver_constants(bloods[0])
+        for index, blood in enumerate(bloods):
+            if get_solver_constants(blood) != constants:
+                different = [name for name, value, first in zip(solver_constants, get_solver_constants(blood), constants) if value != first]
+                raise ValueError(f"blood model {index} of the batch has other solver constants ({', '.join(different)}) than the first blood model, the blood models of a batch are solved with the same constants.")
+
+    def model_step(self, bloods = None):
+        # step the given blood models of the batch (all blood models by default)
+        if bloods is None:
+            bloods = self.bloods
+
+        # the blood models which don't use the batched solvers step themselves
+        batched = []
+        for blood in bloods:
+            if not blood.is_enabled:
+                continue
+            if blood.acidbase_solver == "batched" and blood.oxygenation_solver == "batched":
+                batched.append(blood)
+            else:
+                blood.model_step()
+
+        # the constants can be changed while the models run
+        self.check_constants(batched)
+
+        # the oxygenation depends on the base excess so the oxygenation components are gathered after the acidbase calculations
+        self.solve([(blood, blood.get_acidbase_components()) for blood in batched], "acidbase")
+        self.solve([(blood, blood.get_oxygenation_components()) for blood in batched], "oxygenation")
+
+    def solve(self, groups, calculation):
+        # gather the arrays of the components of every blood model, solve the concatenated arrays at once and store the rows of every
+        # blood model in its components
+        groups = [(blood, comps) for blood, comps in groups if len(comps) > 0]
+        if len(groups) == 0:
+            return
+
+        arrays = [getattr(blood, "get_" + calculation + "_arrays")(comps) for blood, comps in groups]
+        inputs = {name: np.concatenate([array[name] for array in arrays]) for name in arrays[0]}
+        result = getattr(groups[0][0], "solve_" + calculation + "_arrays")(inputs)
+
+        start = 0
+        for (blood, comps), array in zip(groups, arrays):
+            stop = start + len(comps)
+            rows = {name: value[start:stop] if np.ndim(value) > 0 else value for name, value in result.items()}
+            if calculation == "acidbase":
+                blood.store_acidbase(comps, array['sid'], rows)
+            else:
+                blood.store_oxygenation(comps, rows)
+            blood.steps = int(np.max(rows['iterations'], initial = 0))
+            start = stop
@@ -13,7 +13,6 @@ class Datacollector:
 
     # define the data sample interval
     self.sample_interval = 0.005
-    self._interval_counter = 0
 
     # get the modeling stepsize from the model
     self.modeling_stepsize = model.modeling_stepsize
@@ -34,6 +33,9 @@ class Datacollector:
     # define the data list
     self.collected_data = []
 
+    # position of the next ecg sample to read from the ring buffer of the ecg model
+    self._ecg_position = 0
+
   def clear_data (self):
     self.collected_data = []
 
@@ -50,6 +52,8 @@ class Datacollector:
 
   def set_sample_interval(self, new_interval):
     self.sample_interval = new_interval
+    # the model engine schedules the data collection on the sample interval
+    self.model.invalidate_schedule()
 
   def add_to_watchlist(self, property):
     # first clear all data
@@ -58,29 +62,32 @@ class Datacollector:
     # add to the watchlist
     self.watch_list.append(property)
 
-  def collect_data(self, model_clock):
-    if (self._interval_counter >= self.sample_interval):
-      self._interval_counter = 0
-      data_object = {
-        'time': model_clock
-      }
-      for parameter in self.watch_list:
-        label = parameter['label']
-        prop = parameter['prop']
-        weight = 1
-        time = 1
-        if prop == 'flow':
-            weight = self.model.weight
-            time = 60
-        if prop == 'vol':
-            weight = self.model.weight
-        
-        if parameter['model'] is not None:
-            value = getattr(parameter['model'], parameter['prop'])
-                
-            data_object[label] = value / weight * time
-            
-      self.collected_data.append(data_object)
-            
-    
-    self._interval_counter += self.modeling_stepsize
\ No newline at end of file
+  def collect_sample(self, model_clock):
+    data_object = {
+      'time': model_clock
+    }
+    for parameter in self.watch_list:
+      label = parameter['label']
+      prop = parameter['prop']
+      weight = 1
+      time = 1
+      if prop == 'flow':
+          weight = self.model.weight
+          time = 60
+      if prop == 'vol':
+          weight = self.model.weight
+
+      if parameter['model'] is not None:
+          value = getattr(parameter['model'], parameter['prop'])
+
+          data_object[label] = value / weight * time
+
+    self.collected_data.append(data_object)
+
+  def collect_ecg(self):
+    # return the ecg samples written by the ecg model since the last call as one chunk
+    try:
+      samples, self._ecg_position = self.model.components['ecg'].read_ecg(self._ecg_position)
+    except KeyError:
+      samples = []
+    return samples
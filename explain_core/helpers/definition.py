@@ -0,0 +1,38 @@
+import copy, json
+
+
+def load_definition(filename):
+    # open the JSON file and convert it to a python dictionary object
+    with open(filename) as json_file:
+        return json.load(json_file)
+
+
+def find_component_definition(model_definition, component):
+    # find the definition of a component by its key in the definition file or by its name
+    components = model_definition['components']
+    if component in components:
+        return components[component]
+    for component_definition in components.values():
+        if component_definition.get('name') == component:
+            return component_definition
+    return None
+
+
+def apply_parameters(model_definition, parameters):
+    # return a copy of the model definition with the parameters set, the parameters are given as a dictionary
+    # with 'component.prop' keys (e.g. 'DA.r_for' or 'mechanical_ventilator.peep') or with keys of the model definition itself (e.g. 'weight')
+    model_definition = copy.deepcopy(model_definition)
+    for prop, value in parameters.items():
+        t = prop.split(sep=".")
+        if len(t) == 1:
+            model_definition[prop] = value
+            continue
+
+        component_definition = find_component_definition(model_definition, t[0])
+        if component_definition is None:
+            raise KeyError(f"{t[0]} is not a component of the {model_definition['name']} model definition.")
+
+        # the property is passed to the component as an argument when the model is initialized
+        component_definition[t[1]] = value
+
+    return model_definition
@@ -0,0 +1,30 @@
+# name of the flag which marks the derived values of a component as outdated
+dirty_flag = "_derived_dirty"
+
+
+class DerivedInput:
+    # descriptor of a parameter from which a component derives other values. the descriptor only intercepts setting the parameter so reading it
+    # stays as fast as reading a normal attribute. setting the parameter directly, through Interface.set_property, a propChange or an Effector
+    # marks the derived values of the component as dirty so the component recalculates them before it uses them again. writing the value
+    # the parameter already holds (as an Effector with a steady output does every model step) leaves the derived values as they are
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __set__(self, component, value):
+        values = component.__dict__
+        if self.name in values and values[self.name] == value:
+            return
+        values[self.name] = value
+        values[dirty_flag] = True
+
+
+def derived_inputs(*names):
+    # class decorator which turns the named parameters of a model class into derived inputs
+    def decorate(model_class):
+        for name in names:
+            descriptor = DerivedInput()
+            descriptor.__set_name__(model_class, name)
+            setattr(model_class, name, descriptor)
+        model_class.derived_input_names = tuple(names)
+        return model_class
+    return decorate
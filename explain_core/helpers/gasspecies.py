@@ -0,0 +1,37 @@
+from operator import attrgetter
+
+# the gas composition of a gas containing component is stored as vectors over the gas species defined by the dry_gas_fractions of the
+# gas model. every vector is also available per species under its old attribute name, e.g. the o2 element of f_dry as fo2_dry
+species_arrays = {
+    "f_dry": "f{}_dry",     # dry fractions
+    "f": "f{}",             # wet fractions
+    "p": "p{}",             # partial pressures
+    "c": "c{}",             # concentrations
+    "p_dry": "p{}_dry",     # partial pressures of the dry gas at atmospheric pressure
+    "c_dry": "c{}_dry"      # concentrations of the dry gas at atmospheric pressure
+}
+
+
+def species_property(array_name, index, derived = False):
+    # build a property which reads and writes one species of a species vector of a component. the species of a derived vector, which the
+    # component calculates from the dry fractions, are read only as a write into them would be lost or overwritten in the next model step
+    get_array = attrgetter(array_name)
+
+    def getter(component):
+        return get_array(component).item(index)
+
+    def setter(component, value):
+        get_array(component)[index] = value
+
+    def derived_setter(component, value):
+        raise AttributeError(f"{species_arrays[array_name].format(component.gas_species[index])} of {component.name} is calculated from the dry fractions, set {species_arrays['f_dry'].format(component.gas_species[index])} instead")
+
+    return property(getter, derived_setter if derived else setter)
+
+
+def bind_species(comp, species):
+    # give the component the properties of every species of the species vectors by swapping its class for a class with these properties
+    derived = getattr(comp, 'derived_species', ())
+    class_props = {prop.format(name): species_property(array_name, index, array_name in derived) for array_name, prop in species_arrays.items() for index, name in enumerate(species)}
+    comp.gas_species = species
+    comp.__class__ = type(comp.__class__.__name__, (comp.__class__,), class_props)
@@ -0,0 +1,625 @@
+import numpy as np
+
+# mapping of the component attributes on the arrays of the vectorized hydraulics core
+compliance_props = {
+    "BloodCompliance": {
+        "is_enabled": "comp_enabled",
+        "vol": "vol",
+        "u_vol": "u_vol",
+        "u_vol_fac": "u_vol_fac",
+        "el_base": "el_base",
+        "el_base_fac": "el_base_fac",
+        "el_k": "el_k",
+        "el_k_fac": "el_k_fac",
+        "pres": "pres",
+        "recoil_pressure": "recoil_pressure",
+        "pres_transmural": "pres_transmural",
+        "pres_outside": "pres_outside",
+        "pres_itp": "pres_itp",
+        "p_atm": "p_atm",
+        "systole": "systole",
+        "diastole": "diastole",
+        "mean": "mean",
+        "min_pres_temp": "min_pres_temp",
+        "max_pres_temp": "max_pres_temp",
+        "analysis_window": "analysis_window",
+        "analysis_counter": "analysis_counter"
+    },
+    "TimeVaryingElastance": {
+        "is_enabled": "comp_enabled",
+        "vol": "vol",
+        "u_vol": "u_vol",
+        "el_min": "el_base",
+        "el_min_fac": "el_base_fac",
+        "el_max": "el_max",
+        "el_max_fac": "el_max_fac",
+        "varying_elastance_factor": "vef",
+        "el_k": "el_k",
+        "el_k_fac": "el_k_fac",
+        "pres": "pres",
+        "recoil_pressure": "recoil_pressure",
+        "pres_transmural": "pres_transmural",
+        "pres_outside": "pres_outside",
+        "pres_itp": "pres_itp",
+        "p_atm": "p_atm",
+        "systole": "systole",
+        "diastole": "diastole",
+        "mean": "mean",
+        "min_pres_temp": "min_pres_temp",
+        "max_pres_temp": "max_pres_temp",
+        "analysis_window": "analysis_window",
+        "analysis_counter": "analysis_counter"
+    }
+}
+
+resistor_props = {
+    "BloodResistor": {
+        "is_enabled": "res_enabled",
+        "no_flow": "no_flow",
+        "no_backflow": "no_backflow",
+        "r_for": "r_for",
+        "r_for_fac": "r_for_fac",
+        "r_back": "r_back",
+        "r_back_fac": "r_back_fac",
+        "r_k": "r_k",
+        "r_k_fac": "r_k_fac",
+        "flow": "flow",
+        "resistance": "resistance"
+    },
+    "Valve": {
+        "is_enabled": "res_enabled",
+        "no_flow": "no_flow",
+        "no_backflow": "no_backflow",
+        "r_for": "r_for",
+        "r_for_fac": "r_for_fac",
+        "r_back": "r_back",
+        "r_back_fac": "r_back_fac",
+        "r_k": "r_k",
+        "k_fac": "r_k_fac",
+        "flow": "flow",
+        "resistance": "resistance"
+    }
+}
+
+gas_compliance_props = {
+    "GasCompliance": {
+        "is_enabled": "comp_enabled",
+        "fixed_composition": "fixed_composition",
+        "vol": "vol",
+        "u_vol": "u_vol",
+        "u_vol_fac": "u_vol_fac",
+        "el_base": "el_base",
+        "el_base_fac": "el_base_fac",
+        "el_k": "el_k",
+        "el_k_fac": "el_k_fac",
+        "pres": "pres",
+        "recoil_pressure": "recoil_pressure",
+        "pres_transmural": "pres_transmural",
+        "pres_outside": "pres_outside",
+        "pres_rel": "pres_rel",
+        "p_atm": "p_atm",
+        "temp": "temp",
+        "gas_constant": "gas_constant",
+        "ph2o": "ph2o",
+        "fh2o": "fh2o",
+        "c_total": "c_total"
+    }
+}
+
+gas_resistor_props = {
+    "GasResistor": resistor_props["BloodResistor"]
+}
+
+# the species vectors of the gas compliances which change during a model run, the dry fractions, wet fractions, partial pressures and
+# concentrations of the gas species are stored as matrices of gas compliances x species
+gas_species_matrices = ["f_dry", "f", "p", "c"]
+
+# names of the arrays of the vectorized hydraulics core
+compliance_arrays = ["vol", "u_vol", "u_vol_fac", "el_base", "el_base_fac", "el_max", "el_max_fac", "vef", "el_k", "el_k_fac",
+                     "pres", "recoil_pressure", "pres_transmural", "pres_outside", "pres_itp", "p_atm",
+                     "systole", "diastole", "mean", "min_pres_temp", "max_pres_temp", "analysis_window", "analysis_counter"]
+compliance_flags = ["comp_enabled"]
+resistor_arrays = ["r_for", "r_for_fac", "r_back", "r_back_fac", "r_k", "r_k_fac", "flow", "resistance"]
+resistor_flags = ["res_enabled", "no_flow", "no_backflow"]
+gas_compliance_arrays = ["vol", "u_vol", "u_vol_fac", "el_base", "el_base_fac", "el_k", "el_k_fac", "pres", "recoil_pressure", "pres_transmural",
+                         "pres_outside", "pres_rel", "p_atm", "temp", "gas_constant", "ph2o", "fh2o", "c_total"]
+gas_compliance_flags = ["comp_enabled", "fixed_composition"]
+
+
+def water_vapour_pressure(temp):
+    # calculate the water vapour pressure in air depending on the temperature
+    return np.exp(20.386 - (5132 / (temp + 273)))
+
+
+def array_property(array, index):
+    # build a property which reads and writes the value of a component directly from its position in the hydraulics array
+    get_item = array.item
+    set_item = array.__setitem__
+
+    def getter(component):
+        return get_item(index)
+
+    def setter(component, value):
+        set_item(index, value)
+
+    return property(getter, setter)
+
+
+def row_property(array, index):
+    # build a property which reads and writes a vector of a component directly from its row in a hydraulics matrix
+    def getter(component):
+        return array[index]
+
+    def setter(component, value):
+        array[index] = value
+
+    return property(getter, setter)
+
+
+class CompoundConcentration:
+    # dictionary-like access to the concentration of one compound of one compliance in the concentration matrix of the hydraulics core
+    def __init__(self, hydraulics, position, fixed, unit):
+        self.hydraulics = hydraulics
+        self.position = position
+        self.fixed = fixed
+        self.unit = unit
+
+    def __getitem__(self, key):
+        if key == "conc":
+            return self.hydraulics.conc.item(self.position)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key == "conc":
+            self.hydraulics.conc[self.position] = value
+        else:
+            setattr(self, key, value)
+
+
+class CompoundView:
+    # dictionary-like view on the compounds of one compliance which replaces the compounds dictionary of the component
+    def __init__(self, compounds):
+        self.compounds = compounds
+
+    def __getitem__(self, name):
+        return self.compounds[name]
+
+    def __contains__(self, name):
+        return name in self.compounds
+
+    def __iter__(self):
+        return iter(self.compounds)
+
+    def __len__(self):
+        return len(self.compounds)
+
+    def keys(self):
+        return self.compounds.keys()
+
+    def items(self):
+        return self.compounds.items()
+
+    def values(self):
+        return self.compounds.values()
+
+
+class Hydraulics:
+    # the arrays holding the state of the components, which are stacked when the cores of a number of models are stepped as one batch,
+    # and the attributes describing the network which the cores in a batch share
+    batch_arrays = compliance_arrays + compliance_flags + resistor_arrays + resistor_flags + ["conc"]
+    shared_attributes = ["species", "no_mobile", "mobile_compounds", "fixed_compounds", "compound_info", "collapsible", "idx_from", "idx_to", "incidence", "incidence_t"]
+
+    def __init__(self, model):
+        # initialize the super class
+        super().__init__()
+
+        # get a reference to the whole model
+        self.model = model
+
+        # get the modeling stepsize from the model
+        self.t = model.modeling_stepsize
+
+        # lists holding the components which are part of the hydraulics core in array order
+        self.compliances = []
+        self.resistors = []
+
+        # find the blood containing compliances and time-varying elastances
+        for comp in model.components.values():
+            if comp.model_type in compliance_props and getattr(comp, 'content', '') == 'blood':
+                self.compliances.append(comp)
+
+        # the concentrations are stored as a matrix of compliances x species. the circulating species (to2 and tco2) and the non-fixed blood
+        # compounds are mixed when blood flows from one compliance to another, the fixed blood compounds follow them in the matrix and are not mixed
+        compounds = self.compliances[0].compounds if len(self.compliances) > 0 else {}
+        self.mobile_compounds = [name for name, compound in compounds.items() if not compound["fixed"]]
+        self.fixed_compounds = [name for name, compound in compounds.items() if compound["fixed"]]
+        self.species = ["to2", "tco2"] + self.mobile_compounds + self.fixed_compounds
+        self.no_mobile = 2 + len(self.mobile_compounds)
+        self.compound_info = {name: (compound["fixed"], compound.get("unit", "")) for name, compound in compounds.items()}
+
+        # find the resistors and valves which connect two of these compliances
+        for comp in model.components.values():
+            if comp.model_type in resistor_props:
+                if getattr(comp, 'comp1', None) in self.compliances and getattr(comp, 'comp2', None) in self.compliances:
+                    self.resistors.append(comp)
+
+        # build the arrays and the incidence matrix of the network
+        self.build_arrays()
+        self.build_incidence()
+
+        # transform the components into array backed components
+        self.bind_components()
+
+    def build_arrays(self):
+        n_comps = len(self.compliances)
+        n_res = len(self.resistors)
+
+        # compliance arrays
+        for array_name in compliance_arrays:
+            setattr(self, array_name, np.zeros(n_comps))
+
+        for array_name in compliance_flags:
+            setattr(self, array_name, np.zeros(n_comps, dtype=bool))
+
+        # the concentrations are stored as a matrix of compliances x species
+        self.conc = np.zeros((n_comps, len(self.species)))
+
+        # only the blood compliances collapse to their unstressed volume, the time-varying elastances don't
+        self.collapsible = np.array([comp.model_type == "BloodCompliance" for comp in self.compliances], dtype=bool)
+
+        # the time-varying elastances don't apply their unstressed volume factor so their factor in the array stays 1
+        self.u_vol_fac[~self.collapsible] = 1.0
+
+        # resistor arrays
+        for array_name in resistor_arrays:
+            setattr(self, array_name, np.zeros(n_res))
+
+        for array_name in resistor_flags:
+            setattr(self, array_name, np.zeros(n_res, dtype=bool))
+
+        # copy the current values of the components into the arrays
+        for index, comp in enumerate(self.compliances):
+            for prop, array_name in compliance_props[comp.model_type].items():
+                getattr(self, array_name)[index] = getattr(comp, prop, 0.0)
+            for column, species in enumerate(self.species):
+                if hasattr(comp, species):
+                    self.conc[index, column] = getattr(comp, species)
+                elif species in comp.compounds:
+                    self.conc[index, column] = comp.compounds[species]["conc"]
+
+        for index, res in enumerate(self.resistors):
+            for prop, array_name in resistor_props[res.model_type].items():
+                getattr(self, array_name)[index] = getattr(res, prop, 0.0)
+
+    def build_incidence(self):
+        n_comps = len(self.compliances)
+        n_res = len(self.resistors)
+
+        # store the indices of the compliances which are connected by the resistors
+        self.idx_from = np.array([self.compliances.index(res.comp1) for res in self.resistors], dtype=int)
+        self.idx_to = np.array([self.compliances.index(res.comp2) for res in self.resistors], dtype=int)
+
+        # the incidence matrix holds -1 for the compliance the flow comes from and +1 for the compliance the flow goes to
+        to_matrix = np.zeros((n_res, n_comps))
+        to_matrix[np.arange(n_res), self.idx_to] = 1.0
+        from_matrix = np.zeros((n_res, n_comps))
+        from_matrix[np.arange(n_res), self.idx_from] = 1.0
+        self.incidence = to_matrix - from_matrix
+        self.incidence_t = self.incidence.T.copy()
+
+    def bind_components(self):
+        # bind the components to their position in the arrays
+        for index, comp in enumerate(self.compliances):
+            self.bind_component(comp, index, compliance_props[comp.model_type], {name: ("conc", column) for column, name in enumerate(self.species)})
+
+            # the compounds dictionary of the compliance is replaced by a view on its row of the concentration matrix
+            comp.compounds = CompoundView({name: CompoundConcentration(self, (index, self.species.index(name)), fixed, unit)
+                                           for name, (fixed, unit) in self.compound_info.items()})
+
+        for index, res in enumerate(self.resistors):
+            self.bind_component(res, index, resistor_props[res.model_type], {})
+
+    def bind_component(self, comp, index, props, columns, rows = ()):
+        # remove the values from the instance as they now live in the arrays, columns holds the properties which live in a column of a matrix
+        # and rows holds the names of the matrices in which the component has a row
+        for prop in list(props) + list(columns) + list(rows):
+            comp.__dict__.pop(prop, None)
+
+        # store the position of the component in the arrays
+        comp._hydraulics = self
+        comp._hydraulics_index = index
+
+        # build the properties which read and write the values of this component from the arrays
+        class_props = {prop: array_property(getattr(self, array_name), index) for prop, array_name in props.items()}
+        for prop, (array_name, column) in columns.items():
+            class_props[prop] = array_property(getattr(self, array_name), (index, column))
+        for matrix_name in rows:
+            class_props[matrix_name] = row_property(getattr(self, matrix_name), index)
+
+        # swap the class of the component for a class with these properties
+        component_class = getattr(comp, '_component_class', comp.__class__)
+        comp._component_class = component_class
+        comp.__class__ = type(component_class.__name__, (component_class,), class_props)
+
+    def store(self, target, values, where):
+        # store the values in the target array, only on the positions in where if where is given
+        if where is None:
+            target[...] = values
+        else:
+            np.copyto(target, values, where=where)
+
+    def model_step(self):
+        # the disabled compliances keep their state so when all compliances are enabled no masking is needed
+        enabled = None if np.count_nonzero(self.comp_enabled) == self.comp_enabled.size else self.comp_enabled
+
+        self.calculate_pressures(enabled)
+        self.calculate_flows(enabled)
+
+    def calculate_pressures(self, enabled):
+        # calculate the volume above the unstressed volume
+        vol_above_unstressed = self.vol - self.u_vol * self.u_vol_fac
+
+        # the blood compliances collapse to their unstressed volume when the volume drops below the unstressed volume
+        collapsed = vol_above_unstressed < 0
+        if np.count_nonzero(collapsed) > 0:
+            collapsed &= self.collapsible
+            if enabled is not None:
+                collapsed &= enabled
+            np.copyto(self.vol, self.u_vol, where=collapsed)
+            vol_above_unstressed = np.maximum(vol_above_unstressed, 0.0)
+
+        # calculate the elastance, which is volume dependent in a non-linear way and dependent on the varying elastance factor
+        el_min = self.el_base * self.el_base_fac
+        elastance = el_min + (self.el_max * self.el_max_fac - el_min) * self.vef + self.el_k * self.el_k_fac * vol_above_unstressed * vol_above_unstressed
+
+        # calculate the recoil pressure, the net pressure and the transmural pressure
+        recoil_pressure = vol_above_unstressed * elastance
+        pres_outside = self.pres_outside + self.p_atm
+        self.store(self.recoil_pressure, recoil_pressure, enabled)
+        self.store(self.pres, recoil_pressure + pres_outside + self.pres_itp, enabled)
+        self.store(self.pres_transmural, recoil_pressure + pres_outside - self.pres_itp, enabled)
+
+        # reset the outside and intrathoracic pressures as they need to be set every model cycle
+        self.store(self.pres_outside, 0.0, enabled)
+        self.store(self.pres_itp, 0.0, enabled)
+
+        # determine min and max pressures. the blood compliances take the pressure of this model step into the analysis window before the
+        # window is closed, the time-varying elastances close the window first and start the new window with the pressure of this model step
+        analysis_done = self.analysis_counter > self.analysis_window
+        if enabled is not None:
+            analysis_done &= enabled
+        if np.count_nonzero(analysis_done) == 0:
+            self.store(self.max_pres_temp, np.maximum(self.max_pres_temp, self.pres), enabled)
+            self.store(self.min_pres_temp, np.minimum(self.min_pres_temp, self.pres), enabled)
+        else:
+            window_first = analysis_done & ~self.collapsible
+            pres_first = ~window_first if enabled is None else enabled & ~window_first
+            np.copyto(self.max_pres_temp, np.maximum(self.max_pres_temp, self.pres), where=pres_first)
+            np.copyto(self.min_pres_temp, np.minimum(self.min_pres_temp, self.pres), where=pres_first)
+
+            np.copyto(self.systole, self.max_pres_temp, where=analysis_done)
+            np.copyto(self.diastole, self.min_pres_temp, where=analysis_done)
+            np.copyto(self.max_pres_temp, -1000.0, where=analysis_done)
+            np.copyto(self.min_pres_temp, 1000.0, where=analysis_done)
+            np.copyto(self.analysis_counter, 0.0, where=analysis_done)
+            np.copyto(self.mean, ((2 * self.diastole) + self.systole) / 3.0, where=analysis_done)
+
+            np.copyto(self.max_pres_temp, np.maximum(self.max_pres_temp, self.pres), where=window_first)
+            np.copyto(self.min_pres_temp, np.minimum(self.min_pres_temp, self.pres), where=window_first)
+
+        self.store(self.analysis_counter, self.analysis_counter + self.t, enabled)
+
+    def calculate_flows(self, enabled):
+        # get the pressures of the compliances on both sides of the resistors
+        p1 = self.pres.take(self.idx_from, axis=-1)
+        p2 = self.pres.take(self.idx_to, axis=-1)
+        dp = p1 - p2
+
+        # calculate the resistance including the flow dependent part of the resistance
+        resistance = np.where(dp > 0, self.r_for * self.r_for_fac, self.r_back * self.r_back_fac) + self.r_k * self.r_k_fac * np.abs(self.flow)
+        np.copyto(self.resistance, resistance, where=self.res_enabled)
+
+        # calculate the flows and check the no_backflow, no_flow and is_enabled flags
+        flow = dp / resistance
+        np.maximum(flow, 0.0, out=flow, where=self.no_backflow)
+        np.copyto(flow, 0.0, where=self.no_flow)
+        np.copyto(flow, 0.0, where=~self.res_enabled)
+        self.flow[...] = flow
+
+        # now we have the flows in l/sec and we have to convert them to l by multiplying them by the modeling_stepsize
+        dvol = flow * self.t
+
+        # change the volumes of the enabled compliances
+        dvol_net = dvol @ self.incidence
+        if enabled is not None:
+            dvol_net = np.where(enabled, dvol_net, 0.0)
+        self.vol += dvol_net
+
+        # the blood flowing through a resistor carries the concentrations of the compliance it comes from, only the mobile species
+        # (the first no_mobile columns of the concentration matrix) are mixed
+        conc = self.conc[..., :self.no_mobile]
+        conc_flow = np.where(dvol[..., None] > 0, conc.take(self.idx_from, axis=-2), conc.take(self.idx_to, axis=-2)) * dvol[..., None]
+
+        # mix the concentrations of the compliances with the blood flowing in and out of them, this is the same as mixing
+        # the blood flowing into a compliance with its contents: conc = conc + (conc_in - conc) * dvol_in / vol
+        vol = np.where(self.vol > 0, self.vol, np.inf)
+        conc += (self.incidence_t @ conc_flow - conc * dvol_net[..., None]) / vol[..., None]
+
+
+class GasHydraulics(Hydraulics):
+    # the gas compliances and the gas resistors connecting them are stepped together as arrays in the same way as the blood compliances.
+    # the water vapour pressure only depends on the temperature so it is only recalculated when the temperature of a gas compliance changes.
+    batch_arrays = gas_compliance_arrays + gas_compliance_flags + gas_species_matrices + resistor_arrays + resistor_flags + ["rt"]
+    shared_attributes = ["species", "idx_from", "idx_to", "incidence", "incidence_t", "temp_key"]
+
+    def __init__(self, model):
+        # get a reference to the whole model
+        self.model = model
+
+        # get the modeling stepsize from the model
+        self.t = model.modeling_stepsize
+
+        # find the gas compliances and the gas resistors which connect two of them
+        self.compliances = [comp for comp in model.components.values() if comp.model_type in gas_compliance_props and getattr(comp, 'content', '') == 'gas']
+        self.resistors = [comp for comp in model.components.values() if comp.model_type in gas_resistor_props and
+                          getattr(comp, 'comp1', None) in self.compliances and getattr(comp, 'comp2', None) in self.compliances]
+        self.species = self.compliances[0].gas_species if len(self.compliances) > 0 else []
+
+        # build the arrays and the incidence matrix of the network
+        self.build_arrays()
+        self.build_incidence()
+
+        # transform the components into array backed components
+        self.bind_components()
+
+    def build_arrays(self):
+        n_comps = len(self.compliances)
+        n_res = len(self.resistors)
+
+        # compliance arrays
+        for array_name in gas_compliance_arrays:
+            setattr(self, array_name, np.zeros(n_comps))
+
+        for array_name in gas_compliance_flags:
+            setattr(self, array_name, np.zeros(n_comps, dtype=bool))
+
+        for matrix_name in gas_species_matrices:
+            setattr(self, matrix_name, np.zeros((n_comps, len(self.species))))
+
+        # resistor arrays
+        for array_name in resistor_arrays:
+            setattr(self, array_name, np.zeros(n_res))
+
+        for array_name in resistor_flags:
+            setattr(self, array_name, np.zeros(n_res, dtype=bool))
+
+        # copy the current values of the components into the arrays
+        for index, comp in enumerate(self.compliances):
+            for prop, array_name in gas_compliance_props[comp.model_type].items():
+                getattr(self, array_name)[index] = getattr(comp, prop, 0.0)
+            for matrix_name in gas_species_matrices:
+                getattr(self, matrix_name)[index] = getattr(comp, matrix_name)
+
+        for index, res in enumerate(self.resistors):
+            for prop, array_name in gas_resistor_props[res.model_type].items():
+                getattr(self, array_name)[index] = getattr(res, prop, 0.0)
+
+        # the gas law denominators and the temperatures and gas constants they and the water vapour pressures were calculated for
+        self.rt = np.zeros(n_comps)
+        self.temp_key = None
+
+    def bind_components(self):
+        # bind the components to their position in the arrays
+        # the species vectors of the compliances become views on their row of the species matrices, the properties of the single
+        # species (e.g. fo2_dry) read and write these views
+        for index, comp in enumerate(self.compliances):
+            self.bind_component(comp, index, gas_compliance_props[comp.model_type], {}, gas_species_matrices)
+
+        for index, res in enumerate(self.resistors):
+            self.bind_component(res, index, gas_resistor_props[res.model_type], {})
+
+    def calculate_pressures(self, enabled):
+        # calculate the volume above the unstressed volume
+        vol_above_unstressed = self.vol - self.u_vol * self.u_vol_fac
+
+        # calculate the elastance, which is volume dependent in a non-linear way
+        elastance = self.el_base * self.el_base_fac + self.el_k * self.el_k_fac * vol_above_unstressed * vol_above_unstressed
+
+        # calculate the recoil pressure, the net pressure, the relative pressure and the transmural pressure
+        recoil_pressure = vol_above_unstressed * elastance
+        self.store(self.recoil_pressure, recoil_pressure, enabled)
+        self.store(self.pres, recoil_pressure + self.pres_outside + self.p_atm, enabled)
+        self.store(self.pres_rel, self.pres - self.p_atm, enabled)
+        self.store(self.pres_transmural, recoil_pressure - self.pres_outside + self.p_atm, enabled)
+
+        # reset the outside pressure as it needs to be set every model cycle
+        self.store(self.pres_outside, 0.0, enabled)
+
+        # recalculate the water vapour pressures and the gas law denominators only when a temperature or gas constant changed
+        temp_key = self.temp.tobytes() + self.gas_constant.tobytes()
+        if temp_key != self.temp_key:
+            self.ph2o[...] = water_vapour_pressure(self.temp)
+            self.rt[...] = self.gas_constant * (273.15 + self.temp)
+            self.temp_key = temp_key
+
+        # calculate the concentration of molecules in the gas at the current pressure, volume and temperature using the gas law, the fraction of
+        # water vapour and the wet fractions, partial pressures and concentrations of all gas species at once. the disabled compliances are
+        # left out so they keep their composition and their division by a zero pressure is skipped
+        where = True if enabled is None else enabled
+        np.divide(self.pres * 1000, self.rt, out=self.c_total, where=where)
+        np.divide(self.ph2o, self.pres, out=self.fh2o, where=where)
+        wet = (1 - self.fh2o)[..., None]
+        where = True if enabled is None else enabled[..., None]
+        np.multiply(self.f_dry, wet, out=self.f, where=where)
+        f_wet = self.f * wet
+        np.multiply(f_wet, self.pres[..., None], out=self.p, where=where)
+        np.multiply(f_wet, self.c_total[..., None], out=self.c, where=where)
+
+    def calculate_flows(self, enabled):
+        # get the pressures of the compliances on both sides of the resistors
+        p1 = self.pres.take(self.idx_from, axis=-1)
+        p2 = self.pres.take(self.idx_to, axis=-1)
+        dp = p1 - p2
+
+        # calculate the resistance including the flow dependent part of the resistance
+        resistance = np.where(dp > 0, self.r_for * self.r_for_fac, self.r_back * self.r_back_fac) + self.r_k * self.r_k_fac * np.abs(self.flow)
+        np.copyto(self.resistance, resistance, where=self.res_enabled)
+
+        # calculate the flows and check the no_backflow, no_flow and is_enabled flags
+        flow = dp / resistance
+        np.maximum(flow, 0.0, out=flow, where=self.no_backflow)
+        np.copyto(flow, 0.0, where=self.no_flow)
+        np.copyto(flow, 0.0, where=~self.res_enabled)
+        self.flow[...] = flow
+
+        # now we have the flows in l/sec and we have to convert them to l by multiplying them by the modeling_stepsize
+        dvol = flow * self.t
+
+        # only the volumes of the enabled compliances without a fixed composition change
+        dvol_net = dvol @ self.incidence
+        np.add(self.vol, dvol_net, out=self.vol, where=self.comp_enabled & ~self.fixed_composition)
+
+        # the gas flowing into a compliance mixes its dry fractions with the dry fractions of the compliance it comes from, the gas flowing
+        # out of a compliance doesn't change its composition. compliances with a fixed composition or without volume are not mixed
+        dvol = dvol[..., None]
+        f_flow = np.where(dvol > 0, self.f_dry.take(self.idx_from, axis=-2), self.f_dry.take(self.idx_to, axis=-2)) * dvol
+        mixed = ((self.vol > 0) & ~self.fixed_composition)[..., None]
+        df_dry = self.incidence_t @ f_flow - self.f_dry * dvol_net[..., None]
+        np.divide(df_dry, self.vol[..., None], out=df_dry, where=mixed)
+        np.add(self.f_dry, df_dry, out=self.f_dry, where=mixed)
+
+
+class HydraulicsBatch(Hydraulics):
+    # the hydraulics cores of a number of models with the same network are stepped together as one batch. the arrays of the batch have
+    # a row for every model and the arrays of the hydraulics cores of the models become views on their row of the batch arrays
+    def __init__(self, hydraulics_list):
+        # store the hydraulics cores of the models in the batch
+        self.hydraulics_list = hydraulics_list
+
+        # the network of the first model is the network of the whole batch
+        first = hydraulics_list[0]
+        for hydraulics in hydraulics_list:
+            if [comp.name for comp in hydraulics.compliances] != [comp.name for comp in first.compliances] or \
+               [res.name for res in hydraulics.resistors] != [res.name for res in first.resistors]:
+                raise ValueError("the hydraulics cores in a batch must have the same compliances and resistors.")
+
+        self.model = None
+        self.t = first.t
+        for attribute in self.shared_attributes:
+            setattr(self, attribute, getattr(first, attribute))
+
+        # stack the arrays of the models and replace the arrays of the models by views on their row
+        for array_name in self.batch_arrays:
+            batch_array = np.stack([getattr(hydraulics, array_name) for hydraulics in hydraulics_list])
+            setattr(self, array_name, batch_array)
+            for row, hydraulics in enumerate(hydraulics_list):
+                setattr(hydraulics, array_name, batch_array[row])
+
+        # the properties of the components still point to the old arrays so bind them again
+        for hydraulics in hydraulics_list:
+            hydraulics.bind_components()
+
+
+class GasHydraulicsBatch(HydraulicsBatch, GasHydraulics):
+    # the gas hydraulics cores of a number of models with the same gas network are stepped together as one batch
+    pass
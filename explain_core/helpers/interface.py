@@ -8,6 +8,7 @@ import warnings
 warnings.filterwarnings("ignore")
 
 from explain_core.helpers.datacollector import Datacollector
+from explain_core.helpers.beatanalyzer import BeatAnalyzer
 
 class Interface:
     def __init__(self, model):
@@ -23,13 +24,15 @@ class Interface:
         # initialize a datacollector
         self.dc = Datacollector(model)
 
+        # initialize a beat analyzer
+        self.ba = BeatAnalyzer(model)
+
         # plot line colors
         self.lines = ['r-', 'b-', 'g-', 'c-', 'm-', 'y-', 'k-', 'w-']
 
         # define a list holding the prop changes
         self.propChanges = []
         self.prop_update_interval = 0.015
-        self.prop_update_counter = 0
         
         self.output_path = str(os.path.join(Path().absolute())) + r'/'
 
@@ -38,23 +41,20 @@ class Interface:
         # calculate the model steps
         no_steps = int(time_to_calculate / self.model.modeling_stepsize)
         print(f'Calculating model run of {time_to_calculate} sec. in {no_steps} steps.')
-        self.prop_update_counter = 0
         self.model.calculate(time_to_calculate)
         run_duration = round(self.model.run_duration, 3)
         step_duration = round(self.model.step_duration, 4)
         print(f'Ready in {run_duration} sec. Average model step in {step_duration} ms.')
 
-    def model_step(self, model_clock):
-        self.dc.collect_data(model_clock)
-        # process the propchanges
-        if (self.prop_update_counter >= self.prop_update_interval):
-            self.prop_update_counter = 0
-            for change in self.propChanges:
-                change.update()
-                if change.completed:
-                    self.propChanges.remove(change)
-
-        self.prop_update_counter += self.t
+    def update_prop_changes(self):
+        # the model engine calls this function every prop update interval
+        for change in self.propChanges:
+            change.update()
+            # enabling or disabling a component changes the step schedule of the model
+            if change.prop['prop'] == 'is_enabled':
+                self.model.invalidate_schedule()
+            if change.completed:
+                self.propChanges.remove(change)
     
     # property setters and getters
     def set_property(self, prop, new_value, in_time = 0, at_time = 0):
@@ -112,6 +112,37 @@ class Interface:
         self.plot_time_graph(["OUT_NCA.flow","NCA_ALR.flow"], time_to_calculate=time, autoscale=True, combined=combined, sharey=sharey, sampleinterval = 0.0005, ylowerlim=ylowerlim, yupperlim=yupperlim, fill=fill, fill_between=False, analyze=analyze)
 
     # heart plotters
+    def plot_heart_activation(self, heart = 'heart'):
+        # plot the precomputed atrial and ventricular activation curves of the heart model
+        curves = self.model.components[heart].get_activation_curves()
+
+        plt.figure( figsize=(18, 3), dpi=300)
+        plt.plot(curves['atrial_time'], curves['aaf'], self.lines[0], linewidth=1, label = 'aaf')
+        plt.plot(curves['ventricular_time'], curves['vaf'], self.lines[1], linewidth=1, label = 'vaf')
+        plt.xlabel('time since the start of the contraction (s)', fontsize=8)
+        plt.ylabel('activation factor', fontsize=8)
+        plt.xticks(fontsize=8)
+        plt.yticks(fontsize=8)
+        plt.legend(loc='upper center', bbox_to_anchor=(0.5, 1.22), ncol=6, fontsize=8)
+
+        plt.show()
+
+    def plot_ecg(self, time = 5):
+        # calculate the model and plot the ecg signal from the ring buffer of the ecg model
+        ecg = self.model.components['ecg']
+        position = ecg.ecg_samples
+        self.calculate(time)
+        samples, _ = ecg.read_ecg(position)
+
+        plt.figure( figsize=(18, 3), dpi=300)
+        plt.plot(np.arange(len(samples)) * ecg._t, samples, self.lines[0], linewidth=1, label = 'ecg')
+        plt.xlabel('time (s)', fontsize=8)
+        plt.ylabel('ecg signal', fontsize=8)
+        plt.xticks(fontsize=8)
+        plt.yticks(fontsize=8)
+
+        plt.show()
+
     def plot_heart_pressures(self, time=2, combined=True, sharey=True, autoscale=True, ylowerlim=0, yupperlim=100, fill=True, fill_between=False, analyze=False):
         self.plot_time_graph(["LV.pres","RV.pres","LA.pres", "RA.pres", "AA.pres", "PA.pres"], time_to_calculate=time, autoscale=True, combined=combined, sharey=sharey, sampleinterval = 0.0005, ylowerlim=ylowerlim, yupperlim=yupperlim, fill=fill, fill_between=False, analyze=analyze)
         
@@ -157,6 +188,19 @@ class Interface:
     def plot_ventilator_curves(self, time=5, combined=False, sharey=False, autoscale=True, ylowerlim=0, yupperlim=100, fill=False, analyze=True):
         self.plot_time_graph(["MechanicalVentilator.sensor_pressure", "MechanicalVentilator.sensor_flow", "MechanicalVentilator.sensor_volume", "MechanicalVentilator.sensor_co2"], time_to_calculate=time, autoscale=True, combined=combined, sharey=sharey, sampleinterval = 0.0005, ylowerlim=ylowerlim, yupperlim=yupperlim, fill=fill, fill_between=False, analyze=analyze)
     
+    def get_profile(self, time_to_calculate = 10, by = 'name'):
+        # calculate the model in the profiling mode and print the time spent per model step function name or per model type
+        self.model.enable_profiling()
+        self.calculate(time_to_calculate)
+        self.model.disable_profiling()
+
+        profile = self.model.get_profile(by)
+        print(f"{by:<24} {'model_type':<24} {'time (s)':>10} {'calls':>10} {'per call (us)':>14} {'share (%)':>10}")
+        for item in profile:
+            print(f"{item[by]:<24} {item['model_type']:<24} {item['time']:>10.4f} {item['calls']:>10} {item['time_per_call'] * 1e6:>14.2f} {item['share'] * 100:>10.1f}")
+
+        return profile
+
     # getters
     def get_vitals(self, time_to_calculate = 10):
         vitals = {
@@ -172,6 +216,24 @@ class Interface:
         
         return vitals
     
+    def get_beat_analysis(self, components, time_to_calculate = 10):
+        # calculate the model and return the beat by beat pressures, stroke volumes, cardiac outputs and shunt fractions of the components
+        if (isinstance(components, str)):
+            components = [components]
+
+        # the components which are subscribed for this analysis only are unsubscribed again afterwards so the beat analyzer is no longer
+        # stepped, the subscriptions made with ba.subscribe stay
+        added = [name for name in components if name not in self.ba.subscriptions]
+
+        self.ba.clear_beats()
+        self.ba.subscribe(*components)
+        self.calculate(time_to_calculate)
+
+        if len(added) > 0:
+            self.ba.unsubscribe(*added)
+
+        return list(self.ba.beats)
+
     def get_gas_flows(self, time_to_calculate = 10):
         self.dc.clear_watchlist()
 
@@ -0,0 +1,134 @@
+import itertools, os
+
+import numpy as np
+
+from explain_core.helpers.bloodgas import solve_oxygenation, oxygen_dissociation_curve
+
+# the default grid of the oxygen dissociation table as [first value, last value, number of points] per axis.
+# the ph, be and dpg only enter the oxygen dissociation curve through a = 1.04 * (7.4 - ph) + 0.005 * be + 0.07 * (dpg - 5.0)
+# so the table is built on (to2, hemoglobin, a, temp) which covers every combination of (to2, hemoglobin, ph, be, dpg, temp).
+# the to2 axis is the to2 as fraction of the oxygen binding capacity of the hemoglobin so the po2 hardly changes along the hemoglobin axis.
+default_grid = {
+    "to2_fraction": [0.0, 1.3, 131],
+    "hemoglobin": [4.0, 14.0, 11],
+    "a": [-1.0, 1.0, 21],
+    "temp": [30.0, 42.0, 7]
+}
+
+axis_names = ["to2_fraction", "hemoglobin", "a", "temp"]
+
+
+def shift_a(ph, be, dpg):
+    # the shift of the oxygen dissociation curve by the ph, be and dpg
+    return 1.04 * (7.4 - ph) + 0.005 * be + 0.07 * (dpg - 5.0)
+
+
+def binding_capacity(hemoglobin, mmoltoml):
+    # the oxygen binding capacity of the hemoglobin in mmol/l (hemoglobin converted from mmol/l to g/dL, ml O2/dL blood to mmol/l)
+    return 1.36 * (hemoglobin / 0.6206) * 10.0 / mmoltoml
+
+
+class OxygenDissociationTable:
+    # a table of the po2 (in kPa) as function of (to2 fraction, hemoglobin, a, temp) which replaces the root finding of the po2 by a multilinear
+    # interpolation. the natural logarithm of the po2 is interpolated as it varies more evenly over the grid than the po2 itself.
+    def __init__(self, grid = None, mmoltoml = 22.2674, left_o2 = 0.01, right_o2 = 100, filename = ""):
+        self.grid = {name: list(grid[name]) if grid is not None and name in grid else list(default_grid[name]) for name in axis_names}
+        self.mmoltoml = mmoltoml
+        self.left_o2 = left_o2
+        self.right_o2 = right_o2
+
+        # build the axes of the grid
+        self.axes = [np.linspace(*self.grid[name][:2], int(self.grid[name][2])) for name in axis_names]
+        self.lower = np.array([axis[0] for axis in self.axes])
+        self.step = np.array([axis[1] - axis[0] for axis in self.axes])
+        self.shape = np.array([len(axis) for axis in self.axes])
+
+        # load the table from the cache file when it was built with the same grid, otherwise build it (and store it in the cache file)
+        self.table = None
+        if filename and os.path.exists(filename):
+            self.load(filename)
+        if self.table is None:
+            self.build()
+            if filename:
+                self.save(filename)
+
+        # the offsets of the corners of a grid cell in the flattened table
+        strides = np.array([int(np.prod(self.shape[dim + 1:])) for dim in range(len(self.shape))])
+        self.corners = [(np.array(corner), int(np.dot(corner, strides))) for corner in itertools.product([0, 1], repeat = len(self.shape))]
+        self.strides = strides
+        self.flat_table = self.table.ravel()
+
+    def build(self):
+        # solve the po2 on every point of the grid at once
+        to2_fraction, hemoglobin, a, temp = np.meshgrid(*self.axes, indexing = 'ij')
+        to2 = to2_fraction * binding_capacity(hemoglobin, self.mmoltoml)
+        ph = 7.4 - a / 1.04
+        zeros = np.zeros(to2.shape)
+        result = solve_oxygenation(to2.ravel(), hemoglobin.ravel(), ph.ravel(), zeros.ravel(), zeros.ravel() + 5.0, temp.ravel(),
+                                   np.full(to2.size, 5.0), self.left_o2, self.right_o2, self.mmoltoml, 1e-10, 200)
+
+        # the points without a po2 within the bracket are marked as not a number so queries near them fall back to the root finding
+        log_po2 = np.where(result['solved'], np.log(result['po2']), np.nan)
+        self.table = log_po2.reshape(to2.shape)
+
+    def save(self, filename):
+        np.savez(filename, table = self.table, grid = np.array([self.grid[name] for name in axis_names], dtype = float),
+                 constants = np.array([self.mmoltoml, self.left_o2, self.right_o2]))
+        # np.savez adds the npz extension when it's missing
+        if not filename.endswith('.npz') and os.path.exists(filename + '.npz'):
+            os.replace(filename + '.npz', filename)
+
+    def load(self, filename):
+        # only use the stored table when it was built with the same grid and constants
+        with np.load(filename) as data:
+            grid = np.array([self.grid[name] for name in axis_names], dtype = float)
+            constants = np.array([self.mmoltoml, self.left_o2, self.right_o2])
+            if np.array_equal(data['grid'], grid) and np.array_equal(data['constants'], constants):
+                self.table = data['table']
+
+    def lookup(self, to2, hemoglobin, a, temp):
+        # interpolate the po2 (in kPa) of a batch of queries, inside is False for the queries outside the grid
+        points = np.stack([to2 / binding_capacity(hemoglobin, self.mmoltoml), hemoglobin, a, temp], axis = -1)
+        position = (points - self.lower) / self.step
+        inside = np.all((position >= 0) & (position <= self.shape - 1), axis = -1)
+
+        # index of the lower corner of the grid cell and the fraction within the cell
+        index = np.clip(np.floor(position), 0, self.shape - 2).astype(int)
+        fraction = np.clip(position - index, 0.0, 1.0)
+        base = index @ self.strides
+
+        log_po2 = np.zeros(len(base))
+        for corner, offset in self.corners:
+            weight = np.prod(np.where(corner == 1, fraction, 1.0 - fraction), axis = -1)
+            log_po2 += weight * self.flat_table[np.minimum(base + offset, self.flat_table.size - 1)]
+
+        # a cell next to a grid point without a solution is not in the table
+        inside &= ~np.isnan(log_po2)
+        return np.exp(np.where(inside, log_po2, 0.0)), inside
+
+    def accuracy_report(self, no_samples = 2000, seed = 0):
+        # compare the interpolated po2 and so2 with the root finding on random points within the grid
+        rng = np.random.default_rng(seed)
+        samples = [rng.uniform(axis[0], axis[-1], no_samples) for axis in self.axes]
+        to2_fraction, hemoglobin, a, temp = samples
+        to2 = to2_fraction * binding_capacity(hemoglobin, self.mmoltoml)
+        ph = 7.4 - a / 1.04
+        zeros = np.zeros(no_samples)
+
+        exact = solve_oxygenation(to2, hemoglobin, ph, zeros, zeros + 5.0, temp, np.full(no_samples, 5.0), self.left_o2, self.right_o2, self.mmoltoml, 1e-10, 200)
+        po2, inside = self.lookup(to2, hemoglobin, a, temp)
+        compared = inside & exact['solved']
+
+        so2, _ = oxygen_dissociation_curve(po2, ph, zeros, zeros + 5.0, temp)
+        po2_error = np.abs(po2 - exact['po2'])[compared] / 0.1333
+        so2_error = np.abs(so2 - exact['so2'])[compared] * 100
+
+        return {
+            'samples': no_samples,
+            'compared': int(np.count_nonzero(compared)),
+            'outside_table': int(np.count_nonzero(~inside)),
+            'po2_max_error_mmhg': float(po2_error.max()) if po2_error.size > 0 else 0.0,
+            'po2_mean_error_mmhg': float(po2_error.mean()) if po2_error.size > 0 else 0.0,
+            'so2_max_error_percent': float(so2_error.max()) if so2_error.size > 0 else 0.0,
+            'so2_mean_error_percent': float(so2_error.mean()) if so2_error.size > 0 else 0.0
+        }
@@ -0,0 +1,179 @@
+import pickle
+
+import numpy as np
+
+from explain_core.helpers.interface import propChange
+
+# version of the snapshot format
+snapshot_version = 1
+
+# the types which are stored in a snapshot as they are
+plain_types = (bool, int, float, str, type(None), np.ndarray, np.generic)
+
+
+class Unsupported:
+    # marks a value which can't be stored in a snapshot (e.g. a reference to the hydraulics core or a class)
+    pass
+
+
+def encode(value, component_names, model):
+    # encode a value so it can be pickled, references to model components are replaced by their names
+    if isinstance(value, plain_types):
+        return value
+    if id(value) in component_names:
+        return ('__component__', component_names[id(value)])
+    if value is model:
+        return ('__model__',)
+    if isinstance(value, dict):
+        encoded = {}
+        for key, item in value.items():
+            encoded_item = encode(item, component_names, model)
+            if encoded_item is Unsupported:
+                return Unsupported
+            encoded[key] = encoded_item
+        return encoded
+    if isinstance(value, (list, tuple)):
+        encoded = [encode(item, component_names, model) for item in value]
+        if any(item is Unsupported for item in encoded):
+            return Unsupported
+        return ('__list__', encoded) if isinstance(value, list) else ('__tuple__', encoded)
+    return Unsupported
+
+
+def decode(value, model):
+    # decode a value of a snapshot, the names of model components are replaced by references to the components
+    if isinstance(value, tuple):
+        if value[0] == '__component__':
+            return model.components[value[1]]
+        if value[0] == '__model__':
+            return model
+        if value[0] == '__list__':
+            return [decode(item, model) for item in value[1]]
+        if value[0] == '__tuple__':
+            return tuple(decode(item, model) for item in value[1])
+    if isinstance(value, dict):
+        return {key: decode(item, model) for key, item in value.items()}
+    return value
+
+
+def restore_value(current, value):
+    # restore a dictionary in place so dictionaries which are shared between components stay shared
+    if isinstance(current, dict) and isinstance(value, dict):
+        for key in list(current.keys()):
+            if key not in value:
+                del current[key]
+        for key, item in value.items():
+            if key in current and isinstance(current[key], dict) and isinstance(item, dict):
+                restore_value(current[key], item)
+            else:
+                current[key] = item
+        return current
+    return value
+
+
+def encode_object(obj, component_names, model):
+    # encode the attributes of an object which can be stored in a snapshot. the attributes named in the snapshot_exclude property of the class
+    # (tables derived from other properties and output buffers) are left out, the restored object keeps its own values of these attributes
+    state = {}
+    excluded = getattr(type(obj), 'snapshot_exclude', ())
+    for key, value in obj.__dict__.items():
+        if key in excluded:
+            continue
+        encoded = encode(value, component_names, model)
+        if encoded is not Unsupported:
+            state[key] = encoded
+    return state
+
+
+def restore_object(obj, state, model):
+    # restore the attributes of an object from a snapshot
+    for key, value in state.items():
+        value = decode(value, model)
+        current = obj.__dict__.get(key, None)
+        setattr(obj, key, restore_value(current, value))
+
+
+def take_snapshot(model):
+    # the references between the components are stored as component names
+    component_names = {id(comp): name for name, comp in model.components.items()}
+
+    snapshot = {
+        'version': snapshot_version,
+        'name': model.name,
+        'components': {name: encode_object(comp, component_names, model) for name, comp in model.components.items()},
+        'model_clock': model.model_clock,
+        'rate_countdowns': {rate_group[1]: rate_group[0] for rate_group in model.rate_schedule},
+        'prop_changes': [],
+        'watch_list': [parameter['label'] for parameter in model.io.dc.watch_list if parameter['model'] is not None],
+        'sample_interval': model.io.dc.sample_interval,
+        'beat_subscriptions': list(model.io.ba.subscriptions),
+        'hydraulics': None,
+        'gas_hydraulics': None
+    }
+
+    # the property changes are stored with the label of the property they change
+    for change in model.io.propChanges:
+        change_state = encode_object(change, component_names, model)
+        change_state['prop'] = change.prop['label']
+        snapshot['prop_changes'].append(change_state)
+
+    # in the vectorized hydraulics and gas modes the state of the compliances and resistors lives in the arrays of the hydraulics cores
+    if model.hydraulics is not None:
+        snapshot['hydraulics'] = {key: value.copy() for key, value in model.hydraulics.__dict__.items() if isinstance(value, np.ndarray)}
+    if model.gas_hydraulics is not None:
+        snapshot['gas_hydraulics'] = {key: value.copy() for key, value in model.gas_hydraulics.__dict__.items() if isinstance(value, np.ndarray)}
+
+    return pickle.dumps(snapshot, protocol = pickle.HIGHEST_PROTOCOL)
+
+
+def restore_snapshot(model, data):
+    snapshot = pickle.loads(data)
+
+    # check whether the snapshot belongs to this model
+    if snapshot.get('version') != snapshot_version:
+        raise ValueError(f"snapshot version {snapshot.get('version')} is not supported.")
+    if snapshot['name'] != model.name or set(snapshot['components']) != set(model.components):
+        raise ValueError(f"snapshot of the {snapshot['name']} model does not match the components of the {model.name} model.")
+    if (snapshot['hydraulics'] is None) != (model.hydraulics is None):
+        raise ValueError("snapshot and model differ in the vectorized hydraulics mode.")
+    if (snapshot.get('gas_hydraulics') is None) != (model.gas_hydraulics is None):
+        raise ValueError("snapshot and model differ in the vectorized gas mode.")
+
+    # restore the arrays of the hydraulics core in place as the properties of the components (and the rows of an ensemble) are views on them
+    if model.hydraulics is not None:
+        for key, value in snapshot['hydraulics'].items():
+            getattr(model.hydraulics, key)[...] = value
+    if model.gas_hydraulics is not None:
+        for key, value in snapshot['gas_hydraulics'].items():
+            getattr(model.gas_hydraulics, key)[...] = value
+
+    # restore the components, the components with derived inputs recalculate their derived values before they use them again
+    for name, state in snapshot['components'].items():
+        comp = model.components[name]
+        restore_object(comp, state, model)
+        if hasattr(comp, 'derived_input_names'):
+            comp._derived_dirty = True
+
+    # restore the model clock and the phase of the rate groups
+    model.model_clock = snapshot['model_clock']
+    model.rate_schedule = [[countdown, update_steps, []] for update_steps, countdown in snapshot['rate_countdowns'].items()]
+    model.invalidate_schedule()
+
+    # restore the property changes
+    model.io.propChanges = []
+    for change_state in snapshot['prop_changes']:
+        change = propChange.__new__(propChange)
+        restore_object(change, change_state, model)
+        change.prop = model.io.find_model_prop(change_state['prop'])
+        model.io.propChanges.append(change)
+
+    # restore the datacollector
+    model.io.dc.clear_watchlist()
+    for label in snapshot['watch_list']:
+        if label not in [parameter['label'] for parameter in model.io.dc.watch_list]:
+            model.io.dc.add_to_watchlist(model.io.find_model_prop(label))
+    model.io.dc.sample_interval = snapshot['sample_interval']
+
+    # restore the subscriptions of the beat analyzer, the analysis starts again at the next qrs complex
+    model.io.ba.clear_subscriptions()
+    model.io.ba.subscribe(*snapshot.get('beat_subscriptions', []))
@@ -0,0 +1,98 @@
+import hashlib, json, os, sys
+from functools import lru_cache
+from pathlib import Path
+
+# the folder of the explain_core package
+package_folder = Path(__file__).resolve().parent.parent
+
+
+def hash_definition(model_definition, *extra):
+    # calculate a sha256 hash of the model definition (and of extra settings which change the settled state)
+    definition_text = json.dumps([model_definition, extra], sort_keys = True, default = str)
+    return hashlib.sha256(definition_text.encode('utf-8')).hexdigest()
+
+
+def get_code_files(components):
+    # return the source files of the explain_core package and of the modules of the model components (e.g. the custom models) with their
+    # modification time, the modification time makes sure a file which was changed is hashed again
+    filenames = {str(path) for path in package_folder.rglob('*.py')}
+    for comp in components:
+        filename = getattr(sys.modules.get(type(comp).__module__), '__file__', None)
+        if filename is not None:
+            filenames.add(os.path.abspath(filename))
+    return tuple((filename, os.stat(filename).st_mtime_ns) for filename in sorted(filenames))
+
+
+@lru_cache(maxsize = None)
+def hash_code(code_files):
+    # calculate a sha256 hash of the contents of the source files, a change of the model code changes the settled state of a model
+    code_hash = hashlib.sha256()
+    for filename, _ in code_files:
+        code_hash.update(os.path.basename(filename).encode('utf-8'))
+        with open(filename, 'rb') as code_file:
+            code_hash.update(code_file.read())
+    return code_hash.hexdigest()
+
+
+class StateCache:
+    # a cache of settled model states (snapshots) in a local directory, keyed by the hash of the model definition.
+    # when the files in the cache directory exceed the maximum size the least recently used states are removed.
+    def __init__(self, cache_dir = None, max_size = 100 * 1024 * 1024):
+        # the cache directory defaults to the EXPLAIN_STATE_CACHE environment variable or a .state_cache folder in the working directory
+        if cache_dir is None:
+            cache_dir = os.environ.get('EXPLAIN_STATE_CACHE', str(os.path.join(Path().absolute(), '.state_cache')))
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+    def get_filename(self, key):
+        return os.path.join(self.cache_dir, key + '.snap')
+
+    def get(self, key):
+        # return the stored state or None when the state is not in the cache
+        filename = self.get_filename(key)
+        try:
+            with open(filename, 'rb') as state_file:
+                data = state_file.read()
+        except FileNotFoundError:
+            return None
+
+        # mark the state as recently used
+        os.utime(filename)
+        return data
+
+    def put(self, key, data):
+        # write the state to a temporary file first so other processes never read a half written state
+        filename = self.get_filename(key)
+        temp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(temp_filename, 'wb') as state_file:
+            state_file.write(data)
+        os.replace(temp_filename, filename)
+
+        self.evict()
+
+    def evict(self):
+        # remove the least recently used states until the cache fits in the maximum size
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.snap'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        # remove all states from the cache
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.snap'):
+                os.remove(entry.path)
@@ -0,0 +1,119 @@
+import numpy as np
+
+# model types of the components holding a volume which are followed by the steady state finder
+volume_model_types = ["BloodCompliance", "TimeVaryingElastance", "GasCompliance"]
+
+# the concentrations of the blood containing components which are followed by the steady state finder
+blood_species = ["to2", "tco2"]
+
+
+def get_fields(model):
+    # return the list of component properties which determine whether the model is in its steady state
+    fields = []
+    for comp in model.components.values():
+        if comp.model_type in volume_model_types and comp.is_enabled:
+            fields.append((comp, 'vol'))
+            if getattr(comp, 'content', '') == 'blood':
+                for species in blood_species:
+                    fields.append((comp, species))
+    return fields
+
+
+def get_cycle_period(model):
+    # the model is driven by the heart cycle and the breathing or ventilator cycle, the window over which the properties are averaged
+    # is the longest of these cycles rounded up to a whole number of heart cycles
+    heart_period = 0.0
+    breath_period = 0.0
+    for comp in model.components.values():
+        if comp.model_type == 'Ecg' and comp.is_enabled and comp.heart_rate > 0:
+            heart_period = 60.0 / comp.heart_rate
+        if comp.model_type == 'Breathing' and comp.is_enabled and comp.spont_breathing_enabled and comp.spont_resp_rate > 0:
+            breath_period = max(breath_period, 60.0 / comp.spont_resp_rate)
+        if comp.model_type == 'MechanicalVentilator' and comp.is_enabled and comp.freq > 0:
+            breath_period = max(breath_period, 60.0 / comp.freq)
+
+    if heart_period == 0.0:
+        return max(breath_period, 1.0)
+    if breath_period == 0.0:
+        return heart_period
+    return np.ceil(breath_period / heart_period) * heart_period
+
+
+def run_window(model, fields, window, sample_interval):
+    # run the model for one window and return the mean of the fields over the window
+    no_samples = max(1, int(round(window / sample_interval)))
+    total = np.zeros(len(fields))
+    for _ in range(no_samples):
+        model.calculate(sample_interval)
+        total += [getattr(comp, prop) for comp, prop in fields]
+    return total / no_samples, no_samples * sample_interval
+
+
+def extrapolate(fields, means, max_ratio):
+    # aitken extrapolation of the slowly converging concentrations. when the change of the window means shrinks with a constant
+    # ratio r the remaining change is d * r / (1 - r) so this is added to the current concentrations
+    d1 = means[-2] - means[-3]
+    d2 = means[-1] - means[-2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(d1 != 0, d2 / d1, 0.0)
+    shift = np.where((ratio > 0) & (ratio < max_ratio), d2 * ratio / (1 - ratio), 0.0)
+
+    no_extrapolated = 0
+    for index, (comp, prop) in enumerate(fields):
+        if prop in blood_species and shift[index] != 0.0:
+            setattr(comp, prop, max(0.0, getattr(comp, prop) + float(shift[index])))
+            no_extrapolated += 1
+    return no_extrapolated
+
+
+def find_steady_state(model, tolerance = 3e-3, max_time = 120.0, window = None, extrapolation = False, max_ratio = 0.9, sample_interval = 0.005):
+    # run the model cycle by cycle until the window means of the compliance volumes and blood concentrations change less than the tolerance
+    fields = get_fields(model)
+    labels = [f"{comp.name}.{prop}" for comp, prop in fields]
+
+    means = []
+    history = []
+    run_time = 0.0
+    no_windows = 0
+    no_extrapolations = 0
+    max_change = np.inf
+    max_change_field = ''
+    converged = False
+
+    while run_time < max_time:
+        window_time = window if window is not None else get_cycle_period(model)
+        mean, duration = run_window(model, fields, window_time, sample_interval)
+        run_time += duration
+        no_windows += 1
+        means.append(mean)
+
+        if len(means) < 2:
+            continue
+
+        # calculate the relative change of the window means of the last two windows
+        change = np.abs(means[-1] - means[-2]) / np.maximum(np.abs(means[-1]), 1e-6)
+        max_index = int(np.argmax(change))
+        max_change = float(change[max_index])
+        max_change_field = labels[max_index]
+        history.append(max_change)
+
+        if max_change < tolerance:
+            converged = True
+            break
+
+        # extrapolate the concentrations when three consecutive windows are available, after an extrapolation three new windows are needed
+        if extrapolation and len(means) >= 3:
+            if extrapolate(fields, means, max_ratio) > 0:
+                no_extrapolations += 1
+                means = []
+
+    return {
+        'converged': converged,
+        'time': run_time,
+        'windows': no_windows,
+        'max_change': max_change,
+        'max_change_field': max_change_field,
+        'tolerance': tolerance,
+        'history': history,
+        'extrapolations': no_extrapolations
+    }
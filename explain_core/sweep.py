@@ -0,0 +1,139 @@
+# import basic python modules
+import itertools, os
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+# import the numpy module for the compact result arrays
+import numpy as np
+
+# import the model engine and the property changes of the model interface
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.interface import propChange
+
+# import the helpers to load the model definition and to set the parameters of a job
+from explain_core.helpers.definition import load_definition, apply_parameters
+
+# the model engine of a worker process, it is built once by the initializer of the worker and reused for all jobs of the worker. every job
+# starts from the snapshot of the model which is taken right after it was built
+_worker_model = None
+_worker_snapshot = None
+_worker_settings = {}
+
+
+def get_jobs(grid):
+    # a grid is a dictionary with a list of values for every 'component.prop', the jobs are all combinations of these values.
+    # a list of dictionaries is used as a list of jobs as is.
+    if isinstance(grid, dict):
+        parameters = list(grid.keys())
+        return [dict(zip(parameters, values)) for values in itertools.product(*grid.values())]
+    return [dict(job) for job in grid]
+
+
+def init_worker(model_definition, vectorized_hydraulics, warmup, sample_interval):
+    global _worker_model, _worker_snapshot, _worker_settings
+
+    # build the model engine of this worker once and store its initial state
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        _worker_model = ModelEngine(apply_parameters(model_definition, {}), vectorized_hydraulics = vectorized_hydraulics)
+    _worker_snapshot = _worker_model.snapshot()
+
+    _worker_settings = {
+        'model_definition': model_definition,
+        'vectorized_hydraulics': vectorized_hydraulics,
+        'warmup': warmup,
+        'sample_interval': sample_interval
+    }
+
+
+def run_job(job):
+    # unpack the job
+    parameters, duration, outputs = job
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # get a model with the parameters of this job
+        model = get_job_model(parameters)
+
+        # let the model settle before the outputs are sampled
+        if _worker_settings['warmup'] > 0:
+            model.calculate(_worker_settings['warmup'])
+
+        # run the model in chunks of the sample interval and sample the outputs after every chunk
+        sample_interval = _worker_settings['sample_interval']
+        props = [find_output(model, output) for output in outputs]
+        samples = np.zeros((max(1, int(round(duration / sample_interval))), len(outputs)))
+        for sample in range(samples.shape[0]):
+            model.calculate(sample_interval)
+            for column, (comp, prop) in enumerate(props):
+                samples[sample, column] = getattr(comp, prop)
+
+    # only send the summary of the outputs back to the main process
+    return np.stack([samples.mean(axis=0), samples.min(axis=0), samples.max(axis=0)])
+
+
+def get_job_model(parameters):
+    # the settings of the model itself (e.g. the modeling_stepsize or the weight) are read by the components when the model is built, so a
+    # property change can't set them. a job with such a setting gets a new model built from the definition with the parameters of the job,
+    # the other jobs restore the initial state of the model of the worker and set their parameters on it
+    if any(len(prop.split(sep=".")) == 1 for prop in parameters):
+        return ModelEngine(apply_parameters(_worker_settings['model_definition'], parameters), vectorized_hydraulics = _worker_settings['vectorized_hydraulics'])
+
+    _worker_model.restore(_worker_snapshot)
+    set_parameters(_worker_model, parameters)
+    return _worker_model
+
+
+def set_parameters(model, parameters):
+    # set the parameters of a job on the running model as property changes which take effect at once. the parameters are given as
+    # 'component.prop' keys, the settings of the model itself can only be set by building the model (see get_job_model)
+    for prop, value in parameters.items():
+        t = prop.split(sep=".")
+        if len(t) == 1:
+            raise KeyError(f"parameter {prop} is a setting of the model which is only read when the model is built.")
+
+        comp = find_component(model, t[0])
+        if comp is None or not hasattr(comp, t[1]):
+            raise KeyError(f"parameter {prop} not found.")
+        propChange({'label': prop, 'model': comp, 'prop': t[1]}, value, 0).complete()
+
+
+def find_component(model, name):
+    # find a component by its name or by its key in the model definition
+    if name in model.components:
+        return model.components[name]
+    for key, component_definition in model.model_definition['components'].items():
+        if key == name:
+            return model.components[component_definition['name']]
+    return None
+
+
+def find_output(model, output):
+    # find the component of an output, the component is given by its name or by its key in the model definition
+    t = output.split(sep=".")
+    comp = find_component(model, t[0])
+    if comp is None:
+        raise KeyError(f"output {output} not found.")
+    return comp, t[1]
+
+
+def run(definition, grid, duration, outputs, max_workers = None, warmup = 0.0, sample_interval = 0.005, vectorized_hydraulics = False, chunksize = 1):
+    # run the model for every combination of parameters in the grid over a pool of worker processes and return the mean, min and max of the
+    # outputs over the duration of every job. the definition is a model definition filename or dictionary.
+    if not isinstance(definition, dict):
+        definition = load_definition(definition)
+
+    jobs = get_jobs(grid)
+    parameters = list(jobs[0].keys()) if len(jobs) > 0 else []
+
+    with ProcessPoolExecutor(max_workers = max_workers, initializer = init_worker, initargs = (definition, vectorized_hydraulics, warmup, sample_interval)) as executor:
+        summaries = list(executor.map(run_job, [(job, duration, outputs) for job in jobs], chunksize = chunksize))
+
+    summaries = np.array(summaries).reshape(len(jobs), 3, len(outputs))
+
+    return {
+        'parameters': parameters,
+        'values': np.array([[job[parameter] for parameter in parameters] for job in jobs]),
+        'outputs': list(outputs),
+        'mean': summaries[:, 0, :],
+        'min': summaries[:, 1, :],
+        'max': summaries[:, 2, :]
+    }
@@ -0,0 +1,4 @@
+# make the explain_core package importable when the tests are run with pytest from any folder
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+# tests of the subscriptions of the beat analyzer: the beat analysis of the interface only keeps the beat analyzer in the step schedule
+# while it calculates
+import os
+
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture
+def model():
+    model = ModelEngine(definition)
+    model.calculate(0.5)
+    return model
+
+
+def scheduled(model):
+    return 'beatanalyzer' in [entry['name'] for entry in model.get_schedule()]
+
+
+def test_beat_analysis_unsubscribes(model):
+    beats = model.io.get_beat_analysis(['AA', 'LV_AA'], 2)
+
+    assert len(beats) > 0
+    assert list(beats[-1]['pressures']) == ['AA']
+    assert list(beats[-1]['flows']) == ['LV_AA']
+    assert model.io.ba.subscriptions == []
+    assert not scheduled(model)
+
+
+def test_beat_analysis_keeps_existing_subscriptions(model):
+    model.io.ba.subscribe('LV')
+    beats = model.io.get_beat_analysis('AA', 2)
+
+    assert set(beats[-1]['pressures']) == {'LV', 'AA'}
+    assert model.io.ba.subscriptions == ['LV']
+    assert scheduled(model)
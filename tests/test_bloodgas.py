@@ -0,0 +1,141 @@
+# tests of the vectorized blood gas solvers: every row of a batch converges on its own so the solution and the number of iterations
+# of a row don't depend on the other rows of the batch
+import math
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.bloodgas import solve_acidbase, solve_acidbase_from_pco2, solve_oxygenation
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+kw = math.pow(10.0, -13.6) * 1000.0
+kc = math.pow(10.0, -6.1) * 1000.0
+kd = math.pow(10.0, -10.22) * 1000.0
+alpha_co2p = 0.03067
+left_hp = math.pow(10.0, -7.8) * 1000.0
+right_hp = math.pow(10.0, -6.8) * 1000.0
+
+
+def solve_from_pco2(pco2, sid):
+    pco2 = np.asarray(pco2, dtype = float)
+    sid = np.asarray(sid, dtype = float)
+    ones = np.ones(pco2.shape)
+    return solve_acidbase_from_pco2(pco2, sid, 30.0 * ones, 1.8 * ones, 4.0 * ones, 8.0 * ones, np.full(pco2.shape, 1000.0 * 10.0 ** -7.4),
+                                    left_hp, right_hp, kc, kd, kw, alpha_co2p)
+
+
+def test_rows_converge_independently():
+    pco2 = [30.0, 45.0, 70.0]
+    sid = [38.0, 41.6, 46.0]
+    batch = solve_from_pco2(pco2, sid)
+
+    for row in range(len(pco2)):
+        single = solve_from_pco2(pco2[row:row + 1], sid[row:row + 1])
+        assert batch['solved'][row]
+        assert batch['ph'][row] == single['ph'][0]
+        assert batch['iterations'][row] == single['iterations'][0]
+
+
+def test_missing_inputs_are_masked():
+    batch = solve_from_pco2([45.0, np.nan, 45.0], [41.6, 41.6, np.nan])
+    single = solve_from_pco2([45.0], [41.6])
+
+    assert batch['solved'].tolist() == [True, False, False]
+    assert batch['iterations'].tolist() == [single['iterations'][0], 0, 0]
+    assert batch['ph'][0] == pytest.approx(single['ph'][0], abs = 0.0)
+
+
+def solve_from_tco2(tco2, sid):
+    tco2 = np.asarray(tco2, dtype = float)
+    sid = np.asarray(sid, dtype = float)
+    ones = np.ones(tco2.shape)
+    return solve_acidbase(tco2, sid, 30.0 * ones, 1.8 * ones, 4.0 * ones, 8.0 * ones, np.full(tco2.shape, 1000.0 * 10.0 ** -7.4),
+                          left_hp, right_hp, kc, kd, kw, alpha_co2p)
+
+
+def test_iterations_are_counted_per_row():
+    # a row which starts at its solution needs fewer newton steps than a row far from its solution
+    start = solve_from_tco2([24.9], [41.6])
+    tco2 = np.array([24.9, 30.0])
+    sid = np.array([41.6, 45.0])
+    hp_start = np.array([start['hp'][0], 1000.0 * 10.0 ** -6.9])
+    ones = np.ones(2)
+    batch = solve_acidbase(tco2, sid, 30.0 * ones, 1.8 * ones, 4.0 * ones, 8.0 * ones, hp_start, left_hp, right_hp, kc, kd, kw, alpha_co2p)
+
+    assert batch['solved'].all()
+    assert batch['iterations'][0] < batch['iterations'][1]
+    assert batch['ph'][1] == pytest.approx(solve_from_tco2([30.0], [45.0])['ph'][0], abs = 1e-6)
+
+
+def test_solver_stats_count_the_iterations_of_every_compartment():
+    model = ModelEngine(definition)
+    blood = [comp for comp in model.components.values() if comp.model_type == 'Blood'][0]
+    blood.acidbase_solver = "batched"
+    model.calculate(0.1)
+    blood.reset_solver_stats()
+
+    comps = blood.get_acidbase_components()
+    inputs = blood.get_acidbase_arrays(comps)
+    expected = blood.solve_acidbase_arrays(inputs)['iterations']
+    blood.acidbase_batched(comps)
+
+    assert [comp.acidbase_iterations for comp in comps] == expected.tolist()
+    assert blood.steps == max(expected)
+
+
+mmoltoml = 22.2674
+
+
+def solve_po2(to2, ph = 7.4, po2_start = 5.0):
+    to2 = np.asarray(to2, dtype = float)
+    ones = np.ones(to2.shape)
+    return solve_oxygenation(to2, 8.0 * ones, ph * ones, 0.0 * ones, 5.0 * ones, 37.0 * ones, po2_start * ones, 0.01, 100, mmoltoml)
+
+
+def test_oxygenation_rows_converge_independently():
+    to2 = [2.0, 4.0, 6.5]
+    batch = solve_po2(to2)
+
+    for row in range(len(to2)):
+        single = solve_po2(to2[row:row + 1])
+        assert batch['solved'][row]
+        assert batch['po2'][row] == single['po2'][0]
+        assert batch['iterations'][row] == single['iterations'][0]
+
+
+def test_oxygenation_missing_inputs_are_masked():
+    batch = solve_po2([6.0, np.nan, 6.0], ph = np.array([7.4, 7.4, np.nan]))
+    single = solve_po2([6.0])
+
+    assert batch['solved'].tolist() == [True, False, False]
+    assert batch['iterations'].tolist() == [single['iterations'][0], 0, 0]
+    assert batch['po2'][0] == single['po2'][0]
+
+
+def test_batched_oxygenation_matches_brent():
+    # the documented tolerance of the batched oxygenation solver: within 1e-4 mmHg po2 and 1e-4 % so2 of the brent root finding
+    model = ModelEngine(definition)
+    model.calculate(0.1)
+    blood = [comp for comp in model.components.values() if comp.model_type == 'Blood'][0]
+    comps = blood.blood_components
+
+    rng = np.random.default_rng(0)
+    for comp in comps:
+        comp.to2 = rng.uniform(0.5, 10.5)
+        comp.be = rng.uniform(-10.0, 10.0)
+        comp.dpg = rng.uniform(3.0, 7.0)
+
+    brent = []
+    for comp in comps:
+        blood.oxygenation(comp)
+        brent.append((comp.po2, comp.so2))
+
+    for comp in comps:
+        comp.po2 = 75.0
+    blood.oxygenation_batched(comps)
+    batched = [(comp.po2, comp.so2) for comp in comps]
+
+    assert np.abs(np.array(batched) - np.array(brent)).max() < 1e-4
@@ -0,0 +1,121 @@
+# invalidation tests of the derived parameters: a component recalculates its derived values after one of its derived inputs got a new
+# value, however the value was set, and leaves them alone when nothing changed
+import os
+
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture
+def model():
+    model = ModelEngine(definition)
+    model.calculate(0.1)
+    return model
+
+
+def count_updates(comp):
+    # count the calls of the update_derived method of a component
+    calls = []
+    update_derived = comp.update_derived
+
+    def counted_update_derived():
+        calls.append(comp.model.model_clock)
+        update_derived()
+
+    comp.update_derived = counted_update_derived
+    return calls
+
+
+def test_direct_assignment_recalculates(model):
+    aa = model.components['AA']
+    calls = count_updates(aa)
+
+    aa.el_base = aa.el_base * 2.0
+    assert aa._derived_dirty
+
+    model.calculate(0.001)
+    assert len(calls) == 1
+    assert not aa._derived_dirty
+    assert aa._el_base_total == pytest.approx(aa.el_base * aa.el_base_fac)
+
+
+def test_set_property_recalculates(model):
+    aa = model.components['AA']
+    calls = count_updates(aa)
+
+    model.io.set_property('AA.el_base_fac', 2.0)
+    model.calculate(0.05)
+    assert len(calls) == 1
+    assert aa._el_base_total == pytest.approx(aa.el_base * 2.0)
+
+
+def test_prop_change_in_time_recalculates(model):
+    # a property change in time sets a new value every update interval of the interface
+    aa = model.components['AA']
+    calls = count_updates(aa)
+
+    model.io.set_property('AA.el_base_fac', 1.5, in_time = 0.1)
+    model.calculate(0.2)
+    assert len(calls) > 1
+    assert aa.el_base_fac == pytest.approx(1.5)
+    assert aa._el_base_total == pytest.approx(aa.el_base * 1.5)
+
+
+def test_effector_write_recalculates(model):
+    ecg = model.components['ecg']
+    ef_hr = model.components['ef_hr']
+
+    ef_hr.reference = ef_hr.reference + 20.0
+    ef_hr.model_step()
+    assert ecg._derived_dirty
+
+    ecg.model_step()
+    assert not ecg._derived_dirty
+    assert ecg._sa_node_period == pytest.approx(60.0 / ecg.heart_rate)
+    assert ecg.cqt_time == pytest.approx(ecg.qtc() - ecg.qrs_time)
+
+
+def test_snapshot_restore_recalculates(model):
+    aa = model.components['AA']
+    snapshot = model.snapshot()
+    el_base_total = aa._el_base_total
+
+    aa.el_base = aa.el_base * 2.0
+    model.calculate(0.01)
+    assert aa._el_base_total != pytest.approx(el_base_total)
+
+    calls = count_updates(aa)
+    model.restore(snapshot)
+    model.calculate(0.001)
+    assert aa._el_base_total == pytest.approx(el_base_total)
+    assert aa._el_base_total == pytest.approx(aa.el_base * aa.el_base_fac)
+    assert len(calls) <= 1
+
+
+def test_unchanged_value_does_not_recalculate(model):
+    aa = model.components['AA']
+    calls = count_updates(aa)
+
+    aa.el_base = aa.el_base
+    assert not aa._derived_dirty
+
+    model.calculate(0.01)
+    assert calls == []
+
+
+def test_steady_effector_does_not_recalculate(model):
+    # an effector without gain writes its reference value to the heart rate and the minute volume every model step
+    ecg = model.components['ecg']
+    breathing = model.components['breathing']
+    model.components['ef_hr'].gain = 0.0
+    model.components['ef_mv'].gain = 0.0
+    model.calculate(0.01)
+
+    ecg_calls = count_updates(ecg)
+    breathing_calls = count_updates(breathing)
+    model.calculate(0.5)
+    assert ecg_calls == []
+    assert breathing_calls == []
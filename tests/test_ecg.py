@@ -0,0 +1,68 @@
+# tests of the ring buffer of the ecg: read_ecg returns the samples written since a position, also when the samples wrap around the end
+# of the buffer, and only the samples which are still in the buffer when it has been overwritten
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.definition import load_definition, apply_parameters
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+buffer_size = 100
+
+
+@pytest.fixture
+def model():
+    model = ModelEngine(apply_parameters(load_definition(definition), {'ecg.ecg_buffer_size': buffer_size}))
+    model.calculate(0.01)
+    return model
+
+
+def record(model, no_steps):
+    # run the model step by step and record the ecg signal of every step
+    signals = []
+    for _ in range(no_steps):
+        model.calculate(model.modeling_stepsize)
+        signals.append(model.components['ecg'].ecg_signal)
+    return signals
+
+
+def test_reads_across_the_end_of_the_buffer(model):
+    ecg = model.components['ecg']
+    _, position = ecg.read_ecg(ecg.ecg_samples)
+
+    # read in chunks which don't divide the buffer size so the reads start and end at every part of the buffer
+    signals = []
+    samples = []
+    for _ in range(8):
+        signals += record(model, 37)
+        chunk, position = ecg.read_ecg(position)
+        samples += chunk.tolist()
+
+    assert len(signals) > 2 * buffer_size
+    assert samples == signals
+    assert position == ecg.ecg_samples
+
+
+def test_overwritten_samples_are_skipped(model):
+    ecg = model.components['ecg']
+    _, position = ecg.read_ecg(ecg.ecg_samples)
+
+    signals = record(model, 250)
+    samples, next_position = ecg.read_ecg(position)
+    assert samples.tolist() == signals[-buffer_size:]
+    assert next_position == position + 250
+
+    # a read from a position which is still in the buffer returns the samples from that position
+    samples, _ = ecg.read_ecg(position + 200)
+    assert samples.tolist() == signals[200:]
+
+
+def test_read_without_new_samples(model):
+    ecg = model.components['ecg']
+    samples, position = ecg.read_ecg(ecg.ecg_samples)
+    assert len(samples) == 0
+    assert position == ecg.ecg_samples
+    assert isinstance(samples, np.ndarray)
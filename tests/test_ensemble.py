@@ -0,0 +1,55 @@
+# tests of the ensemble engine: every patient of an ensemble follows the same course as the patient run on its own with the same
+# vectorized cores and batched blood gas solvers, and blood models with other solver constants can't be solved as one batch
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.EnsembleEngine import EnsembleEngine
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.definition import load_definition, apply_parameters
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+parameters = {'AA.el_base_fac': [1.0, 1.2], 'ecg.heart_rate': [140.0, 160.0]}
+signals = ['AA.pres', 'LV.vol', 'ALL.fo2_dry', 'AA.ph', 'AA.po2']
+
+
+def standalone(patient_parameters):
+    model = ModelEngine(apply_parameters(load_definition(definition), patient_parameters), vectorized_hydraulics = True, vectorized_gas = True)
+    blood = model.components['blood']
+    blood.acidbase_solver = "batched"
+    blood.oxygenation_solver = "batched"
+    model.calculate(0.5)
+    return model
+
+
+def test_ensemble_matches_standalone_patients():
+    ensemble = EnsembleEngine(definition, parameters)
+    ensemble.calculate(0.5)
+
+    for patient in range(ensemble.no_patients):
+        model = standalone({prop: values[patient] for prop, values in parameters.items()})
+        for signal in signals:
+            comp, prop = signal.split('.')
+            # the arrays of the ensemble are solved in other shapes than those of one patient, which only changes the last bits
+            assert ensemble.get_property(signal)[patient] == pytest.approx(getattr(model.components[comp], prop), rel = 1e-12)
+
+    # the patients differ from each other
+    assert ensemble.get_property('AA.pres')[0] != ensemble.get_property('AA.pres')[1]
+
+
+def test_blood_models_with_other_constants_are_rejected():
+    with pytest.raises(ValueError, match = 'mmoltoml'):
+        EnsembleEngine(definition, {'blood.mmoltoml': [22.2674, 22.4]})
+
+    ensemble = EnsembleEngine(definition, no_patients = 2)
+    ensemble.models[1].components['blood'].kc *= 1.01
+    with pytest.raises(ValueError, match = 'kc'):
+        ensemble.calculate(0.01)
+
+
+def test_blood_models_with_other_constants_can_step_on_their_own():
+    ensemble = EnsembleEngine(definition, {'blood.mmoltoml': [22.2674, 22.4]}, batched_blood = False)
+    ensemble.calculate(0.01)
+    assert np.all(ensemble.get_property('AA.po2') > 0)
@@ -0,0 +1,40 @@
+# tests of the per species properties of the gas components: the dry fractions can be set per species while the wet fractions and
+# concentrations, which are calculated from the dry fractions, are read only in the scalar and in the vectorized gas model
+import os
+
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture(params = [False, True], ids = ['scalar', 'vectorized'])
+def model(request):
+    model = ModelEngine(definition, vectorized_gas = request.param, vectorized_hydraulics = request.param)
+    model.calculate(0.1)
+    return model
+
+
+def test_derived_species_are_read_only(model):
+    comp = model.components['ALL']
+    fo2 = comp.fo2
+    co2 = comp.co2
+
+    with pytest.raises(AttributeError, match = 'fo2_dry'):
+        comp.fo2 = 0.5
+    with pytest.raises(AttributeError, match = 'fo2_dry'):
+        comp.co2 = 0.5
+    assert comp.fo2 == fo2
+    assert comp.co2 == co2
+
+
+def test_dry_fractions_can_be_set(model):
+    comp = model.components['ALL']
+    comp.fo2_dry = 0.5
+    assert comp.fo2_dry == 0.5
+    assert comp.f_dry[comp.gas_species.index('o2')] == 0.5
+
+    # the wet fraction follows the dry fraction in the next model step
+    model.calculate(model.modeling_stepsize)
+    assert comp.fo2 == pytest.approx(0.5 * (1 - comp.fh2o), rel = 0.05)
@@ -0,0 +1,52 @@
+# tests of the activation functions of the heart: the templates are built once and a change of the ecg timings only stretches them
+import math
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture
+def model():
+    model = ModelEngine(definition)
+    model.calculate(0.1)
+    return model
+
+
+def test_heart_rate_change_keeps_templates(model):
+    heart = model.components['heart']
+    aaf_template = heart._aaf_template
+    vaf_template = heart._vaf_template
+    ventricular_duration = heart._ventricular_duration
+
+    model.components['ecg'].heart_rate = 180.0
+    model.calculate(0.1)
+
+    assert heart._ventricular_duration != ventricular_duration
+    assert heart._aaf_template is aaf_template
+    assert heart._vaf_template is vaf_template
+
+
+def test_activation_curves_follow_the_gaussians(model):
+    heart = model.components['heart']
+    ecg = model.components['ecg']
+    curves = heart.get_activation_curves()
+
+    # the contraction lasts for the counters below duration / step size
+    atrial_duration = ecg.pq_time
+    ventricular_duration = ecg.cqt_time + ecg.qrs_time
+    assert len(curves['aaf']) == math.ceil(atrial_duration / model.modeling_stepsize)
+    assert len(curves['vaf']) == math.ceil(ventricular_duration / model.modeling_stepsize)
+
+    t = curves['atrial_time']
+    aaf = np.exp(-((t - 0.5 * atrial_duration) / (0.2 * atrial_duration)) ** 2)
+    assert np.abs(curves['aaf'] - aaf).max() < 1e-3
+
+    t = curves['ventricular_time']
+    vaf = 0.5 * np.exp(-((t - 0.5 * ventricular_duration) / (0.2 * ventricular_duration)) ** 2) + \
+          0.59 * np.exp(-((t - 0.6 * ventricular_duration) / (0.13 * ventricular_duration)) ** 2)
+    assert np.abs(curves['vaf'] - vaf).max() < 1e-3
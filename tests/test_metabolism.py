@@ -0,0 +1,35 @@
+# tests of the metabolism: the loop over the active components and the array expression on the hydraulics arrays give the same result
+import os
+
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+def step_metabolism(vectorize_threshold):
+    model = ModelEngine(definition, vectorized_hydraulics = True)
+    model.calculate(0.1)
+    metabolism = model.components['metabolism']
+    metabolism.vectorize_threshold = vectorize_threshold
+    metabolism.link()
+    for _ in range(100):
+        metabolism.model_step()
+    return metabolism, [(comp.to2, comp.tco2) for comp, _ in metabolism._active_comps]
+
+
+def test_loop_and_array_paths_agree():
+    loop, loop_values = step_metabolism(1000)
+    array, array_values = step_metabolism(0)
+
+    assert loop._hydraulics is None
+    assert array._hydraulics is not None
+    assert array_values == pytest.approx(loop_values, rel = 1e-12)
+
+
+def test_few_active_components_use_the_loop():
+    model = ModelEngine(definition, vectorized_hydraulics = True)
+    metabolism = model.components['metabolism']
+    assert len(metabolism.active_comps) < metabolism.vectorize_threshold
+    assert metabolism._hydraulics is None
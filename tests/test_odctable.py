@@ -0,0 +1,66 @@
+# tests of the oxygen dissociation table: the error bounds of the interpolated po2 and so2 against the root finding, and the fall back to
+# the root finding for the queries outside the table
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.bloodgas import solve_oxygenation
+from explain_core.helpers.odctable import OxygenDissociationTable, binding_capacity
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture(scope = 'module')
+def table():
+    return OxygenDissociationTable()
+
+
+def test_accuracy_report_bounds(table):
+    # the documented accuracy of the default grid on 2000 random points: a maximum po2 error of 3.7 mmHg (at a po2 above 200 mmHg where
+    # the curve is flat) and a maximum so2 error of 0.1 %. the points above the oxygen binding capacity have no solution in the bracket
+    # and are outside the table
+    report = table.accuracy_report(2000)
+
+    assert report['compared'] + report['outside_table'] == 2000
+    assert report['outside_table'] < 0.2 * 2000
+    assert report['po2_max_error_mmhg'] < 4.0
+    assert report['po2_mean_error_mmhg'] < 0.2
+    assert report['so2_max_error_percent'] < 0.1
+
+
+def test_relative_po2_error_in_the_physiological_range(table):
+    rng = np.random.default_rng(1)
+    n = 2000
+    hemoglobin = rng.uniform(6.0, 12.0, n)
+    to2 = rng.uniform(0.3, 0.99, n) * binding_capacity(hemoglobin, table.mmoltoml)
+    a = rng.uniform(-0.5, 0.5, n)
+    temp = rng.uniform(35.0, 39.0, n)
+    zeros = np.zeros(n)
+
+    exact = solve_oxygenation(to2, hemoglobin, 7.4 - a / 1.04, zeros, zeros + 5.0, temp, np.full(n, 5.0), table.left_o2, table.right_o2,
+                              table.mmoltoml, 1e-10, 200)
+    po2, inside = table.lookup(to2, hemoglobin, a, temp)
+
+    assert inside.all() and exact['solved'].all()
+    assert np.max(np.abs(po2 - exact['po2']) / exact['po2']) < 0.02
+
+
+def test_queries_outside_the_table_use_the_root_finding():
+    model = ModelEngine(definition)
+    model.calculate(0.1)
+    blood = model.components['blood']
+    comps = [model.components['AA'], model.components['RA']]
+
+    # a temperature above the last grid point of the table
+    comps[1].temp = 45.0
+    _, inside = blood.get_odc_table().lookup(np.array([comp.to2 for comp in comps]), np.array([comp.hemoglobin for comp in comps]),
+                                             np.zeros(2), np.array([comp.temp for comp in comps]))
+    assert inside.tolist() == [True, False]
+
+    blood.oxygenation(comps[1])
+    brent = (comps[1].po2, comps[1].so2)
+    comps[1].po2 = 0.0
+    blood.oxygenation_from_table(comps)
+    assert (comps[1].po2, comps[1].so2) == brent
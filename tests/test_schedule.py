@@ -0,0 +1,159 @@
+# tests of the step schedule of the model engine: which model step functions are scheduled, on which update interval and in which order
+import os
+
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture
+def model():
+    model = ModelEngine(definition)
+    model.calculate(0.01)
+    return model
+
+
+def scheduled_names(model):
+    return [entry['name'] for entry in model.get_schedule()]
+
+
+def record_calls(model, names, calls):
+    # replace the model step functions of the components by functions which record their calls, the schedule is rebuilt to use them
+    for name in names:
+        comp = model.components[name]
+        model_step = comp.model_step
+
+        def recorded_model_step(name = name, model_step = model_step):
+            calls.append(name)
+            model_step()
+
+        comp.model_step = recorded_model_step
+    model.invalidate_schedule()
+
+
+def test_disabled_components_are_left_out(model):
+    names = scheduled_names(model)
+    for name, comp in model.components.items():
+        if not getattr(comp, 'is_enabled', True):
+            assert name not in names
+    assert 'ventilator' not in names
+    assert 'DA' not in names
+    assert names[-2:] == ['interface', 'datacollector']
+
+
+def test_schedule_follows_the_definition_order(model):
+    # the components are scheduled in the order of the definition followed by the interface and the datacollector
+    names = scheduled_names(model)
+    components = [name for name in names if name in model.components]
+    order = list(model.components)
+    assert components == sorted(components, key = order.index)
+
+
+def test_update_steps_countdown(model):
+    schedule = {entry['name']: entry['update_steps'] for entry in model.get_schedule()}
+    assert schedule['blood'] == 6
+    assert schedule['baroreceptor'] == 100
+    assert schedule['heart'] == 1
+
+    calls = []
+    record_calls(model, ['blood', 'heart'], calls)
+    due_steps = model.get_due_steps(12)
+    model.calculate(12 * model.modeling_stepsize)
+
+    # the blood model is called every 6 model steps, in the model steps predicted by get_due_steps
+    assert calls.count('heart') == 12
+    assert calls.count('blood') == 2
+    blood_steps = [step for step, due in enumerate(due_steps) if 'blood' in due]
+    assert len(blood_steps) == 2
+    assert blood_steps[1] - blood_steps[0] == 6
+
+
+def test_rate_groups_run_after_the_step_schedule(model):
+    # the components with an update interval run after all components which run every model step, so the blood model runs after the
+    # breathing and itp models although it comes before them in the definition
+    order = list(model.components)
+    assert order.index('blood') < order.index('breathing') < order.index('itp')
+
+    calls = []
+    record_calls(model, ['blood', 'breathing', 'itp'], calls)
+    model.calculate(6 * model.modeling_stepsize)
+    step = calls.index('blood')
+    assert calls[step - 2:step + 1] == ['breathing', 'itp', 'blood']
+
+    due = model.get_due_steps(6)
+    blood_step = [steps for steps in due if 'blood' in steps][0]
+    assert blood_step.index('blood') > blood_step.index('itp')
+
+
+def test_rate_group_phase_survives_a_rebuild(model):
+    countdowns = {rate_group[1]: rate_group[0] for rate_group in model.rate_schedule}
+    model.invalidate_schedule()
+    model.update_schedule()
+    assert {rate_group[1]: rate_group[0] for rate_group in model.rate_schedule} == countdowns
+
+
+def test_ventilator_toggle_rebuilds_the_schedule(model):
+    model.components['ventilator'].toggle_ventilator(True)
+    assert model._schedule_dirty
+
+    model.calculate(0.001)
+    names = scheduled_names(model)
+    assert 'ventilator' in names
+    assert 'YPIECE_NCA' in names
+    assert 'breathing' not in names
+
+    model.components['ventilator'].toggle_ventilator(False)
+    model.calculate(0.001)
+    names = scheduled_names(model)
+    assert 'ventilator' not in names
+    assert 'breathing' in names
+
+
+def test_pda_toggle_rebuilds_the_schedule(model):
+    model.components['pda'].is_enabled = True
+    model.calculate(0.001)
+    assert 'pda' in scheduled_names(model)
+
+    # the pda model enables the ductus arteriosus in its model step, the schedule is rebuilt in the next model step
+    model.calculate(0.001)
+    assert model.components['DA'].is_enabled
+    assert 'DA' in scheduled_names(model)
+    assert model.components['DA'].model_step in model.step_schedule
+
+
+def test_direct_enable_is_picked_up_at_the_next_calculate(model):
+    # setting is_enabled directly does not rebuild a running schedule, the schedule is checked at the start of every calculate
+    # and get_schedule describes the schedule the next calculate will use
+    fo = model.components['FO']
+    fo.is_enabled = True
+    assert model.schedule_is_stale()
+    assert fo.model_step not in model.step_schedule
+    assert 'FO' in scheduled_names(model)
+
+    model.calculate(0.001)
+    assert fo.model_step in model.step_schedule
+
+
+def test_get_schedule_has_no_side_effects(model):
+    step_schedule = list(model.step_schedule)
+    model.components['FO'].is_enabled = True
+    model.get_schedule()
+    assert model.step_schedule == step_schedule
+    assert model.schedule_is_stale()
+
+
+def test_disabled_component_with_a_missing_reference(capsys):
+    # the ecls of the normal neonate refers to a circuit which is not in the model, it is loaded silently and can't be enabled
+    model = ModelEngine(definition)
+    assert 'refers to' not in capsys.readouterr().out
+    assert 'ELGIN' in model.unlinked['ecls']
+
+    model.components['ecls'].is_enabled = True
+    with pytest.raises(ValueError, match = 'ELGIN'):
+        model.calculate(0.001)
+
+    model.components['ecls'].is_enabled = False
+    model.calculate(0.001)
+    assert 'ecls' not in scheduled_names(model)
@@ -0,0 +1,70 @@
+# tests of the snapshots of the model engine: a model restored from a snapshot continues bit identical to the model the snapshot was
+# taken from, in the scalar and in the vectorized modes
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+modes = [{}, {'vectorized_hydraulics': True, 'vectorized_gas': True}]
+
+
+def differences(first, second, path = ''):
+    # return the paths of the values which differ between two decoded snapshots, nan values are equal to each other
+    if isinstance(first, dict) and isinstance(second, dict):
+        if set(first) != set(second):
+            return [path]
+        return [diff for key in first for diff in differences(first[key], second[key], f"{path}.{key}")]
+    if isinstance(first, (list, tuple)) and isinstance(second, (list, tuple)):
+        if len(first) != len(second):
+            return [path]
+        return [diff for index, (a, b) in enumerate(zip(first, second)) for diff in differences(a, b, f"{path}[{index}]")]
+    if isinstance(first, (np.ndarray, np.generic, float)) or isinstance(second, (np.ndarray, np.generic, float)):
+        return [] if np.array_equal(first, second, equal_nan = True) else [path]
+    return [] if first == second else [path]
+
+
+def state(model):
+    snapshot = pickle.loads(model.snapshot())
+    del snapshot['prop_changes']
+    return snapshot
+
+
+@pytest.mark.parametrize('mode', modes, ids = ['scalar', 'vectorized'])
+def test_restored_model_continues_bit_identical(mode):
+    model = ModelEngine(definition, **mode)
+    model.calculate(0.3)
+    model.io.dc.add_to_watchlist(model.io.find_model_prop('AA.pres'))
+    data = model.snapshot()
+    model.calculate(0.4)
+
+    restored = ModelEngine(definition, **mode)
+    restored.restore(data)
+    restored.calculate(0.4)
+
+    assert restored.model_clock == model.model_clock
+    assert differences(state(restored), state(model)) == []
+    assert [sample['AA.pres'] for sample in restored.io.dc.collected_data] == [sample['AA.pres'] for sample in model.io.dc.collected_data]
+
+
+def test_restore_rewinds_the_model():
+    model = ModelEngine(definition)
+    model.calculate(0.3)
+    data = model.snapshot()
+    model.calculate(0.4)
+    first = state(model)
+
+    model.restore(data)
+    model.calculate(0.4)
+    assert differences(state(model), first) == []
+
+
+def test_snapshot_of_another_mode_is_rejected():
+    model = ModelEngine(definition)
+    vectorized = ModelEngine(definition, vectorized_hydraulics = True)
+    with pytest.raises(ValueError):
+        vectorized.restore(model.snapshot())
@@ -0,0 +1,74 @@
+# tests of the state cache: a settled state is stored on the first warm up and restored on the next one, and a change of the model
+# definition, the warm up settings, the model mode or the model code gives another key
+import os
+
+import pytest
+
+from explain_core import ModelEngine as model_engine
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.definition import load_definition, apply_parameters
+from explain_core.helpers.statecache import StateCache
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StateCache(str(tmp_path))
+
+
+def test_warm_up_miss_then_hit(cache):
+    model = ModelEngine(definition)
+    assert not model.warm_up(0.1, cache = cache)
+    assert len(os.listdir(cache.cache_dir)) == 1
+
+    cached = ModelEngine(definition)
+    assert cached.warm_up(0.1, cache = cache)
+    assert cached.model_clock == model.model_clock
+    assert cached.components['AA'].vol == model.components['AA'].vol
+
+
+def test_key_changes_with_the_definition_and_the_settings():
+    model = ModelEngine(definition)
+    key = model.get_warm_up_key(0.1)
+
+    assert ModelEngine(definition).get_warm_up_key(0.1) == key
+    assert ModelEngine(apply_parameters(load_definition(definition), {'AA.el_base': 1000.0})).get_warm_up_key(0.1) != key
+    assert ModelEngine(definition, vectorized_hydraulics = True).get_warm_up_key(0.1) != key
+    assert model.get_warm_up_key(0.2) != key
+    assert model.get_warm_up_key() != key
+
+
+def test_key_changes_with_the_code(monkeypatch, tmp_path):
+    model = ModelEngine(definition)
+    key = model.get_warm_up_key(0.1)
+
+    # a changed source file of the model code gives another key
+    code_file = tmp_path / 'model_code.py'
+    code_file.write_text('a = 1\n')
+    get_code_files = model_engine.get_code_files
+    monkeypatch.setattr(model_engine, 'get_code_files', lambda components: get_code_files(components) + ((str(code_file), code_file.stat().st_mtime_ns),))
+    changed_key = model.get_warm_up_key(0.1)
+    assert changed_key != key
+
+    code_file.write_text('a = 2\n')
+    os.utime(code_file, ns = (code_file.stat().st_atime_ns, code_file.stat().st_mtime_ns + 1000))
+    assert model.get_warm_up_key(0.1) not in (key, changed_key)
+
+    # and so does another version of the snapshot format
+    monkeypatch.setattr(model_engine, 'snapshot_version', model_engine.snapshot_version + 1)
+    assert model.get_warm_up_key(0.1) != key
+
+
+def test_least_recently_used_states_are_evicted(tmp_path):
+    cache = StateCache(str(tmp_path), max_size = 250)
+    cache.put('first', b'1' * 100)
+    cache.put('second', b'2' * 100)
+    os.utime(cache.get_filename('first'), (0, 0))
+    os.utime(cache.get_filename('second'), (1, 1))
+    assert cache.get('first') is not None
+
+    cache.put('third', b'3' * 100)
+    assert cache.get('second') is None
+    assert cache.get('first') == b'1' * 100
+    assert cache.get('third') == b'3' * 100
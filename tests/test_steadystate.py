@@ -0,0 +1,62 @@
+# tests of the periodic steady state finder: the model is run window by window until the window means of the volumes and blood
+# concentrations change less than the tolerance, and the next window of a converged model changes as little
+import os
+
+import numpy as np
+import pytest
+
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.steadystate import get_fields, get_cycle_period, run_window
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+tolerance = 1e-2
+
+
+@pytest.fixture(scope = 'module')
+def settled():
+    model = ModelEngine(definition)
+    report = model.find_steady_state(tolerance = tolerance)
+    return model, report
+
+
+def test_cycle_period_holds_whole_heart_cycles():
+    model = ModelEngine(definition)
+    heart_period = 60.0 / model.components['ecg'].heart_rate
+    period = get_cycle_period(model)
+
+    assert period >= 60.0 / model.components['breathing'].spont_resp_rate
+    assert period / heart_period == pytest.approx(round(period / heart_period))
+
+
+def test_steady_state_converges(settled):
+    model, report = settled
+
+    assert report['converged']
+    assert report['max_change'] < tolerance
+    assert report['history'][-1] == report['max_change']
+    assert report['windows'] == len(report['history']) + 1
+    assert report['time'] == pytest.approx(model.model_clock)
+    assert report['time'] < 120.0
+
+
+def test_converged_model_stays_steady(settled):
+    # the window means of two more cycles of the converged model change less than the tolerance
+    model, report = settled
+    fields = get_fields(model)
+    window = get_cycle_period(model)
+    first, _ = run_window(model, fields, window, 0.005)
+    second, _ = run_window(model, fields, window, 0.005)
+
+    change = np.abs(second - first) / np.maximum(np.abs(second), 1e-6)
+    assert change.max() < tolerance
+
+
+def test_max_time_ends_the_search():
+    model = ModelEngine(definition)
+    report = model.find_steady_state(tolerance = 1e-12, max_time = 2.0, window = 0.5)
+
+    assert not report['converged']
+    assert report['windows'] == 4
+    assert report['time'] == pytest.approx(2.0)
+    assert report['max_change'] >= 1e-12
@@ -0,0 +1,76 @@
+# tests of the parameter sweep: the parameters of a job are set on the restored model of the worker, the settings of the model itself which
+# are only read when the model is built get a model built with them, and a job gives the same result as a model built with its parameters
+import os
+
+import numpy as np
+import pytest
+
+from explain_core import sweep
+from explain_core.ModelEngine import ModelEngine
+from explain_core.helpers.definition import load_definition, apply_parameters
+
+definition = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'normal_neonate.json')
+
+outputs = ['AA.pres', 'LV.vol']
+duration = 0.2
+sample_interval = 0.005
+
+
+@pytest.fixture(scope = 'module')
+def model_definition():
+    model_definition = load_definition(definition)
+    sweep.init_worker(model_definition, False, 0.0, sample_interval)
+    return model_definition
+
+
+def run_built_model(model_definition, parameters):
+    # run a model built from the definition with the parameters in the same way as a job
+    model = ModelEngine(apply_parameters(model_definition, parameters))
+    samples = []
+    for _ in range(int(round(duration / sample_interval))):
+        model.calculate(sample_interval)
+        samples.append([getattr(model.components[output.split('.')[0]], output.split('.')[1]) for output in outputs])
+    samples = np.array(samples)
+    return np.stack([samples.mean(axis=0), samples.min(axis=0), samples.max(axis=0)])
+
+
+def test_get_jobs():
+    jobs = sweep.get_jobs({'LV.el_max_fac': [1.0, 1.5], 'DA.r_for': [100, 200, 300]})
+    assert len(jobs) == 6
+    assert jobs[0] == {'LV.el_max_fac': 1.0, 'DA.r_for': 100}
+    assert jobs[-1] == {'LV.el_max_fac': 1.5, 'DA.r_for': 300}
+    assert sweep.get_jobs([{'DA.r_for': 100}]) == [{'DA.r_for': 100}]
+
+
+def test_job_matches_a_model_built_with_its_parameters(model_definition):
+    parameters = {'LV.el_max_fac': 1.5}
+    summary = sweep.run_job((parameters, duration, outputs))
+
+    assert sweep._worker_model.components['LV'].el_max_fac == 1.5
+    assert summary == pytest.approx(run_built_model(model_definition, parameters), rel = 1e-9)
+    assert not np.allclose(summary, run_built_model(model_definition, {}))
+
+
+def test_jobs_start_from_the_initial_state(model_definition):
+    first = sweep.run_job(({'LV.el_max_fac': 1.5}, duration, outputs))
+    sweep.run_job(({'LV.el_max_fac': 0.5}, duration, outputs))
+    again = sweep.run_job(({'LV.el_max_fac': 1.5}, duration, outputs))
+    assert np.array_equal(first, again)
+
+
+def test_model_settings_build_a_new_model(model_definition):
+    # the modeling stepsize is copied into the components when the model is built so a property change of the running model can't set it
+    parameters = {'modeling_stepsize': 0.001}
+    summary = sweep.run_job((parameters, duration, outputs))
+
+    assert sweep._worker_model.modeling_stepsize == 0.0005
+    assert summary == pytest.approx(run_built_model(model_definition, parameters), rel = 1e-9)
+    assert not np.allclose(summary, run_built_model(model_definition, {}))
+
+    with pytest.raises(KeyError, match = 'modeling_stepsize'):
+        sweep.set_parameters(sweep._worker_model, parameters)
+
+
+def test_unknown_parameters_are_rejected(model_definition):
+    with pytest.raises(KeyError):
+        sweep.run_job(({'LV.no_such_prop': 1.0}, duration, outputs))